@@ -1,27 +1,65 @@
+import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from .config import Config
+from .logging_config import configurar_logging
+from .instrumentation import init_instrumentation
+from .slow_queries import init_slow_queries
+from .compresion import init_compresion
+from .limites import init_limites
+from .intentos import init_intentos
+from .replicas import SesionEnrutada, configurar_replicas, init_replicas, binds_sin_replicas
+from .shards import configurar_shards, init_shards
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 jwt = JWTManager()
+logger = logging.getLogger(__name__)
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
+    configurar_logging(app)
 
     CORS(app, resources={r"/*": {"origins": "*"}})
+    configurar_replicas(app)
+    configurar_shards(app)
     db.init_app(app)
+    init_replicas(app, db)
     jwt.init_app(app)
+    init_limites(app)
+    init_intentos(app)
+    init_instrumentation(app)
+    init_slow_queries(app)
+    init_compresion(app)
 
     # Importar marshmallow después de que se inicializa SQLAlchemy
     from .models import ma
     ma.init_app(app)
+
+    # Registro de cambios para la sincronización incremental
+    from .cambios import init_cambios
+    from .eventos import init_eventos
+    from .cache import init_cache
+    from .trabajos import init_trabajos
+    from .revocacion import init_revocacion
+    from .cargas import init_cargas
+    from .ciclo_vida import init_ciclo_vida
+    from .idempotencia import init_idempotencia
+    init_revocacion(app, jwt)
+    init_cargas(app)
+    init_ciclo_vida(app)
+    init_idempotencia(app)
+    init_cambios(app)
+    init_eventos(app)
+    init_cache(app)
+    init_trabajos(app)
     
     # Inicializar las tablas en la base de datos
     with app.app_context():
-        db.create_all()
+        db.create_all(bind_key=binds_sin_replicas(db))
+    init_shards(app, db)
     
     # Registrar blueprints
     from .routes.auth import auth_bp
@@ -31,6 +69,14 @@ def create_app():
     from .routes.consumibles import consumibles_bp
     from .routes.usuarios import usuarios_bp
     from .routes.historial import historial_bp
+    from .routes.metrics import metrics_bp
+    from .routes.admin import admin_bp
+    from .routes.sync import sync_bp
+    from .routes.eventos import eventos_bp
+    from .routes.trabajos import trabajos_bp
+    from .routes.reportes import reportes_bp
+    from .routes.legacy import legacy_bp
+    from .routes.ciclo_vida import ciclo_vida_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(equipos_bp, url_prefix='/inventario')
@@ -39,5 +85,22 @@ def create_app():
     app.register_blueprint(consumibles_bp, url_prefix='/api/consumibles')
     app.register_blueprint(usuarios_bp, url_prefix='/api/usuarios')
     app.register_blueprint(historial_bp, url_prefix='/api/historial')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(sync_bp, url_prefix='/api/sync')
+    app.register_blueprint(eventos_bp, url_prefix='/api/eventos')
+    app.register_blueprint(trabajos_bp, url_prefix='/api/trabajos')
+    app.register_blueprint(reportes_bp, url_prefix='/api/reportes')
+    app.register_blueprint(legacy_bp, url_prefix='/api')
+    app.register_blueprint(ciclo_vida_bp, url_prefix='/api/ciclo-vida')
+    app.register_blueprint(metrics_bp)
+
+    @app.route('/')
+    def home():
+        return {'message': 'API funcionando'}
+
+    @app.errorhandler(500)
+    def handle_500_error(error):
+        logger.error("Error interno del servidor: %s", error)
+        return {'error': str(error), 'tipo': type(error).__name__}, 500
 
     return app
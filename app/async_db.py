@@ -0,0 +1,36 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+# Drivers asíncronos equivalentes a los drivers síncronos soportados
+ASYNC_DRIVERS = {
+    'mysql': 'mysql+aiomysql',
+    'mysql+pymysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+}
+
+def async_database_uri(uri):
+    url = make_url(uri)
+    if url.drivername in ASYNC_DRIVERS.values():
+        return url
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    if not driver:
+        raise ValueError(f"No hay driver asíncrono para '{url.drivername}'")
+    return url.set(drivername=driver)
+
+def create_async_session_factory(app):
+    url = async_database_uri(app.config.get('ASYNC_DATABASE_URI') or app.config['SQLALCHEMY_DATABASE_URI'])
+
+    engine_options = {}
+    if url.get_backend_name() != 'sqlite' or url.database not in (None, '', ':memory:'):
+        # El pool debe cubrir las peticiones concurrentes que esperan a la base remota
+        engine_options.update(
+            pool_size=app.config.get('ASYNC_POOL_SIZE', 20),
+            max_overflow=app.config.get('ASYNC_MAX_OVERFLOW', 80)
+        )
+    if url.get_backend_name() != 'sqlite':
+        engine_options.update(pool_pre_ping=True, pool_recycle=3600)
+
+    engine = create_async_engine(url, **engine_options)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    return engine, session_factory
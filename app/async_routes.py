@@ -0,0 +1,412 @@
+import time
+from urllib.parse import parse_qs, parse_qsl
+from asgiref.wsgi import WsgiToAsgi
+from flask_jwt_extended import decode_token
+from jwt import ExpiredSignatureError
+from sqlalchemy import select
+from werkzeug.http import parse_accept_header
+from . import create_app
+from .async_db import create_async_session_factory
+from .cache import CACHE_PETICIONES, EntradaCache, alcance_de, backend_actual, clave_cache, tags_de_respuesta
+from .compresion import comprimir_cuerpo
+from .config import Config
+from .instrumentation import cerrar_medicion, medicion_asincrona
+from .limites import consumir_fichas, tomar_turno, rechazo
+from .revocacion import token_revocado
+from .shards import activo as sharding_activo
+from .models import (
+    InventarioGeneral, EquipoComputacional, Celular, Impresora,
+    Usuario, Area, Sucursal, Consumible, HistorialMovimiento,
+    CelularSchema, ImpresoraSchema, ConsumibleSchema, HistorialMovimientoSchema
+)
+
+celular_schema = CelularSchema()
+impresora_schema = ImpresoraSchema()
+consumibles_schema = ConsumibleSchema(many=True)
+historiales_schema = HistorialMovimientoSchema(many=True)
+
+class AuthError(Exception):
+    def __init__(self, mensaje, status=401):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.status = status
+
+class AsyncRequest:
+    def __init__(self, flask_app, session, headers, args):
+        self.flask_app = flask_app
+        self.session = session
+        self.headers = headers
+        self.args = args
+        self._usuario = None
+
+    # Equivalente a @jwt_required() + get_jwt_identity() sin contexto de petición Flask
+    def identidad(self):
+        auth = self.headers.get('authorization')
+        if not auth:
+            raise AuthError("Missing Authorization Header")
+
+        partes = auth.split()
+        if len(partes) != 2 or partes[0] != self.flask_app.config['JWT_HEADER_TYPE']:
+            raise AuthError("Bad Authorization header. Expected 'Authorization: Bearer <JWT>'")
+
+        try:
+            with self.flask_app.app_context():
+                claims = decode_token(partes[1])
+                revocado = token_revocado(claims)
+        except ExpiredSignatureError:
+            raise AuthError("Token has expired")
+        except Exception as e:
+            raise AuthError(str(e), 422)
+
+        if claims.get('type') != 'access':
+            raise AuthError("Only non-refresh tokens are allowed", 422)
+        if revocado:
+            raise AuthError("Token has been revoked")
+
+        return claims[self.flask_app.config['JWT_IDENTITY_CLAIM']]
+
+    # Usuario autenticado; se carga una vez por petición (lo usan la caché y el handler)
+    async def usuario(self):
+        if self._usuario is None:
+            self._usuario = await self.session.get(Usuario, self.identidad())
+        return self._usuario
+
+# Carga en una sola consulta IN los registros cuyos ids se piden
+async def _por_id(session, modelo, columna, ids):
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    registros = await session.scalars(select(modelo).where(columna.in_(ids)))
+    return {getattr(r, columna.key): r for r in registros}
+
+def _campos_inventario(item):
+    return {
+        "id_inventario": item.id_inventario,
+        "estado": item.estado,
+        "id_usuario_responsable": item.id_usuario_responsable,
+        "id_area_responsable": item.id_area_responsable,
+        "id_sucursal_ubicacion": item.id_sucursal_ubicacion,
+        "fecha_ingreso": item.fecha_ingreso.isoformat() if item.fecha_ingreso else None,
+        "observaciones": item.observaciones
+    }
+
+def _detalle_equipo(tipo, detalle):
+    if tipo == 'Computacional':
+        return {
+            'codigo_interno': detalle.codigo_interno,
+            'marca': detalle.marca,
+            'modelo': detalle.modelo,
+            'procesador': detalle.procesador,
+            'ram': detalle.ram,
+            'disco_duro': detalle.disco_duro,
+            'sistema_operativo': detalle.sistema_operativo,
+            'office': detalle.office,
+            'antivirus': detalle.antivirus,
+            'drive': detalle.drive,
+            'nombre_equipo': detalle.nombre_equipo,
+            'serial_number': detalle.serial_number,
+            'fecha_revision': detalle.fecha_revision.strftime('%Y-%m-%d') if detalle.fecha_revision else None,
+            'entregado_por': detalle.entregado_por,
+            'comentarios': detalle.comentarios
+        }
+    if tipo == 'Celular':
+        return {
+            'codigo_interno': detalle.codigo_interno,
+            'marca': detalle.marca,
+            'modelo': detalle.modelo,
+            'imei': detalle.imei,
+            'numero_linea': detalle.numero_linea,
+            'sistema_operativo': detalle.sistema_operativo,
+            'capacidad_almacenamiento': detalle.capacidad_almacenamiento,
+            'comentarios': detalle.comentarios
+        }
+    return {
+        'codigo_interno': detalle.codigo_interno,
+        'marca': detalle.marca,
+        'modelo': detalle.modelo,
+        'tipo_conexion': detalle.tipo_conexion,
+        'ip_asignada': detalle.ip_asignada,
+        'serial_number': detalle.serial_number,
+        'observaciones': detalle.observaciones
+    }
+
+# GET /inventario/
+async def get_equipos(request):
+    try:
+        session = request.session
+        equipos = (await session.scalars(select(InventarioGeneral))).all()
+
+        ids_por_tipo = {'Computacional': set(), 'Celular': set(), 'Impresora': set()}
+        for equipo in equipos:
+            ids_por_tipo[equipo.tipo_equipo].add(equipo.id_registro)
+
+        detalles = {
+            'Computacional': await _por_id(session, EquipoComputacional, EquipoComputacional.id_equipo, ids_por_tipo['Computacional']),
+            'Celular': await _por_id(session, Celular, Celular.id_celular, ids_por_tipo['Celular']),
+            'Impresora': await _por_id(session, Impresora, Impresora.id_impresora, ids_por_tipo['Impresora'])
+        }
+        usuarios = await _por_id(session, Usuario, Usuario.id, (e.id_usuario_responsable for e in equipos))
+        areas = await _por_id(session, Area, Area.id_area, (e.id_area_responsable for e in equipos))
+        sucursales = await _por_id(session, Sucursal, Sucursal.id_sucursal, (e.id_sucursal_ubicacion for e in equipos))
+
+        result = []
+        for equipo in equipos:
+            equipo_data = {
+                'id': equipo.id_inventario,
+                'tipo': equipo.tipo_equipo,
+                'estado': equipo.estado,
+                'fecha_ingreso': equipo.fecha_ingreso.strftime('%Y-%m-%d') if equipo.fecha_ingreso else None,
+                'observaciones': equipo.observaciones
+            }
+
+            detalle = detalles[equipo.tipo_equipo].get(equipo.id_registro)
+            if detalle:
+                equipo_data['detalle'] = _detalle_equipo(equipo.tipo_equipo, detalle)
+
+            usuario = usuarios.get(equipo.id_usuario_responsable)
+            if usuario:
+                equipo_data['usuario_responsable'] = {
+                    'id': usuario.id,
+                    'nombre': usuario.nombre,
+                    'usuario': usuario.usuario
+                }
+
+            area = areas.get(equipo.id_area_responsable)
+            if area:
+                equipo_data['area_responsable'] = {
+                    'id': area.id_area,
+                    'nombre': area.nombre_area
+                }
+
+            sucursal = sucursales.get(equipo.id_sucursal_ubicacion)
+            if sucursal:
+                equipo_data['sucursal'] = {
+                    'id': sucursal.id_sucursal,
+                    'nombre': sucursal.nombre_sucursal,
+                    'direccion': sucursal.direccion,
+                    'region': sucursal.region
+                }
+
+            result.append(equipo_data)
+
+        return result, 200
+    except Exception as e:
+        return {
+            'error': str(e),
+            'tipo': type(e).__name__,
+            'detalles': getattr(e, 'args', [])
+        }, 500
+
+async def _get_dispositivos(request, tipo, modelo, columna_id, schema):
+    usuario = await request.usuario()
+    if not usuario:
+        return {"error": "Usuario no autorizado"}, 401
+
+    inventario = (await request.session.scalars(
+        select(InventarioGeneral).filter_by(
+            tipo_equipo=tipo,
+            id_sucursal_ubicacion=usuario.sucursal_activa
+        )
+    )).all()
+    detalles = await _por_id(request.session, modelo, columna_id, (item.id_registro for item in inventario))
+
+    result = []
+    for item in inventario:
+        detalle = detalles.get(item.id_registro)
+        if detalle:
+            data = schema.dump(detalle)
+            data.update(_campos_inventario(item))
+            result.append(data)
+
+    return result, 200
+
+# GET /api/celulares/
+async def get_celulares(request):
+    return await _get_dispositivos(request, 'Celular', Celular, Celular.id_celular, celular_schema)
+
+# GET /api/impresoras/
+async def get_impresoras(request):
+    return await _get_dispositivos(request, 'Impresora', Impresora, Impresora.id_impresora, impresora_schema)
+
+# GET /api/consumibles/
+async def get_consumibles(request):
+    usuario = await request.usuario()
+    if not usuario:
+        return {"error": "Usuario no autorizado"}, 401
+
+    consumibles = (await request.session.scalars(
+        select(Consumible).filter_by(id_sucursal_stock=usuario.sucursal_activa)
+    )).all()
+    return consumibles_schema.dump(consumibles), 200
+
+# GET /api/historial/
+async def get_historial(request):
+    usuario = await request.usuario()
+    if not usuario:
+        return {"error": "Usuario no autorizado"}, 401
+
+    query = select(HistorialMovimiento)
+    if request.args.get('tipo_equipo'):
+        query = query.filter_by(tipo_equipo=request.args['tipo_equipo'])
+    if request.args.get('id_equipo'):
+        query = query.filter_by(id_equipo=request.args['id_equipo'])
+    query = query.order_by(HistorialMovimiento.fecha.desc())
+
+    historial = (await request.session.scalars(query)).all()
+    return historiales_schema.dump(historial), 200
+
+# Rutas de lectura servidas de forma asíncrona; el resto sigue en Flask
+ASYNC_ROUTES = {
+    '/inventario/': get_equipos,
+    '/api/celulares/': get_celulares,
+    '/api/impresoras/': get_impresoras,
+    '/api/consumibles/': get_consumibles,
+    '/api/historial/': get_historial,
+}
+
+class AsyncInventarioApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi_app = WsgiToAsgi(flask_app)
+        self.engine, self.session_factory = create_async_session_factory(flask_app)
+        # El motor asíncrono solo conoce la base principal: con sharding todas las
+        # rutas pasan por Flask, que consulta el shard de la sucursal o todos ellos
+        self.rutas = {} if sharding_activo() else ASYNC_ROUTES
+        # Endpoint Flask equivalente de cada ruta, para aplicar los mismos límites y
+        # cachear con las mismas opciones que su @cacheado
+        adaptador = flask_app.url_map.bind('localhost')
+        self.endpoints = {ruta: adaptador.match(ruta, 'GET')[0] for ruta in self.rutas}
+        self.opciones_cache = {
+            ruta: getattr(flask_app.view_functions[endpoint], 'opciones_cache', None)
+            for ruta, endpoint in self.endpoints.items()
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            handler = self.rutas.get(scope['path'])
+            # Los campos parciales (?fields=) proyectan la consulta SQL: los resuelve Flask
+            if handler and 'fields' not in parse_qs(scope.get('query_string', b'').decode('latin-1')):
+                return await self._despachar(handler, scope['path'], scope, send)
+
+        await self.wsgi_app(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _identidad_opcional(self, headers):
+        try:
+            return AsyncRequest(self.flask_app, None, headers, {}).identidad()
+        except AuthError:
+            return None
+
+    # Mismo cuerpo que jsonify: la caché comparte entradas entre Flask y el modo asíncrono
+    def _json(self, payload):
+        return f"{self.flask_app.json.dumps(payload, separators=(',', ':'))}\n".encode('utf-8')
+
+    # Respuesta del handler, o de la caché con la misma clave y tags que @cacheado en
+    # Flask: (cuerpo, status, X-Cache o None si la ruta no pasa por la caché)
+    async def _responder(self, handler, ruta, endpoint, peticion, argumentos):
+        backend = backend_actual()
+        opciones = self.opciones_cache[ruta]
+        clave = None
+        if backend is not None and opciones is not None:
+            tipos, por_sucursal, publico, por_usuario = opciones
+            alcance = None
+            if not publico:
+                usuario = await peticion.usuario()
+                alcance = alcance_de(usuario, por_usuario) if usuario else None
+            if publico or alcance is not None:
+                clave = clave_cache(ruta, argumentos, alcance)
+                entrada = backend.obtener(clave)
+                if entrada is not None:
+                    CACHE_PETICIONES.incrementar(endpoint, 'hit')
+                    return entrada.cuerpo, entrada.status, 'HIT'
+                CACHE_PETICIONES.incrementar(endpoint, 'miss')
+                version = backend.version()
+
+        payload, status = await handler(peticion)
+        body = self._json(payload)
+        if clave is None:
+            return body, status, None
+        if status == 200:
+            ttl = self.flask_app.config.get('CACHE_TTL', 30)
+            backend.guardar(clave, EntradaCache(
+                body, status, 'application/json', time.monotonic() + ttl
+            ), tags_de_respuesta(tipos, por_sucursal, alcance), version)
+        return body, status, 'MISS'
+
+    async def _despachar(self, handler, ruta, scope, send):
+        if not self.flask_app.config.get('METRICS_ENABLED', True):
+            return await self._atender(handler, ruta, scope, send, None)
+        with medicion_asincrona() as medicion:
+            return await self._atender(handler, ruta, scope, send, medicion)
+
+    async def _atender(self, handler, ruta, scope, send, medicion):
+        endpoint = self.endpoints[ruta]
+        headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        argumentos = parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True)
+        args = {}
+        for k, v in argumentos:
+            args.setdefault(k, v)
+        extra_headers = []
+
+        ip = (scope.get('client') or ('desconocido',))[0]
+        agotadas = consumir_fichas(self.flask_app.config, endpoint, self._identidad_opcional(headers), ip)
+        admitida, semaforo = tomar_turno(endpoint) if agotadas is None else (False, None)
+        if not admitida:
+            payload, reintentar = rechazo(endpoint, *(agotadas or ('concurrencia', 1)))
+            status = 429
+            body = self._json(payload)
+            extra_headers.append((b'retry-after', reintentar.encode('latin-1')))
+        else:
+            try:
+                async with self.session_factory() as session:
+                    peticion = AsyncRequest(self.flask_app, session, headers, args)
+                    body, status, estado_cache = await self._responder(handler, ruta, endpoint, peticion, argumentos)
+                if estado_cache:
+                    extra_headers.append((b'x-cache', estado_cache.encode('latin-1')))
+            except AuthError as e:
+                payload, status = {"msg": e.mensaje}, e.status
+                body = self._json(payload)
+            except Exception as e:
+                payload, status = {"error": str(e)}, 500
+                body = self._json(payload)
+            finally:
+                if semaforo is not None:
+                    semaforo.release()
+
+        # Misma compresión que el after_request de Flask
+        if self.flask_app.config.get('COMPRESSION_ENABLED', True) and status >= 200 and status not in (204, 304):
+            extra_headers.append((b'vary', b'Accept-Encoding'))
+            comprimido = comprimir_cuerpo(self.flask_app.config, body, parse_accept_header(headers.get('accept-encoding')))
+            if comprimido is not None:
+                codificacion, body = comprimido
+                extra_headers.append((b'content-encoding', codificacion.encode('latin-1')))
+
+        if medicion is not None:
+            timing = cerrar_medicion(medicion, endpoint, 'GET', self.flask_app.config.get('N_PLUS_ONE_THRESHOLD', 10))
+            extra_headers.append((b'server-timing', timing.encode('latin-1')))
+
+        response_headers = [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('latin-1'))
+        ]
+        if 'origin' in headers:
+            response_headers.append((b'access-control-allow-origin', b'*'))
+        response_headers.extend(extra_headers)
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+def create_asgi_app(config_class=Config):
+    return AsyncInventarioApp(create_app(config_class))
@@ -0,0 +1,317 @@
+import base64
+import importlib
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from .cambios import al_confirmar
+from .instrumentation import Contador, METRICAS
+from .replicas import leyo_de_replica, ventana_retraso
+
+try:
+    import redis
+except ImportError:  # redis es opcional: solo lo necesita el backend externo
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_PETICIONES = Contador(
+    'inventario_cache_requests_total', 'Lecturas de la caché de respuestas', ('endpoint', 'resultado')
+)
+CACHE_INVALIDACIONES = Contador(
+    'inventario_cache_invalidations_total', 'Invalidaciones de la caché de respuestas por tipo', ('tipo',)
+)
+METRICAS.extend([CACHE_PETICIONES, CACHE_INVALIDACIONES])
+
+class EntradaCache:
+    __slots__ = ('cuerpo', 'status', 'mimetype', 'expira')
+
+    def __init__(self, cuerpo, status, mimetype, expira):
+        self.cuerpo = cuerpo
+        self.status = status
+        self.mimetype = mimetype
+        self.expira = expira
+
+# Interfaz de los backends: el decorador solo usa estos métodos. Una implementación
+# incompleta falla al instanciarse en init_cache, no en la primera petición
+class BackendCache(ABC):
+    @abstractmethod
+    def obtener(self, clave):
+        ...
+
+    # Solo guarda si no hubo invalidaciones desde que se leyó `version`
+    @abstractmethod
+    def guardar(self, clave, entrada, tags, version):
+        ...
+
+    @abstractmethod
+    def invalidar(self, tags):
+        ...
+
+    @abstractmethod
+    def version(self):
+        ...
+
+    @abstractmethod
+    def limpiar(self):
+        ...
+
+    # Epoch de la última invalidación, o None si el backend no la registra
+    def ultima_invalidacion(self):
+        return None
+
+# LRU en memoria del proceso, limitada por número de entradas y por bytes
+class CacheMemoria(BackendCache):
+    def __init__(self, max_entradas=1000, max_bytes=64 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._tags_de = {}
+        self._claves_de = {}
+        self._bytes = 0
+        self._version = 0
+        self._invalidada = 0.0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if entrada.expira < time.monotonic():
+                self._quitar(clave)
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada
+
+    def guardar(self, clave, entrada, tags, version):
+        if len(entrada.cuerpo) > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = entrada
+            self._bytes += len(entrada.cuerpo)
+            self._tags_de[clave] = tags
+            for tag in tags:
+                self._claves_de.setdefault(tag, set()).add(clave)
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave)
+        self._bytes -= len(entrada.cuerpo)
+        for tag in self._tags_de.pop(clave, ()):
+            claves = self._claves_de.get(tag)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._claves_de[tag]
+
+    def invalidar(self, tags):
+        with self._lock:
+            self._version += 1
+            self._invalidada = time.time()
+            for tag in tags:
+                for clave in list(self._claves_de.get(tag, ())):
+                    self._quitar(clave)
+
+    def version(self):
+        return self._version
+
+    def ultima_invalidacion(self):
+        return self._invalidada
+
+    def limpiar(self):
+        with self._lock:
+            self._version += 1
+            self._invalidada = time.time()
+            self._entradas.clear()
+            self._tags_de.clear()
+            self._claves_de.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+# Backend compartido entre workers; el límite de memoria lo fija maxmemory del servidor Redis
+class CacheRedis(BackendCache):
+    def __init__(self, url, prefijo='inventario:cache:'):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requiere el paquete redis")
+        self.cliente = redis.Redis.from_url(url)
+        self.prefijo = prefijo
+
+    def obtener(self, clave):
+        valor = self.cliente.get(self.prefijo + clave)
+        if valor is None:
+            return None
+        # La expiración la maneja Redis con el TTL de la clave
+        datos = json.loads(valor)
+        return EntradaCache(base64.b64decode(datos['cuerpo']), datos['status'], datos['mimetype'], None)
+
+    def guardar(self, clave, entrada, tags, version):
+        if version != self.version():
+            return
+        ttl = max(1, int(entrada.expira - time.monotonic()))
+        valor = json.dumps({
+            'cuerpo': base64.b64encode(entrada.cuerpo).decode('ascii'),
+            'status': entrada.status,
+            'mimetype': entrada.mimetype,
+        })
+        with self.cliente.pipeline() as pipe:
+            pipe.set(self.prefijo + clave, valor, ex=ttl)
+            for tag in tags:
+                pipe.sadd(f'{self.prefijo}tag:{tag}', clave)
+                pipe.expire(f'{self.prefijo}tag:{tag}', ttl * 2)
+            pipe.execute()
+
+    def invalidar(self, tags):
+        self.cliente.incr(self.prefijo + 'version')
+        self.cliente.set(self.prefijo + 'invalidada', time.time())
+        for tag in tags:
+            clave_tag = f'{self.prefijo}tag:{tag}'
+            claves = self.cliente.smembers(clave_tag)
+            with self.cliente.pipeline() as pipe:
+                for clave in claves:
+                    pipe.delete(self.prefijo + clave.decode('utf-8'))
+                pipe.delete(clave_tag)
+                pipe.execute()
+
+    def version(self):
+        return int(self.cliente.get(self.prefijo + 'version') or 0)
+
+    def ultima_invalidacion(self):
+        return float(self.cliente.get(self.prefijo + 'invalidada') or 0)
+
+    def limpiar(self):
+        self.cliente.incr(self.prefijo + 'version')
+        for clave in self.cliente.scan_iter(self.prefijo + '*'):
+            if not clave.endswith(b'version'):
+                self.cliente.delete(clave)
+        self.cliente.set(self.prefijo + 'invalidada', time.time())
+
+_estado = {'backend': None}
+
+def backend_actual():
+    return _estado['backend']
+
+def _crear_backend(app):
+    nombre = app.config.get('CACHE_BACKEND', 'memoria')
+    if nombre == 'memoria':
+        return CacheMemoria(app.config.get('CACHE_MAX_ENTRADAS', 1000), app.config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    if nombre == 'redis':
+        return CacheRedis(app.config['CACHE_REDIS_URL'])
+    # Cualquier otra implementación de BackendCache como "modulo:Clase"
+    modulo, clase = nombre.split(':')
+    return getattr(importlib.import_module(modulo), clase)(app)
+
+# Tags de un cambio confirmado. Las entradas filtradas por sucursal llevan
+# "sucursal:<id>:tipo:<tipo>" y "tipo:<tipo>:sucursales"; las demás "tipo:<tipo>"
+def tags_de_cambio(cambio):
+    tipo = cambio['tipo']
+    if cambio['id_sucursal'] is None:
+        return {f'tipo:{tipo}', f'tipo:{tipo}:sucursales'}
+    return {f'tipo:{tipo}', f"sucursal:{cambio['id_sucursal']}:tipo:{tipo}"}
+
+def _invalidar_cambios(cambios):
+    backend = backend_actual()
+    if backend is None:
+        return
+    tags = set()
+    for cambio in cambios:
+        tags |= tags_de_cambio(cambio)
+        CACHE_INVALIDACIONES.incrementar(cambio['tipo'])
+    backend.invalidar(tags)
+
+# Alcance de la clave para un usuario; el modo asíncrono lo calcula con el usuario que ya cargó
+def alcance_de(usuario, por_usuario=False):
+    if por_usuario:
+        return usuario.sucursal_activa, usuario.id_rol, usuario.id
+    return usuario.sucursal_activa, usuario.id_rol
+
+def _alcance(por_usuario=False):
+    from .models import Usuario
+
+    usuario = Usuario.query.get(get_jwt_identity())
+    if usuario is None:
+        return None
+    return alcance_de(usuario, por_usuario)
+
+# `argumentos` son pares (nombre, valor); Flask y el modo asíncrono generan la misma clave
+def clave_cache(ruta, argumentos, alcance):
+    argumentos = '&'.join(f'{k}={v}' for k, v in sorted(argumentos))
+    return f'{ruta}?{argumentos}|{alcance}'
+
+def _clave(alcance):
+    return clave_cache(request.path, request.args.items(multi=True), alcance)
+
+def tags_de_respuesta(tipos, por_sucursal, alcance):
+    if por_sucursal:
+        return {f'sucursal:{alcance[0]}:tipo:{t}' for t in tipos} | {f'tipo:{t}:sucursales' for t in tipos}
+    return {f'tipo:{t}' for t in tipos}
+
+# Una réplica puede no tener todavía la escritura que causó la última invalidación: lo
+# leído de ella dentro de la ventana de retraso no se guarda, porque duraría hasta el TTL.
+# Si el backend no registra invalidaciones, no se guarda nada leído de una réplica
+def _replica_atrasada(backend):
+    if not leyo_de_replica():
+        return False
+    invalidada = backend.ultima_invalidacion()
+    return invalidada is None or time.time() - invalidada < ventana_retraso()
+
+# Cachea las respuestas 200 de un GET. La clave incluye ruta, parámetros y,
+# salvo en rutas públicas, la sucursal activa y el rol del usuario; con
+# `por_usuario` también el usuario, para respuestas que dependen de quién pide.
+# La caché se consulta antes de la vista: los permisos que dependan de la
+# petición deben comprobarse antes de llamar a la función cacheada
+def cacheado(*tipos, por_sucursal=False, publico=False, por_usuario=False):
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            backend = backend_actual()
+            if backend is None:
+                return vista(*args, **kwargs)
+
+            alcance = None if publico else _alcance(por_usuario)
+            if alcance is None and not publico:
+                return vista(*args, **kwargs)
+
+            clave = _clave(alcance)
+            entrada = backend.obtener(clave)
+            if entrada is not None:
+                CACHE_PETICIONES.incrementar(request.endpoint, 'hit')
+                respuesta = Response(entrada.cuerpo, status=entrada.status, mimetype=entrada.mimetype)
+                respuesta.headers['X-Cache'] = 'HIT'
+                return respuesta
+
+            CACHE_PETICIONES.incrementar(request.endpoint, 'miss')
+            version = backend.version()
+            respuesta = make_response(vista(*args, **kwargs))
+            if respuesta.status_code == 200 and not respuesta.is_streamed and not _replica_atrasada(backend):
+                ttl = current_app.config.get('CACHE_TTL', 30)
+                backend.guardar(clave, EntradaCache(
+                    respuesta.get_data(), respuesta.status_code, respuesta.mimetype, time.monotonic() + ttl
+                ), tags_de_respuesta(tipos, por_sucursal, alcance), version)
+            respuesta.headers['X-Cache'] = 'MISS'
+            return respuesta
+        # Las opciones quedan en la vista (y en los decoradores externos, vía wraps)
+        # para que el modo asíncrono cachee sus rutas con la misma clave y tags
+        envoltura.opciones_cache = (tipos, por_sucursal, publico, por_usuario)
+        return envoltura
+    return decorador
+
+def init_cache(app):
+    if not app.config.get('CACHE_ENABLED'):
+        _estado['backend'] = None
+        return
+    _estado['backend'] = _crear_backend(app)
+    al_confirmar(_invalidar_cambios)
+    logger.info("Caché de respuestas activa (%s)", app.config.get('CACHE_BACKEND', 'memoria'))
@@ -0,0 +1,236 @@
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import delete, event, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import db
+from .models import (
+    RegistroCambio, CambioPendiente, SecuenciaCambios, InventarioGeneral, EquipoComputacional, Celular, Impresora, Consumible,
+    HistorialMovimiento, Usuario, Area, Sucursal
+)
+from .shards import activo as sharding_activo, engine_de_nombre, nombres_shards, shard_actual
+from .trabajos import periodica
+
+logger = logging.getLogger(__name__)
+
+# Entidad publicada en el registro de cambios para cada modelo sincronizado
+ENTIDADES = {
+    InventarioGeneral: 'inventario',
+    EquipoComputacional: 'equipos',
+    Celular: 'celulares',
+    Impresora: 'impresoras',
+    Consumible: 'consumibles',
+}
+
+# Entidades que se notifican a los oyentes pero no van al registro de sincronización
+SOLO_NOTIFICAR = {
+    HistorialMovimiento: 'historial',
+}
+
+# Entidades que otras respuestas muestran por nombre (el listado de /inventario/). Sus
+# cambios solo invalidan la caché: no van al registro de sincronización ni a los eventos.
+# Se registran bajas y cambios de las columnas mostradas; un alta no aparece en ningún listado
+REFERENCIAS = {
+    Usuario: ('usuarios', 'Usuario', ('usuario', 'nombre')),
+    Area: ('areas', 'Area', ('nombre_area',)),
+    Sucursal: ('sucursales', 'Sucursal', ('nombre_sucursal', 'direccion', 'region')),
+}
+SOLO_CACHE = frozenset(entidad for entidad, _, _ in REFERENCIAS.values())
+
+# Tipo de equipo en inventario_general de cada tabla de detalle
+TIPOS_DETALLE = {
+    EquipoComputacional: 'Computacional',
+    Celular: 'Celular',
+    Impresora: 'Impresora',
+}
+
+# Funciones llamadas con la lista de cambios después de cada commit
+_oyentes = []
+
+def al_confirmar(funcion):
+    if funcion not in _oyentes:
+        _oyentes.append(funcion)
+    return funcion
+
+def _id_entidad(obj):
+    return inspect(obj).mapper.primary_key_from_instance(obj)[0]
+
+def _sucursal_anterior(obj, atributo):
+    historia = inspect(obj).attrs[atributo].history
+    return historia.deleted[0] if historia.deleted else None
+
+# Sucursal de cada equipo presente en la sesión, para ubicar los cambios de las tablas de detalle
+def _sucursales_inventario(session):
+    sucursales = {}
+    for obj in list(session.identity_map.values()) + list(session.new) + list(session.deleted):
+        if isinstance(obj, InventarioGeneral):
+            sucursales[(obj.tipo_equipo, obj.id_registro)] = obj.id_sucursal_ubicacion
+    return sucursales
+
+def _cambios_de(session):
+    sucursales = None
+    cambios = []
+    for operacion, objetos in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objetos:
+            referencia = REFERENCIAS.get(type(obj))
+            if referencia is not None:
+                entidad, tipo, columnas = referencia
+                if operacion == 'insert' or (operacion == 'update' and not any(
+                    inspect(obj).attrs[c].history.has_changes() for c in columnas
+                )):
+                    continue
+                cambios.append({'entidad': entidad, 'id_entidad': _id_entidad(obj), 'tipo': tipo,
+                                'operacion': operacion, 'id_sucursal': None})
+                continue
+
+            entidad = ENTIDADES.get(type(obj)) or SOLO_NOTIFICAR.get(type(obj))
+            if entidad is None:
+                continue
+            if operacion == 'update' and not session.is_modified(obj, include_collections=False):
+                continue
+
+            if isinstance(obj, InventarioGeneral):
+                atributo, id_sucursal, tipo = 'id_sucursal_ubicacion', obj.id_sucursal_ubicacion, obj.tipo_equipo
+            elif isinstance(obj, Consumible):
+                atributo, id_sucursal, tipo = 'id_sucursal_stock', obj.id_sucursal_stock, 'Consumible'
+            else:
+                if sucursales is None:
+                    sucursales = _sucursales_inventario(session)
+                atributo = None
+                if isinstance(obj, HistorialMovimiento):
+                    clave, tipo = (obj.tipo_equipo, obj.id_equipo), 'Historial'
+                else:
+                    clave = (TIPOS_DETALLE[type(obj)], _id_entidad(obj))
+                    tipo = clave[0]
+                id_sucursal = sucursales.get(clave)
+
+            id_entidad = _id_entidad(obj)
+            # Si cambió de sucursal, para la sucursal de origen el registro desaparece
+            if operacion == 'update' and atributo:
+                anterior = _sucursal_anterior(obj, atributo)
+                if anterior is not None and anterior != id_sucursal:
+                    cambios.append({'entidad': entidad, 'id_entidad': id_entidad, 'tipo': tipo,
+                                    'operacion': 'delete', 'id_sucursal': anterior})
+
+            cambios.append({'entidad': entidad, 'id_entidad': id_entidad, 'tipo': tipo,
+                            'operacion': operacion, 'id_sucursal': id_sucursal})
+    return cambios
+
+def _after_flush(session, flush_context):
+    cambios = _cambios_de(session)
+    if not cambios:
+        return
+
+    fecha = datetime.utcnow()
+    filas = [dict(c, fecha=fecha) for c in cambios]
+    registrables = [
+        {k: v for k, v in f.items() if k != 'tipo'}
+        for f in filas if f['entidad'] in ENTIDADES.values()
+    ]
+    # Misma conexión y transacción que los datos (el shard, con sharding): los cambios se
+    # confirman o revierten con ellos. Su seq se asigna al trasladarlos, después del commit
+    if registrables:
+        session.connection(bind_arguments={'mapper': CambioPendiente}).execute(
+            CambioPendiente.__table__.insert(), registrables
+        )
+        session.info['_pendientes'] = shard_actual() if sharding_activo() else None
+    session.info.setdefault('_cambios', []).extend(filas)
+
+# Un traslado a la vez por origen (base global o shard) dentro del proceso
+_locks_traslado = {}
+_lock_locks = threading.Lock()
+
+def _lock_traslado(nombre):
+    with _lock_locks:
+        return _locks_traslado.setdefault(nombre, threading.Lock())
+
+# La fila se crea en el primer traslado del proceso (las tablas se crean después de init_cambios)
+_secuencia = {'lista': False}
+
+def _asegurar_secuencia():
+    if _secuencia['lista']:
+        return
+    with db.engines[None].begin() as conn:
+        if conn.execute(select(SecuenciaCambios.id).where(SecuenciaCambios.id == 1)).first() is None:
+            try:
+                conn.execute(insert(SecuenciaCambios).values(id=1, traslados=0))
+            except IntegrityError:  # otro proceso la creó a la vez
+                pass
+    _secuencia['lista'] = True
+
+# Toma el bloqueo de secuencia_cambios antes de insertar: hasta el commit ningún otro
+# traslado asigna seq, así que cuando un seq es visible todos los menores ya lo son.
+# El cursor de /api/sync/ puede avanzar hasta el último seq leído sin saltarse nada
+def _registrar(conn, filas):
+    columnas = [c.name for c in RegistroCambio.__table__.columns if c.name != 'seq']
+    bloqueo = conn.execute(
+        update(SecuenciaCambios).where(SecuenciaCambios.id == 1).values(traslados=SecuenciaCambios.traslados + 1)
+    )
+    if bloqueo.rowcount == 0:
+        raise RuntimeError("Falta la fila de secuencia_cambios")
+    conn.execute(RegistroCambio.__table__.insert(), [{c: f[c] for c in columnas} for f in filas])
+
+# Pasa los cambios pendientes de la base global (`nombre` None) o de un shard a
+# registro_cambios. Sin sharding es una sola transacción. Desde un shard, primero se
+# confirman en la base global y después se borran del shard: si el proceso cae entre
+# ambos pasos se vuelven a trasladar (duplicados, nunca perdidos). FOR UPDATE serializa
+# los traslados de varios procesos sobre el mismo origen
+def trasladar_pendientes(nombre=None, lote=1000):
+    pendientes = CambioPendiente.__table__
+    origen = db.engines[None] if nombre is None else engine_de_nombre(db, nombre)
+    total = 0
+    _asegurar_secuencia()
+    with _lock_traslado(nombre):
+        while True:
+            with origen.begin() as conn:
+                filas = conn.execute(
+                    select(pendientes).order_by(pendientes.c.id).limit(lote).with_for_update()
+                ).mappings().all()
+                if not filas:
+                    return total
+                if nombre is None:
+                    _registrar(conn, filas)
+                else:
+                    with db.engines[None].begin() as conn_global:
+                        _registrar(conn_global, filas)
+                conn.execute(delete(pendientes).where(pendientes.c.id.in_([f['id'] for f in filas])))
+            total += len(filas)
+            if len(filas) < lote:
+                return total
+
+# Lo que quedó sin trasladar (p. ej. por una caída entre el commit y el traslado)
+@periodica
+def trasladar_todos_los_pendientes():
+    for nombre in nombres_shards() if sharding_activo() else [None]:
+        trasladados = trasladar_pendientes(nombre)
+        if trasladados:
+            logger.info("%d cambios pendientes trasladados desde %s", trasladados, nombre or 'la base global')
+
+def _after_commit(session):
+    if '_pendientes' in session.info:
+        origen = session.info.pop('_pendientes')
+        # Antes de notificar: un cliente avisado por SSE puede pedir /api/sync/ enseguida
+        try:
+            trasladar_pendientes(origen)
+        except Exception:
+            logger.exception("Error trasladando los cambios pendientes de %s", origen or 'la base global')
+
+    cambios = session.info.pop('_cambios', None)
+    if not cambios:
+        return
+    for oyente in _oyentes:
+        try:
+            oyente(cambios)
+        except Exception:
+            logger.exception("Error notificando cambios confirmados")
+
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('_cambios', None)
+    session.info.pop('_pendientes', None)
+
+def init_cambios(app):
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_soft_rollback', _after_soft_rollback)
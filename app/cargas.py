@@ -0,0 +1,140 @@
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, lazyload, raiseload, selectinload, with_parent
+from . import db
+from .models import (
+    InventarioGeneral, EquipoComputacional, Celular, Impresora, Usuario, Consumible,
+    EquipoComputacionalSchema, CelularSchema, ImpresoraSchema, RELACIONES_DETALLE
+)
+from .fieldsets import campos_inventario
+
+# Cargas por lotes: en vez de un .get() por fila, una consulta IN por modelo.
+# Las listas de ids se parten para no superar el límite de parámetros de SQLite (999)
+TAMANO_IN = 500
+
+MODELOS_DETALLE = {
+    'Computacional': EquipoComputacional,
+    'Celular': Celular,
+    'Impresora': Impresora,
+}
+
+SCHEMAS_DETALLE = {
+    'Computacional': EquipoComputacionalSchema(),
+    'Celular': CelularSchema(),
+    'Impresora': ImpresoraSchema(),
+}
+
+ESTRATEGIAS = {
+    'select': lazyload,
+    'joined': joinedload,
+    'selectin': selectinload,
+    'raise': raiseload,
+}
+
+# Perfiles de carga de relaciones por endpoint. select es la carga perezosa (una consulta
+# por fila al acceder), joined agrega un JOIN a la consulta principal, selectin trae la
+# relación de todo el resultado con una consulta IN y raise hace fallar el acceso en vez
+# de consultar fila por fila. Los detalles viven en la misma base (o shard) que el
+# inventario y admiten JOIN; usuarios, áreas y sucursales pueden estar en la base global,
+# así que van con selectin
+_DETALLES = {relacion: 'joined' for relacion in RELACIONES_DETALLE.values()}
+
+PERFILES = {
+    'inventario_listado': (InventarioGeneral, dict({
+        'usuario_responsable': 'selectin',
+        'area_responsable': 'selectin',
+        'sucursal': 'selectin',
+    }, **_DETALLES)),
+    'inventario_detalles': (InventarioGeneral, _DETALLES),
+    # Los serializadores de estos listados no usan relaciones: ninguna debe cargarse
+    'usuarios_listado': (Usuario, {'sucursal': 'raise', 'equipos_asignados': 'raise'}),
+    'consumibles_listado': (Consumible, {'sucursal': 'raise'}),
+}
+
+# Opciones de consulta de un perfil; con `relaciones`, las que no estén incluidas
+# quedan en raise: el endpoint no las pidió y no debería tocarlas
+def perfil(nombre, relaciones=None):
+    modelo, estrategias = PERFILES[nombre]
+    return [
+        ESTRATEGIAS[estrategia if relaciones is None or relacion in relaciones else 'raise'](getattr(modelo, relacion))
+        for relacion, estrategia in estrategias.items()
+    ]
+
+def _tramos(ids):
+    ids = sorted(set(ids))
+    for inicio in range(0, len(ids), TAMANO_IN):
+        yield ids[inicio:inicio + TAMANO_IN]
+
+# Registros de `modelo` por clave primaria: {id: registro}. `query` permite
+# partir de una consulta con opciones propias (p. ej. solo_columnas)
+def por_id(modelo, ids, columna=None, query=None):
+    columna = columna if columna is not None else modelo.__mapper__.primary_key[0]
+    query = query if query is not None else db.session.query(modelo)
+    registros = {}
+    for tramo in _tramos(i for i in ids if i is not None):
+        for registro in query.filter(columna.in_(tramo)):
+            registros[getattr(registro, columna.key)] = registro
+    return registros
+
+# Detalles de filas de inventario ya cargadas, una consulta IN por tipo: {(tipo, id_registro): detalle}.
+# Para consultas nuevas conviene el perfil 'inventario_detalles' (un LEFT JOIN por tipo en la misma consulta)
+def cargar_detalles(items):
+    ids = {}
+    for item in items:
+        if item.tipo_equipo in MODELOS_DETALLE:
+            ids.setdefault(item.tipo_equipo, []).append(item.id_registro)
+    detalles = {}
+    for tipo, registros in ids.items():
+        for id_registro, detalle in por_id(MODELOS_DETALLE[tipo], registros).items():
+            detalles[(tipo, id_registro)] = detalle
+    return detalles
+
+# Filas de inventario por (tipo, id_registro): {(tipo, id_registro): item}
+def inventario_por_registro(pares):
+    ids = {}
+    for tipo, id_registro in pares:
+        ids.setdefault(tipo, []).append(id_registro)
+    items = {}
+    for tipo, registros in ids.items():
+        for tramo in _tramos(registros):
+            for item in InventarioGeneral.query.filter(
+                InventarioGeneral.tipo_equipo == tipo, InventarioGeneral.id_registro.in_(tramo)
+            ):
+                items[(tipo, item.id_registro)] = item
+    return items
+
+# Mismo formato que GET /inventario/<id>, /api/celulares/<id> y /api/impresoras/<id>
+def combinar(item, detalle):
+    datos = SCHEMAS_DETALLE[item.tipo_equipo].dump(detalle)
+    datos.update(campos_inventario(item))
+    return datos
+
+# Equipos a cargo de `usuario` con su detalle: la relación equipos_asignados filtra por
+# el índice de id_usuario_responsable y los detalles llegan en la misma consulta, con
+# un LEFT JOIN por tipo (perfil 'inventario_detalles')
+def equipos_asignados(usuario, estado=None):
+    query = InventarioGeneral.query.options(*perfil('inventario_detalles')).filter(
+        with_parent(usuario, Usuario.equipos_asignados)
+    )
+    if estado is not None:
+        query = query.filter(InventarioGeneral.estado == estado)
+    equipos = []
+    for item in query.order_by(InventarioGeneral.id_inventario):
+        detalle = item.detalle
+        if detalle is not None:
+            equipos.append(dict(combinar(item, detalle), tipo_equipo=item.tipo_equipo, id_registro=item.id_registro))
+    return equipos
+
+# Con CARGAS_ESTRICTAS (pensado para pruebas) toda consulta ORM se comporta como si
+# las relaciones tuvieran lazy='raise': una carga perezosa olvidada falla en vez de
+# convertirse en una consulta por fila. Las opciones explícitas de un perfil prevalecen
+def _cargas_estrictas(estado):
+    if not (estado.is_select and has_app_context() and current_app.config.get('CARGAS_ESTRICTAS')):
+        return
+    if estado.is_column_load or estado.is_relationship_load:
+        return
+    estado.statement = estado.statement.options(raiseload('*'))
+
+def init_cargas(app):
+    if app.config.get('CARGAS_ESTRICTAS') and not event.contains(Session, 'do_orm_execute', _cargas_estrictas):
+        event.listen(Session, 'do_orm_execute', _cargas_estrictas)
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+from sqlalchemy import case, event, func, inspect
+from sqlalchemy.orm import Session
+from .models import InventarioGeneral, TransicionEstado
+from .cargas import perfil
+from .shards import en_todos_los_shards
+
+ESTADOS = tuple(InventarioGeneral.estado.type.enums)
+
+# Transiciones permitidas del ciclo de vida; DeBaja es terminal
+TRANSICIONES = {
+    'SinAsignar': {'Asignado', 'EnReparacion', 'DeBaja'},
+    'Asignado': {'SinAsignar', 'EnReparacion', 'DeBaja'},
+    'EnReparacion': {'SinAsignar', 'Asignado', 'DeBaja'},
+    'DeBaja': set(),
+}
+
+# Cortes de antigüedad (días) del resumen por estado
+UMBRALES_DIAS = (7, 30, 90)
+
+class TransicionInvalida(ValueError):
+    pass
+
+# Mensaje de error si `anterior` -> `nuevo` no está permitida, o None. Las rutas lo
+# consultan antes de modificar nada para responder 400; el flush lo vuelve a comprobar
+def transicion_invalida(anterior, nuevo):
+    if nuevo not in ESTADOS:
+        return f"Estado inválido: {nuevo}. Opciones: {', '.join(ESTADOS)}"
+    if anterior is None or anterior == nuevo or nuevo in TRANSICIONES[anterior]:
+        return None
+    return f"Transición de estado no permitida: {anterior} -> {nuevo}"
+
+# Antes de cada flush: valida los cambios de estado de inventario_general, actualiza
+# fecha_estado y agrega la transición a la sesión, que se escribe en el mismo flush
+# (y la misma transacción) que el equipo. Cubre altas, PUT y cualquier otro camino del ORM
+def _antes_del_flush(session, flush_context, instancias):
+    ahora = datetime.utcnow()
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, InventarioGeneral):
+            continue
+        if obj in session.new:
+            if obj.estado is None:
+                obj.estado = 'SinAsignar'
+            anterior = None
+        else:
+            historia = inspect(obj).attrs.estado.history
+            if not historia.has_changes():
+                continue
+            anterior = historia.deleted[0] if historia.deleted else None
+            if anterior == obj.estado:
+                continue
+        error = transicion_invalida(anterior, obj.estado)
+        if error:
+            raise TransicionInvalida(error)
+        # Un alta puede traer su propia fecha_estado (importaciones de datos históricos)
+        if anterior is not None or obj.fecha_estado is None:
+            obj.fecha_estado = ahora
+        session.add(TransicionEstado(
+            inventario=obj, estado_anterior=anterior, estado_nuevo=obj.estado, fecha=obj.fecha_estado
+        ))
+
+# Equipos en `estado` desde hace más de `dias`, los más antiguos primero. Filtro y orden
+# salen del índice (estado, fecha_estado); los detalles llegan con JOIN por tipo
+def _estancados(estado, dias, limite, ahora):
+    query = InventarioGeneral.query.options(*perfil('inventario_detalles')).filter(
+        InventarioGeneral.estado == estado,
+        InventarioGeneral.fecha_estado < ahora - timedelta(days=dias)
+    ).order_by(InventarioGeneral.fecha_estado, InventarioGeneral.id_inventario).limit(limite)
+    return [
+        {
+            "id_inventario": item.id_inventario,
+            "tipo_equipo": item.tipo_equipo,
+            "id_registro": item.id_registro,
+            "codigo_interno": item.detalle.codigo_interno if item.detalle is not None else None,
+            "estado": item.estado,
+            "fecha_estado": item.fecha_estado.isoformat(),
+            "dias_en_estado": (ahora - item.fecha_estado).days,
+            "id_usuario_responsable": item.id_usuario_responsable,
+            "id_sucursal_ubicacion": item.id_sucursal_ubicacion,
+        }
+        for item in query
+    ]
+
+# Con sharding cada shard aporta sus `limite` más antiguos y se toman los primeros del total
+def estancados(estado, dias, limite):
+    ahora = datetime.utcnow()
+    equipos = [e for parcial in en_todos_los_shards(lambda: _estancados(estado, dias, limite, ahora)) for e in parcial]
+    equipos.sort(key=lambda e: (e['fecha_estado'], e['id_inventario']))
+    return equipos[:limite]
+
+# Por estado: cantidad de equipos, el ingreso más antiguo al estado y cuántos llevan
+# más de cada umbral. Una consulta agregada que se resuelve recorriendo solo el índice
+def _antiguedad(ahora):
+    columnas = [
+        func.sum(case((InventarioGeneral.fecha_estado < ahora - timedelta(days=dias), 1), else_=0))
+        for dias in UMBRALES_DIAS
+    ]
+    filas = InventarioGeneral.query.with_entities(
+        InventarioGeneral.estado, func.count(), func.min(InventarioGeneral.fecha_estado), *columnas
+    ).group_by(InventarioGeneral.estado)
+    return [(estado, total, desde, [int(c or 0) for c in cantidades]) for estado, total, desde, *cantidades in filas]
+
+def antiguedad_por_estado():
+    ahora = datetime.utcnow()
+    resumen = {}
+    for parcial in en_todos_los_shards(lambda: _antiguedad(ahora)):
+        for estado, total, desde, cantidades in parcial:
+            acumulado = resumen.setdefault(estado, {'total': 0, 'desde': None, 'cantidades': [0] * len(UMBRALES_DIAS)})
+            acumulado['total'] += total
+            if desde is not None and (acumulado['desde'] is None or desde < acumulado['desde']):
+                acumulado['desde'] = desde
+            acumulado['cantidades'] = [a + c for a, c in zip(acumulado['cantidades'], cantidades)]
+    return {
+        estado: {
+            "total": datos['total'],
+            "en_estado_desde": datos['desde'].isoformat() if datos['desde'] else None,
+            **{f"mas_de_{dias}_dias": c for dias, c in zip(UMBRALES_DIAS, datos['cantidades'])},
+        }
+        for estado, datos in sorted(resumen.items(), key=lambda par: par[0] or '')
+    }
+
+# Transiciones de un equipo en orden, con la duración de cada estado (la del último,
+# hasta ahora). Usa el índice (id_inventario, fecha)
+def transiciones(id_inventario):
+    filas = TransicionEstado.query.filter_by(id_inventario=id_inventario).order_by(
+        TransicionEstado.fecha, TransicionEstado.id
+    ).all()
+    ahora = datetime.utcnow()
+    resultado = []
+    for actual, siguiente in zip(filas, filas[1:] + [None]):
+        hasta = siguiente.fecha if siguiente is not None else ahora
+        resultado.append({
+            "estado_anterior": actual.estado_anterior,
+            "estado_nuevo": actual.estado_nuevo,
+            "fecha": actual.fecha.isoformat(),
+            "segundos_en_estado": int((hasta - actual.fecha).total_seconds()),
+        })
+    return resultado
+
+def init_ciclo_vida(app):
+    if not event.contains(Session, 'before_flush', _antes_del_flush):
+        event.listen(Session, 'before_flush', _antes_del_flush)
@@ -0,0 +1,58 @@
+import gzip
+from flask import request
+from .instrumentation import medir
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se negocia gzip
+    brotli = None
+
+TIPOS_COMPRIMIBLES = ('application/json', 'text/')
+
+def _elegir_codificacion(aceptadas):
+    if brotli and aceptadas['br'] > 0 and aceptadas['br'] >= aceptadas['gzip']:
+        return 'br'
+    if aceptadas['gzip'] > 0:
+        return 'gzip'
+    return None
+
+# Comprime un cuerpo según Accept-Encoding; devuelve (codificación, datos) o None si
+# es chico o el cliente no acepta ninguna. Lo usan el after_request y el modo asíncrono
+def comprimir_cuerpo(config, datos, aceptadas):
+    if not config.get('COMPRESSION_ENABLED', True) or len(datos) < config.get('COMPRESSION_MIN_BYTES', 1024):
+        return None
+    codificacion = _elegir_codificacion(aceptadas)
+    if not codificacion:
+        return None
+
+    with medir('compresion'):
+        if codificacion == 'br':
+            return codificacion, brotli.compress(datos, quality=config.get('COMPRESSION_BROTLI_QUALITY', 4))
+        return codificacion, gzip.compress(datos, compresslevel=config.get('COMPRESSION_GZIP_LEVEL', 6))
+
+def init_compresion(app):
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+
+    minimo = app.config.get('COMPRESSION_MIN_BYTES', 1024)
+
+    @app.after_request
+    def comprimir(response):
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(TIPOS_COMPRIMIBLES)):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if response.content_length is not None and response.content_length < minimo:
+            return response
+
+        comprimido = comprimir_cuerpo(app.config, response.get_data(), request.accept_encodings)
+        if comprimido is None:
+            return response
+
+        codificacion, datos = comprimido
+        response.set_data(datos)
+        response.headers['Content-Encoding'] = codificacion
+        return response
@@ -8,3 +8,150 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-for-development'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+
+    # Pool de conexiones por proceso: debe cubrir los hilos de cada worker
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+        'pool_pre_ping': True,
+        'pool_recycle': 3600
+    }
+
+    # Modo asíncrono (ASGI): si no se define, se deriva de SQLALCHEMY_DATABASE_URI
+    ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URL')
+    ASYNC_POOL_SIZE = int(os.environ.get('ASYNC_POOL_SIZE', 20))
+    ASYNC_MAX_OVERFLOW = int(os.environ.get('ASYNC_MAX_OVERFLOW', 80))
+
+    # Logging estructurado (JSON) a través de una cola para no bloquear las peticiones
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    # Fracción de mensajes repetitivos (por fila o por petición) que se registran
+    LOG_MUESTREO = float(os.environ.get('LOG_MUESTREO', 0.1))
+    # Registros en espera por handler; si el destino no da abasto se descartan los que no caben
+    LOG_COLA_MAXIMA = int(os.environ.get('LOG_COLA_MAXIMA', 10000))
+
+    # Instrumentación por petición (Server-Timing y /metrics)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    # Veces que puede repetirse una sentencia en una petición antes de marcarla como N+1
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))
+
+    # Registro de consultas lentas (opcional)
+    SLOW_QUERY_ENABLED = os.environ.get('SLOW_QUERY_ENABLED', '0') == '1'
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 500))
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', '0') == '1'
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', 'logs/slow_queries.log')
+    SLOW_QUERY_MAX_BYTES = int(os.environ.get('SLOW_QUERY_MAX_BYTES', 10 * 1024 * 1024))
+    SLOW_QUERY_BACKUPS = int(os.environ.get('SLOW_QUERY_BACKUPS', 5))
+
+    # Compresión de respuestas (gzip, o brotli si está instalado)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', '1') == '1'
+    COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+    # Sincronización incremental (GET /api/sync?since=)
+    SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 500))
+    SYNC_PAGE_MAX = int(os.environ.get('SYNC_PAGE_MAX', 5000))
+    # Segundos durante los que la revocación de tokens vuelve a leer sus filas más recientes,
+    # por si un id menor todavía no estaba confirmado
+    SYNC_MARGEN_SEGUNDOS = float(os.environ.get('SYNC_MARGEN_SEGUNDOS', 2))
+
+    # Canal de eventos (SSE) por sucursal
+    # Cada stream ocupa un hilo del worker mientras dura: por defecto, la mitad de los
+    # hilos de gunicorn (GUNICORN_THREADS), para que los demás sigan atendiendo la API
+    SSE_MAX_SUSCRIPTORES = int(os.environ.get(
+        'SSE_MAX_SUSCRIPTORES', max(1, int(os.environ.get('GUNICORN_THREADS', 4)) // 2)
+    ))
+    # Eventos pendientes por suscriptor antes de descartarlos y pedirle un resync
+    SSE_COLA_MAXIMA = int(os.environ.get('SSE_COLA_MAXIMA', 100))
+    SSE_LATIDO_SEGUNDOS = float(os.environ.get('SSE_LATIDO_SEGUNDOS', 15))
+
+    # Caché de respuestas de los GET (memoria, redis o "modulo:Clase")
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', '0') == '1'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memoria')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 30))
+    CACHE_MAX_ENTRADAS = int(os.environ.get('CACHE_MAX_ENTRADAS', 1000))
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Réplicas de lectura: URIs separadas por comas; los GET leen de ellas
+    SQLALCHEMY_REPLICA_URIS = [u.strip() for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip()]
+    # Segundos que las lecturas de un usuario van a la primaria después de que escribe
+    REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    # Segundos fuera de rotación de una réplica que falla antes de volver a probarla
+    REPLICA_RETRY_SECONDS = float(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+    # Endpoints GET que siempre leen de la primaria
+    REPLICA_EXCLUDED_ENDPOINTS = [e.strip() for e in os.environ.get('REPLICA_EXCLUDED_ENDPOINTS', 'sync.get_cambios').split(',') if e.strip()]
+
+    # Sharding por región (opcional): SHARD_URLS="norte=mysql+pymysql://...,sur=..."
+    # y SHARD_REGIONES="Region 1=norte,Region 2=sur"; una región sin shard va al primero
+    SHARD_URIS = dict(p.split('=', 1) for p in os.environ.get('SHARD_URLS', '').split(',') if '=' in p)
+    SHARD_REGIONES = dict(p.split('=', 1) for p in os.environ.get('SHARD_REGIONES', '').split(',') if '=' in p)
+    # Ids por shard: el shard i asigna ids entre i*SHARD_RANGO_IDS+1 y (i+1)*SHARD_RANGO_IDS
+    SHARD_RANGO_IDS = int(os.environ.get('SHARD_RANGO_IDS', 100_000_000))
+    # Hilos para las consultas que recorren todos los shards
+    SHARD_HILOS = int(os.environ.get('SHARD_HILOS', 8))
+
+    # Trabajos en segundo plano
+    # Con 1, cada proceso de la API ejecuta trabajos en sus propios hilos; con 0 se usa worker.py
+    TRABAJOS_EN_PROCESO = os.environ.get('TRABAJOS_EN_PROCESO', '1') == '1'
+    TRABAJOS_HILOS = int(os.environ.get('TRABAJOS_HILOS', 2))
+    TRABAJOS_INTERVALO = float(os.environ.get('TRABAJOS_INTERVALO', 2))
+    TRABAJOS_TIMEOUT = int(os.environ.get('TRABAJOS_TIMEOUT', 900))
+    TRABAJOS_DIR = os.environ.get('TRABAJOS_DIR', 'artefactos')
+
+    # Reportes precalculados por sucursal (por área, responsable y estado)
+    # Expresión cron "minuto hora día mes día_semana"; vacía desactiva la programación
+    REPORTES_CRON = os.environ.get('REPORTES_CRON', '')
+    # Cambios acumulados en una sucursal que disparan un reporte sin esperar al cron (0 desactiva)
+    REPORTES_UMBRAL_CAMBIOS = int(os.environ.get('REPORTES_UMBRAL_CAMBIOS', 200))
+    REPORTES_REVISION_SEGUNDOS = int(os.environ.get('REPORTES_REVISION_SEGUNDOS', 60))
+    REPORTES_DIR = os.environ.get('REPORTES_DIR', os.path.join('artefactos', 'reportes'))
+
+    # Idempotency-Key en las altas: tiempo que se guarda la respuesta y tiempo máximo
+    # que una petición en curso mantiene reservada su clave
+    IDEMPOTENCIA_TTL = int(os.environ.get('IDEMPOTENCIA_TTL', 86400))
+    IDEMPOTENCIA_BLOQUEO_SEGUNDOS = int(os.environ.get('IDEMPOTENCIA_BLOQUEO_SEGUNDOS', 60))
+    IDEMPOTENCIA_PURGA_SEGUNDOS = int(os.environ.get('IDEMPOTENCIA_PURGA_SEGUNDOS', 300))
+
+    # Límites de peticiones: balde de fichas por usuario (JWT) y por IP. Las sucursales
+    # suelen salir a internet por una sola IP, por eso su balde es más grande
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memoria')
+    RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/1')
+    RATE_LIMIT_USUARIO_POR_SEGUNDO = float(os.environ.get('RATE_LIMIT_USUARIO_POR_SEGUNDO', 20))
+    RATE_LIMIT_USUARIO_RAFAGA = float(os.environ.get('RATE_LIMIT_USUARIO_RAFAGA', 100))
+    RATE_LIMIT_IP_POR_SEGUNDO = float(os.environ.get('RATE_LIMIT_IP_POR_SEGUNDO', 100))
+    RATE_LIMIT_IP_RAFAGA = float(os.environ.get('RATE_LIMIT_IP_RAFAGA', 400))
+    # Fichas que consume cada petición a las rutas caras (el resto consume 1)
+    RATE_LIMIT_COSTOS = {k: float(v) for k, v in (
+        p.split('=', 1) for p in os.environ.get('RATE_LIMIT_COSTOS', 'equipos.get_equipos=10,equipos.get_lote=5,admin.get_resumen_inventario=10').split(',') if '=' in p
+    )}
+    RATE_LIMIT_EXENTOS = [e.strip() for e in os.environ.get('RATE_LIMIT_EXENTOS', 'metrics.metrics,home').split(',') if e.strip()]
+    # Peticiones simultáneas por proceso en las rutas que más conexiones y CPU usan
+    CONCURRENCIA_MAXIMA = {k: int(v) for k, v in (
+        p.split('=', 1) for p in os.environ.get('CONCURRENCIA_MAXIMA', 'equipos.get_equipos=2,admin.get_resumen_inventario=1').split(',') if '=' in p
+    )}
+
+    # Fallos de login tolerados por usuario y por IP dentro de la ventana; por encima
+    # se responde 429 sin consultar la base ni ejecutar bcrypt
+    LOGIN_VENTANA_SEGUNDOS = int(os.environ.get('LOGIN_VENTANA_SEGUNDOS', 300))
+    LOGIN_MAX_FALLOS_USUARIO = int(os.environ.get('LOGIN_MAX_FALLOS_USUARIO', 5))
+    LOGIN_MAX_FALLOS_IP = int(os.environ.get('LOGIN_MAX_FALLOS_IP', 50))
+    LOGIN_MAX_CLAVES = int(os.environ.get('LOGIN_MAX_CLAVES', 100000))
+
+    # Revocación de JWT (logout, desactivación): con REVOCACION_PERSISTENTE las
+    # revocaciones se guardan en la base y cada proceso las relee cada pocos segundos
+    REVOCACION_PERSISTENTE = os.environ.get('REVOCACION_PERSISTENTE', '1') == '1'
+    REVOCACION_REFRESCO_SEGUNDOS = float(os.environ.get('REVOCACION_REFRESCO_SEGUNDOS', 5))
+
+    # Equipos por petición en POST /inventario/lote
+    LOTE_MAXIMO = int(os.environ.get('LOTE_MAXIMO', 200))
+
+    # Con CARGAS_ESTRICTAS=1 toda relación no cargada explícitamente por el perfil del
+    # endpoint falla al accederse (lazy='raise'); pensado para pruebas y benchmarks
+    CARGAS_ESTRICTAS = os.environ.get('CARGAS_ESTRICTAS', '0') == '1'
+
+    # Altas en una transacción: intentos ante deadlock o fallo de serialización y
+    # espera inicial en segundos (se duplica en cada reintento)
+    TRANSACCION_INTENTOS = int(os.environ.get('TRANSACCION_INTENTOS', 3))
+    TRANSACCION_ESPERA_BASE = float(os.environ.get('TRANSACCION_ESPERA_BASE', 0.05))
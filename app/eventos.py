@@ -0,0 +1,108 @@
+import json
+import queue
+import threading
+from datetime import datetime, timezone
+from .cambios import SOLO_CACHE, al_confirmar
+from .instrumentation import Contador, METRICAS
+
+EVENTOS_PUBLICADOS = Contador(
+    'inventario_sse_events_published_total', 'Eventos publicados a los suscriptores SSE', ('entidad',)
+)
+EVENTOS_DESCARTADOS = Contador(
+    'inventario_sse_events_dropped_total', 'Eventos descartados por suscriptores atrasados', ('motivo',)
+)
+METRICAS.extend([EVENTOS_PUBLICADOS, EVENTOS_DESCARTADOS])
+
+class SinCupo(Exception):
+    pass
+
+class Suscripcion:
+    def __init__(self, id_sucursal, capacidad):
+        self.id_sucursal = id_sucursal
+        self.cola = queue.Queue(maxsize=capacidad)
+        self.atrasada = False
+        self._lock = threading.Lock()
+
+    def entregar(self, evento):
+        with self._lock:
+            if self.atrasada:
+                EVENTOS_DESCARTADOS.incrementar('atrasado')
+                return
+            try:
+                self.cola.put_nowait(evento)
+            except queue.Full:
+                # El cliente no da abasto: se vacía su cola y se le pide volver a sincronizar
+                descartados = 0
+                while True:
+                    try:
+                        self.cola.get_nowait()
+                        descartados += 1
+                    except queue.Empty:
+                        break
+                EVENTOS_DESCARTADOS.incrementar('cola_llena', valor=descartados + 1)
+                self.cola.put_nowait({'tipo': 'resync'})
+                self.atrasada = True
+
+    def siguiente(self, timeout):
+        evento = self.cola.get(timeout=timeout)
+        if evento.get('tipo') == 'resync':
+            with self._lock:
+                self.atrasada = False
+        return evento
+
+# Distribución en memoria (por proceso) de los cambios confirmados a los suscriptores
+class Difusor:
+    def __init__(self):
+        self._suscripciones = set()
+        self._lock = threading.Lock()
+        self.maximo = None
+        self.capacidad = 100
+
+    def suscribir(self, id_sucursal):
+        with self._lock:
+            if self.maximo is not None and len(self._suscripciones) >= self.maximo:
+                raise SinCupo()
+            suscripcion = Suscripcion(id_sucursal, self.capacidad)
+            self._suscripciones.add(suscripcion)
+            return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def cantidad(self):
+        return len(self._suscripciones)
+
+    # id_sucursal None llega a todos; una suscripción sin sucursal recibe todo
+    def publicar(self, evento, id_sucursal=None):
+        with self._lock:
+            destinatarios = list(self._suscripciones)
+        for suscripcion in destinatarios:
+            if id_sucursal is None or suscripcion.id_sucursal is None or suscripcion.id_sucursal == id_sucursal:
+                suscripcion.entregar(evento)
+        EVENTOS_PUBLICADOS.incrementar(evento.get('entidad', evento.get('tipo')))
+
+difusor = Difusor()
+
+def formato_sse(evento):
+    return f"event: {evento.get('tipo', 'cambio')}\ndata: {json.dumps(evento, ensure_ascii=False)}\n\n"
+
+def _publicar_cambios(cambios):
+    if not difusor.cantidad():
+        return
+    ts = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+    for cambio in cambios:
+        if cambio['entidad'] in SOLO_CACHE:
+            continue
+        difusor.publicar({
+            'tipo': 'cambio',
+            'entidad': cambio['entidad'],
+            'id': cambio['id_entidad'],
+            'operacion': cambio['operacion'],
+            'ts': ts
+        }, cambio['id_sucursal'])
+
+def init_eventos(app):
+    difusor.maximo = app.config.get('SSE_MAX_SUSCRIPTORES')
+    difusor.capacidad = app.config.get('SSE_COLA_MAXIMA', 100)
+    al_confirmar(_publicar_cambios)
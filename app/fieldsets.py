@@ -0,0 +1,53 @@
+from functools import lru_cache
+from flask import request
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+# Campos de InventarioGeneral que se combinan con el detalle en los listados por tipo
+CAMPOS_INVENTARIO = (
+    'id_inventario', 'estado', 'id_usuario_responsable', 'id_area_responsable',
+    'id_sucursal_ubicacion', 'fecha_ingreso', 'observaciones'
+)
+
+class CamposInvalidos(ValueError):
+    pass
+
+# Lee el parámetro fields=a,b,c; None significa "todos los campos"
+def campos_solicitados(permitidos):
+    valor = request.args.get('fields')
+    if not valor:
+        return None
+
+    campos = frozenset(c.strip() for c in valor.split(',') if c.strip())
+    invalidos = campos - set(permitidos)
+    if invalidos:
+        raise CamposInvalidos(f"Campos no válidos: {', '.join(sorted(invalidos))}")
+    return campos
+
+def columnas_modelo(modelo):
+    return tuple(c.key for c in inspect(modelo).column_attrs)
+
+# Opción de consulta que solo trae de la base las columnas pedidas (y la clave primaria)
+def solo_columnas(modelo, campos, obligatorias=()):
+    mapper = inspect(modelo)
+    nombres = (set(campos) | set(obligatorias)) & {c.key for c in mapper.column_attrs}
+    nombres |= {c.key for c in mapper.primary_key}
+    return load_only(*(getattr(modelo, nombre) for nombre in sorted(nombres)))
+
+@lru_cache(maxsize=128)
+def schema_parcial(schema_cls, campos, many=False):
+    return schema_cls(only=campos, many=many)
+
+_VALORES_INVENTARIO = {
+    "id_inventario": lambda item: item.id_inventario,
+    "estado": lambda item: item.estado,
+    "id_usuario_responsable": lambda item: item.id_usuario_responsable,
+    "id_area_responsable": lambda item: item.id_area_responsable,
+    "id_sucursal_ubicacion": lambda item: item.id_sucursal_ubicacion,
+    "fecha_ingreso": lambda item: item.fecha_ingreso.isoformat() if item.fecha_ingreso else None,
+    "observaciones": lambda item: item.observaciones
+}
+
+# Solo accede a los atributos pedidos: con load_only, leer otro dispararía una consulta por fila
+def campos_inventario(item, campos=None):
+    return {k: valor(item) for k, valor in _VALORES_INVENTARIO.items() if campos is None or k in campos}
@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, current_app, g, has_request_context, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import db
+from .instrumentation import Contador, METRICAS
+from .models import ClaveIdempotencia
+from .shards import activo as sharding_activo, engine_de_nombre, shard_actual
+
+logger = logging.getLogger(__name__)
+
+PETICIONES_IDEMPOTENTES = Contador(
+    'inventario_idempotency_requests_total', 'Altas con Idempotency-Key por resultado', ('endpoint', 'resultado')
+)
+METRICAS.append(PETICIONES_IDEMPOTENTES)
+
+CABECERA = 'Idempotency-Key'
+
+_tabla = ClaveIdempotencia.__table__
+_estado = {'ultima_purga': 0.0}
+
+def _sha256(datos):
+    if isinstance(datos, str):
+        datos = datos.encode('utf-8')
+    return hashlib.sha256(datos).hexdigest()
+
+# Las claves viven en la misma base que los datos del alta (el shard de la petición, con
+# sharding). La reserva y la respuesta se escriben con conexiones propias: la reserva
+# queda visible para los demás procesos antes de ejecutar el alta. El paso a completado
+# va en la transacción de la vista (_marcar_completada), así que se confirma con el alta
+def _engine():
+    return engine_de_nombre(db, shard_actual()) if sharding_activo() else db.engine
+
+def _buscar(clave):
+    with _engine().connect() as conn:
+        return conn.execute(select(_tabla).where(_tabla.c.clave == clave)).first()
+
+def _purgar(ahora):
+    intervalo = current_app.config.get('IDEMPOTENCIA_PURGA_SEGUNDOS', 300)
+    if time.monotonic() - _estado['ultima_purga'] < intervalo:
+        return
+    _estado['ultima_purga'] = time.monotonic()
+    with _engine().begin() as conn:
+        borradas = conn.execute(delete(_tabla).where(_tabla.c.fecha_expira < ahora)).rowcount
+    if borradas:
+        logger.info("Claves de idempotencia vencidas eliminadas: %d", borradas)
+
+def _respuesta_de(fila, huella):
+    if fila.huella != huella:
+        PETICIONES_IDEMPOTENTES.incrementar(request.endpoint, 'conflicto')
+        return jsonify({"error": f"La {CABECERA} ya se usó con otra petición"}), 422
+    if fila.estado == 'en_proceso':
+        PETICIONES_IDEMPOTENTES.incrementar(request.endpoint, 'en_proceso')
+        respuesta = jsonify({"error": "La petición original con esta clave aún está en proceso"})
+        respuesta.headers['Retry-After'] = '1'
+        return respuesta, 409
+    if fila.cuerpo is None:
+        # El alta se confirmó pero el proceso cayó antes de guardar la respuesta
+        PETICIONES_IDEMPOTENTES.incrementar(request.endpoint, 'sin_respuesta')
+        return jsonify({"error": "La petición original con esta clave ya se completó, pero su respuesta no está disponible"}), 409
+    PETICIONES_IDEMPOTENTES.incrementar(request.endpoint, 'repetida')
+    respuesta = Response(fila.cuerpo, status=fila.status, mimetype=fila.mimetype)
+    respuesta.headers['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+# Devuelve None si la clave quedó reservada para esta petición; si no, la respuesta a enviar
+def _reservar(clave, huella):
+    ahora = datetime.utcnow()
+    fila = _buscar(clave)
+    if fila is not None and fila.fecha_expira >= ahora:
+        return _respuesta_de(fila, huella)
+
+    bloqueo = current_app.config.get('IDEMPOTENCIA_BLOQUEO_SEGUNDOS', 60)
+    try:
+        with _engine().begin() as conn:
+            # Una reserva vencida (proceso caído a mitad del alta) o una respuesta vencida se reemplaza
+            if fila is not None:
+                conn.execute(delete(_tabla).where(_tabla.c.clave == clave, _tabla.c.fecha_expira < ahora))
+            conn.execute(insert(_tabla).values(
+                clave=clave, huella=huella, estado='en_proceso', fecha_expira=ahora + timedelta(seconds=bloqueo)
+            ))
+    except IntegrityError:
+        # Otro reintento simultáneo reservó la clave primero
+        fila = _buscar(clave)
+        if fila is None:
+            return _reservar(clave, huella)
+        return _respuesta_de(fila, huella)
+
+    _purgar(ahora)
+    return None
+
+def _vencimiento():
+    return datetime.utcnow() + timedelta(seconds=current_app.config.get('IDEMPOTENCIA_TTL', 86400))
+
+# Antes de cada commit de una petición con clave reservada: la clave pasa a completado
+# en la misma transacción que el alta. Si el proceso cae después del commit, un
+# reintento ya no puede reservarla y volver a ejecutar el alta
+def _marcar_completada(session):
+    if not has_request_context():
+        return
+    clave = g.get('_clave_idempotencia')
+    if clave is None:
+        return
+    session.execute(
+        update(_tabla).where(_tabla.c.clave == clave).values(estado='completado', fecha_expira=_vencimiento()),
+        bind_arguments={'mapper': ClaveIdempotencia}
+    )
+
+def _guardar(clave, respuesta):
+    with _engine().begin() as conn:
+        conn.execute(update(_tabla).where(_tabla.c.clave == clave).values(
+            estado='completado',
+            status=respuesta.status_code,
+            cuerpo=respuesta.get_data(),
+            mimetype=respuesta.mimetype,
+            fecha_expira=_vencimiento(),
+        ))
+
+# Libera la reserva si la vista no llegó a confirmar nada; False si el alta ya se confirmó
+def _liberar(clave):
+    with _engine().begin() as conn:
+        return conn.execute(delete(_tabla).where(_tabla.c.clave == clave, _tabla.c.estado == 'en_proceso')).rowcount > 0
+
+# Altas reintentables: con la cabecera Idempotency-Key, la primera petición se ejecuta
+# y las siguientes con la misma clave (y el mismo cuerpo) reciben la respuesta guardada.
+# Los errores 5xx sin nada confirmado no se guardan para que el cliente pueda reintentar
+def idempotente(vista):
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        clave_cliente = request.headers.get(CABECERA)
+        if not clave_cliente:
+            return vista(*args, **kwargs)
+        if len(clave_cliente) > 255:
+            return jsonify({"error": f"{CABECERA} no puede superar los 255 caracteres"}), 400
+
+        clave = _sha256(f'{get_jwt_identity()}|{request.method}|{request.path}|{clave_cliente}')
+        huella = _sha256(request.get_data())
+        respuesta = _reservar(clave, huella)
+        if respuesta is not None:
+            return respuesta
+
+        g._clave_idempotencia = clave
+        try:
+            respuesta = make_response(vista(*args, **kwargs))
+        except Exception:
+            g.pop('_clave_idempotencia', None)
+            _liberar(clave)
+            raise
+        g.pop('_clave_idempotencia', None)
+        if respuesta.status_code < 500 or not _liberar(clave):
+            _guardar(clave, respuesta)
+        PETICIONES_IDEMPOTENTES.incrementar(request.endpoint, 'nueva')
+        return respuesta
+    return envoltura
+
+def init_idempotencia(app):
+    if not event.contains(Session, 'before_commit', _marcar_completada):
+        event.listen(Session, 'before_commit', _marcar_completada)
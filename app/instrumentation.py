@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+class Histograma:
+    def __init__(self, nombre, descripcion, buckets, etiquetas):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.buckets = buckets
+        self.etiquetas = etiquetas
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *etiquetas):
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.descripcion}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            for etiquetas, (conteos, suma, total) in sorted(self._series.items()):
+                base = ','.join(f'{k}="{v}"' for k, v in zip(self.etiquetas, etiquetas))
+                for limite, conteo in zip(self.buckets, conteos):
+                    lineas.append(f'{self.nombre}_bucket{{{base},le="{limite}"}} {conteo}')
+                lineas.append(f'{self.nombre}_bucket{{{base},le="+Inf"}} {total}')
+                lineas.append(f'{self.nombre}_sum{{{base}}} {suma}')
+                lineas.append(f'{self.nombre}_count{{{base}}} {total}')
+        return lineas
+
+class Contador:
+    def __init__(self, nombre, descripcion, etiquetas):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiquetas = etiquetas
+        self._valores = Counter()
+        self._lock = threading.Lock()
+
+    def incrementar(self, *etiquetas, valor=1):
+        with self._lock:
+            self._valores[etiquetas] += valor
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.descripcion}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            for etiquetas, valor in sorted(self._valores.items()):
+                base = ','.join(f'{k}="{v}"' for k, v in zip(self.etiquetas, etiquetas))
+                lineas.append(f'{self.nombre}{{{base}}} {valor}')
+        return lineas
+
+# Métricas por proceso (con gunicorn, cada worker expone las suyas)
+DURACION_PETICION = Histograma(
+    'inventario_request_duration_seconds', 'Duración total de la petición',
+    BUCKETS_SEGUNDOS, ('endpoint', 'method')
+)
+DURACION_DB = Histograma(
+    'inventario_db_duration_seconds', 'Tiempo en la base de datos por petición',
+    BUCKETS_SEGUNDOS, ('endpoint', 'method')
+)
+CONSULTAS_DB = Histograma(
+    'inventario_db_queries', 'Consultas SQL por petición',
+    BUCKETS_CONSULTAS, ('endpoint', 'method')
+)
+DURACION_SERIALIZACION = Histograma(
+    'inventario_serialization_duration_seconds', 'Tiempo de serialización por petición',
+    BUCKETS_SEGUNDOS, ('endpoint', 'method')
+)
+N_MAS_UNO = Contador(
+    'inventario_n_plus_one_total', 'Peticiones con la misma sentencia repetida sobre el umbral',
+    ('endpoint',)
+)
+METRICAS = [DURACION_PETICION, DURACION_DB, CONSULTAS_DB, DURACION_SERIALIZACION, N_MAS_UNO]
+
+class Medicion:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.sentencias = Counter()
+        self.fases = Counter()
+
+# En modo asíncrono no hay contexto de petición Flask: la medición viaja en una
+# variable de contexto, que SQLAlchemy propaga a los greenlets del motor asyncio
+_medicion_async = ContextVar('medicion_async', default=None)
+
+def medicion_actual():
+    if has_request_context():
+        return g.get('_medicion')
+    return _medicion_async.get()
+
+@contextmanager
+def medicion_asincrona():
+    medicion = Medicion()
+    token = _medicion_async.set(medicion)
+    try:
+        yield medicion
+    finally:
+        _medicion_async.reset(token)
+
+# Acumula en la petición actual el tiempo de una fase (serialización, commit...)
+@contextmanager
+def medir(fase):
+    medicion = medicion_actual()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.fases[fase] += time.perf_counter() - inicio
+
+class JSONProviderMedido(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with medir('serializacion'):
+            return super().dumps(obj, **kwargs)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if medicion_actual() is not None:
+        conn.info['_inicio_consulta'] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    medicion = medicion_actual()
+    inicio = conn.info.pop('_inicio_consulta', None)
+    if medicion is None or inicio is None:
+        return
+    medicion.tiempo_db += time.perf_counter() - inicio
+    medicion.consultas += 1
+    medicion.sentencias[statement] += 1
+
+# Registra en los histogramas la petición terminada y devuelve la cabecera Server-Timing
+def cerrar_medicion(medicion, endpoint, metodo, umbral):
+    total = time.perf_counter() - medicion.inicio
+    serializacion = medicion.fases.get('serializacion', 0.0)
+
+    DURACION_PETICION.observar(total, endpoint, metodo)
+    DURACION_DB.observar(medicion.tiempo_db, endpoint, metodo)
+    CONSULTAS_DB.observar(medicion.consultas, endpoint, metodo)
+    DURACION_SERIALIZACION.observar(serializacion, endpoint, metodo)
+
+    repetidas = [(s, n) for s, n in medicion.sentencias.items() if n > umbral]
+    if repetidas:
+        N_MAS_UNO.incrementar(endpoint)
+        sentencia, veces = max(repetidas, key=lambda r: r[1])
+        logger.warning(
+            "Posible N+1 en %s: sentencia ejecutada %d veces", endpoint, veces,
+            extra={'endpoint': endpoint, 'sentencia': sentencia, 'veces': veces}
+        )
+
+    timing = [f'db;dur={medicion.tiempo_db * 1000:.1f};desc="{medicion.consultas} consultas"']
+    for fase, duracion in medicion.fases.items():
+        timing.append(f'{fase};dur={duracion * 1000:.1f}')
+    timing.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(timing)
+
+_eventos_registrados = False
+
+def init_instrumentation(app):
+    global _eventos_registrados
+
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    app.json = JSONProviderMedido(app)
+
+    # A nivel de clase: cubre cualquier engine que cree la aplicación
+    if not _eventos_registrados:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _eventos_registrados = True
+
+    umbral = app.config.get('N_PLUS_ONE_THRESHOLD', 10)
+
+    @app.before_request
+    def iniciar_medicion():
+        g._medicion = Medicion()
+
+    @app.after_request
+    def registrar_medicion(response):
+        medicion = g.pop('_medicion', None)
+        if medicion is None:
+            return response
+
+        endpoint = request.endpoint or 'desconocido'
+        response.headers['Server-Timing'] = cerrar_medicion(medicion, endpoint, request.method, umbral)
+        return response
+
+def exponer_metricas():
+    lineas = []
+    for metrica in METRICAS:
+        lineas.extend(metrica.exponer())
+    return '\n'.join(lineas) + '\n'
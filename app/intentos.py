@@ -0,0 +1,81 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+import bcrypt
+from .instrumentation import Contador, METRICAS
+
+LOGINS_RECHAZADOS = Contador(
+    'inventario_login_rejected_total', 'Intentos de login rechazados antes de consultar la base', ('motivo',)
+)
+METRICAS.append(LOGINS_RECHAZADOS)
+
+# Fallos recientes por clave con una ventana deslizante aproximada: por cada clave
+# solo se guardan el inicio de la ventana actual y los fallos de la actual y la anterior
+class RegistroIntentos:
+    def __init__(self, ventana=300, max_claves=100000):
+        self.ventana = ventana
+        self.max_claves = max_claves
+        self._claves = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _avanzar(self, clave, ahora):
+        inicio, actual, anterior = self._claves.get(clave, (ahora, 0, 0))
+        transcurridas = int((ahora - inicio) // self.ventana)
+        if transcurridas == 1:
+            inicio, actual, anterior = inicio + self.ventana, 0, actual
+        elif transcurridas > 1:
+            inicio, actual, anterior = ahora, 0, 0
+        return inicio, actual, anterior
+
+    def _estimar(self, inicio, actual, anterior, ahora):
+        return actual + anterior * max(0.0, 1 - (ahora - inicio) / self.ventana)
+
+    # Segundos hasta el próximo intento admitido, o 0 si la clave está bajo el límite
+    def espera(self, clave, limite):
+        ahora = time.monotonic()
+        with self._lock:
+            if clave not in self._claves:
+                return 0
+            inicio, actual, anterior = self._avanzar(clave, ahora)
+            if self._estimar(inicio, actual, anterior, ahora) < limite:
+                return 0
+            return max(1, math.ceil(inicio + self.ventana - ahora))
+
+    def fallo(self, clave):
+        ahora = time.monotonic()
+        with self._lock:
+            inicio, actual, anterior = self._avanzar(clave, ahora)
+            self._claves[clave] = (inicio, actual + 1, anterior)
+            self._claves.move_to_end(clave)
+            # Se descartan las claves más antiguas: un atacante con muchas IPs no agota la memoria
+            while len(self._claves) > self.max_claves:
+                self._claves.popitem(last=False)
+
+    def olvidar(self, clave):
+        with self._lock:
+            self._claves.pop(clave, None)
+
+    def __len__(self):
+        return len(self._claves)
+
+# Hash de una contraseña que nadie tiene, con el mismo costo que los reales:
+# un usuario inexistente tarda lo mismo que una contraseña incorrecta
+_hash_ficticio = {}
+_lock_hash = threading.Lock()
+
+def hash_ficticio():
+    if not _hash_ficticio:
+        with _lock_hash:
+            if not _hash_ficticio:
+                _hash_ficticio['valor'] = bcrypt.hashpw(b'usuario-inexistente', bcrypt.gensalt())
+    return _hash_ficticio['valor']
+
+def verificar_ficticio(password):
+    bcrypt.checkpw(password.encode('utf-8'), hash_ficticio())
+    return False
+
+def init_intentos(app):
+    app.extensions['intentos_login'] = RegistroIntentos(
+        app.config.get('LOGIN_VENTANA_SEGUNDOS', 300), app.config.get('LOGIN_MAX_CLAVES', 100000)
+    )
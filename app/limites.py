@@ -0,0 +1,189 @@
+import importlib
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from .instrumentation import Contador, METRICAS
+
+try:
+    import redis
+except ImportError:  # redis es opcional: solo lo necesita el backend compartido
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+PETICIONES_LIMITADAS = Contador(
+    'inventario_rate_limited_total', 'Peticiones rechazadas con 429 por endpoint y motivo', ('endpoint', 'motivo')
+)
+METRICAS.append(PETICIONES_LIMITADAS)
+
+# Interfaz de los backends: consume `costo` fichas del balde `clave` y devuelve
+# 0 si alcanzaron o los segundos que faltan para tenerlas. Una implementación
+# incompleta falla al instanciarse en init_limites, no en la primera petición
+class BackendLimites(ABC):
+    @abstractmethod
+    def consumir(self, clave, capacidad, tasa, costo=1):
+        ...
+
+    @abstractmethod
+    def limpiar(self):
+        ...
+
+# Baldes de fichas en memoria del proceso
+class LimitesMemoria(BackendLimites):
+    def __init__(self, max_claves=100000):
+        self.max_claves = max_claves
+        self._baldes = {}
+        self._lock = threading.Lock()
+
+    def consumir(self, clave, capacidad, tasa, costo=1):
+        ahora = time.monotonic()
+        with self._lock:
+            fichas, ultima = self._baldes.get(clave, (capacidad, ahora))
+            fichas = min(capacidad, fichas + (ahora - ultima) * tasa)
+            espera = 0.0
+            if fichas >= costo:
+                fichas -= costo
+            else:
+                espera = (costo - fichas) / tasa
+            self._baldes[clave] = (fichas, ahora)
+            if len(self._baldes) > self.max_claves:
+                self._descartar_llenos(ahora, capacidad, tasa)
+            return espera
+
+    # Un balde que ya se habría rellenado por completo equivale a no tenerlo
+    def _descartar_llenos(self, ahora, capacidad, tasa):
+        llenado = capacidad / tasa
+        for clave in [k for k, (_, ultima) in self._baldes.items() if ahora - ultima > llenado]:
+            del self._baldes[clave]
+
+    def limpiar(self):
+        with self._lock:
+            self._baldes.clear()
+
+# Baldes compartidos entre workers; el cálculo se hace en un script Lua para que sea atómico
+class LimitesRedis(BackendLimites):
+    SCRIPT = """
+local capacidad, tasa, ahora, costo = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local balde = redis.call('HMGET', KEYS[1], 'fichas', 'ultima')
+local fichas = tonumber(balde[1]) or capacidad
+local ultima = tonumber(balde[2]) or ahora
+fichas = math.min(capacidad, fichas + math.max(0, ahora - ultima) * tasa)
+local espera = 0
+if fichas >= costo then fichas = fichas - costo else espera = (costo - fichas) / tasa end
+redis.call('HSET', KEYS[1], 'fichas', fichas, 'ultima', ahora)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacidad / tasa) + 1)
+return tostring(espera)
+"""
+
+    def __init__(self, url, prefijo='inventario:limites:'):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requiere el paquete redis")
+        self.cliente = redis.Redis.from_url(url)
+        self.prefijo = prefijo
+        self._script = self.cliente.register_script(self.SCRIPT)
+
+    def consumir(self, clave, capacidad, tasa, costo=1):
+        return float(self._script(keys=[self.prefijo + clave], args=[capacidad, tasa, time.time(), costo]))
+
+    def limpiar(self):
+        for clave in self.cliente.scan_iter(self.prefijo + '*'):
+            self.cliente.delete(clave)
+
+_estado = {'backend': None, 'semaforos': {}}
+
+def backend_actual():
+    return _estado['backend']
+
+def _crear_backend(app):
+    nombre = app.config.get('RATE_LIMIT_BACKEND', 'memoria')
+    if nombre == 'memoria':
+        return LimitesMemoria()
+    if nombre == 'redis':
+        return LimitesRedis(app.config['RATE_LIMIT_REDIS_URL'])
+    # Cualquier otra implementación de BackendLimites como "modulo:Clase"
+    modulo, clase = nombre.split(':')
+    return getattr(importlib.import_module(modulo), clase)(app)
+
+def _identidad():
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:  # token vencido o inválido: la vista responderá 401, aquí cuenta como anónimo
+        return None
+
+# Cuerpo y valor de Retry-After de un 429; lo usan también las rutas asíncronas
+def rechazo(endpoint, motivo, espera):
+    PETICIONES_LIMITADAS.incrementar(endpoint, motivo)
+    return {"error": "Demasiadas peticiones, intenta de nuevo más tarde"}, str(max(1, math.ceil(espera)))
+
+def _rechazar(motivo, espera):
+    cuerpo, reintentar = rechazo(request.endpoint, motivo, espera)
+    respuesta = jsonify(cuerpo)
+    respuesta.status_code = 429
+    respuesta.headers['Retry-After'] = reintentar
+    return respuesta
+
+# Devuelve (motivo, espera) si la petición agotó sus fichas, o None si se admite
+def consumir_fichas(config, endpoint, identidad, ip):
+    backend = backend_actual()
+    if backend is None:
+        return None
+    # Las rutas caras consumen más fichas que una lectura simple
+    costo = config.get('RATE_LIMIT_COSTOS', {}).get(endpoint, 1)
+    if identidad is not None:
+        espera = backend.consumir(f'usuario:{identidad}', config['RATE_LIMIT_USUARIO_RAFAGA'],
+                                  config['RATE_LIMIT_USUARIO_POR_SEGUNDO'], costo)
+        if espera:
+            return 'usuario', espera
+    espera = backend.consumir(f'ip:{ip}', config['RATE_LIMIT_IP_RAFAGA'], config['RATE_LIMIT_IP_POR_SEGUNDO'], costo)
+    if espera:
+        return 'ip', espera
+    return None
+
+# Tope de peticiones simultáneas por proceso: no se espera turno, se rechaza.
+# Devuelve (admitida, semáforo a liberar al terminar)
+def tomar_turno(endpoint):
+    semaforo = _estado['semaforos'].get(endpoint)
+    if semaforo is None:
+        return True, None
+    if not semaforo.acquire(blocking=False):
+        return False, None
+    return True, semaforo
+
+def _admitir():
+    config = current_app.config
+    endpoint = request.endpoint
+    if endpoint is None or endpoint in config.get('RATE_LIMIT_EXENTOS', ()):
+        return None
+
+    agotadas = consumir_fichas(config, endpoint, _identidad(), request.remote_addr)
+    if agotadas is not None:
+        return _rechazar(*agotadas)
+    admitida, semaforo = tomar_turno(endpoint)
+    if not admitida:
+        return _rechazar('concurrencia', 1)
+    if semaforo is not None:
+        g._semaforo_limite = semaforo
+    return None
+
+def _liberar(excepcion=None):
+    semaforo = g.pop('_semaforo_limite', None)
+    if semaforo is not None:
+        semaforo.release()
+
+def init_limites(app):
+    _estado['backend'] = _crear_backend(app) if app.config.get('RATE_LIMIT_ENABLED') else None
+    _estado['semaforos'] = {
+        endpoint: threading.BoundedSemaphore(maximo)
+        for endpoint, maximo in (app.config.get('CONCURRENCIA_MAXIMA') or {}).items()
+    }
+    if _estado['backend'] is None and not _estado['semaforos']:
+        return
+    app.before_request(_admitir)
+    # teardown también corre si la vista lanza una excepción o al terminar un streaming
+    app.teardown_request(_liberar)
+    logger.info("Límites de peticiones activos (%s)", app.config.get('RATE_LIMIT_BACKEND', 'memoria'))
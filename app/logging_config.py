@@ -0,0 +1,123 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Atributos estándar de LogRecord; el resto se consideran campos extra
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'muestreo'}
+
+_configurado = False
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_RECORD:
+                data[clave] = valor
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+# Descarta una fracción de los registros marcados con extra={'muestreo': tasa},
+# pensado para mensajes que se repiten por fila o por petición
+class MuestreoFilter(logging.Filter):
+    def filter(self, record):
+        tasa = getattr(record, 'muestreo', None)
+        return tasa is None or random.random() < tasa
+
+# Parámetros de URL con credenciales (el token de EventSource llega como ?jwt=)
+# que no deben quedar en los logs de acceso
+PARAMETROS_SENSIBLES = ('jwt',)
+_PARAMETRO_SENSIBLE = re.compile(r'(^|[?&])(%s)=[^&\s]*' % '|'.join(PARAMETROS_SENSIBLES))
+
+def redactar_url(texto):
+    return _PARAMETRO_SENSIBLE.sub(r'\1\2=[redactado]', texto)
+
+# Para loggers de acceso de terceros (uvicorn.access) que reciben la URL como argumento
+class RedactarTokensFilter(logging.Filter):
+    def filter(self, record):
+        if isinstance(record.args, tuple):
+            record.args = tuple(redactar_url(a) if isinstance(a, str) else a for a in record.args)
+        return True
+
+# Registros que pueden esperar en la cola de cada handler antes de descartarse
+COLA_MAXIMA = 10000
+
+# Handler que solo encola; un QueueListener de cada proceso escribe en `destino`.
+# No formatea en el hilo que registra: el mensaje se arma en el hilo del listener,
+# así la petición solo paga el encolado.
+# El listener se inicia en el primer registro de cada proceso y no al crear la app:
+# con preload_app el hilo del master no pasa a los workers, y la cola heredada del
+# fork puede tener sus locks tomados por ese hilo. La cola es acotada: si el
+# destino no da abasto, se descartan registros en vez de crecer sin límite
+class QueueHandlerDiferido(QueueHandler):
+    def __init__(self, destino, maximo=COLA_MAXIMA):
+        super().__init__(None)
+        self.destino = destino
+        self.maximo = maximo
+        self.descartados = 0
+        self._pid = None
+        self._listener = None
+        self._lock_listener = threading.Lock()
+
+    def _asegurar_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock_listener:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.maximo)
+            self._listener = QueueListener(self.queue, self.destino, respect_handler_level=True)
+            self._listener.start()
+            atexit.register(self._detener, self._listener)
+            self._pid = os.getpid()
+
+    def _detener(self, listener):
+        if self._pid != os.getpid():
+            return
+        try:
+            listener.stop()
+        except queue.Full:  # no cabe el centinela: el hilo es daemon y termina con el proceso
+            pass
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        self._asegurar_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+# Envuelve un handler para que la escritura ocurra en un hilo propio
+def handler_en_cola(handler, maximo=COLA_MAXIMA):
+    return QueueHandlerDiferido(handler, maximo)
+
+def configurar_logging(app):
+    global _configurado
+
+    nivel = app.config.get('LOG_LEVEL', 'INFO')
+    root = logging.getLogger()
+    root.setLevel(nivel)
+    if _configurado:
+        return
+
+    salida = logging.StreamHandler()
+    salida.setFormatter(JsonFormatter())
+
+    handler = handler_en_cola(salida, app.config.get('LOG_COLA_MAXIMA', COLA_MAXIMA))
+    handler.addFilter(MuestreoFilter())
+    root.handlers[:] = [handler]
+    _configurado = True
@@ -1,7 +1,9 @@
 from . import db
 from datetime import datetime
 from flask_marshmallow import Marshmallow
+from sqlalchemy.orm import column_property
 import bcrypt
+from .instrumentation import medir
 
 ma = Marshmallow()
 
@@ -12,6 +14,8 @@ class Usuario(db.Model):
     contraseña_hash = db.Column(db.String(255), nullable=False)
     nombre = db.Column(db.String(100))
     id_sucursal = db.Column(db.Integer, db.ForeignKey('sucursales.id_sucursal'))
+    id_rol = db.Column(db.Integer, db.ForeignKey('roles.id'))
+    sucursal_activa = db.Column(db.Integer, db.ForeignKey('sucursales.id_sucursal'))
     activo = db.Column(db.Boolean, default=True)
     
     # Relaciones
@@ -47,8 +51,16 @@ class InventarioGeneral(db.Model):
     id_inventario = db.Column(db.Integer, primary_key=True)
     tipo_equipo = db.Column(db.Enum('Computacional', 'Celular', 'Impresora'), nullable=False)
     id_registro = db.Column(db.Integer, nullable=False)
-    estado = db.Column(db.Enum('DeBaja', 'Asignado', 'SinAsignar', 'EnReparacion'), default='SinAsignar')
-    id_usuario_responsable = db.Column(db.Integer, db.ForeignKey('usuarios_sistema.id'))
+    # active_history: al cambiar el estado se conoce siempre el anterior, aunque no se
+    # hubiera cargado, para validar la transición (ver app/ciclo_vida.py)
+    estado = column_property(
+        db.Column(db.Enum('DeBaja', 'Asignado', 'SinAsignar', 'EnReparacion'), default='SinAsignar'),
+        active_history=True
+    )
+    # Desde cuándo el equipo está en su estado actual; la mantiene app/ciclo_vida.py
+    fecha_estado = db.Column(db.DateTime)
+    # Indexada: "mis equipos" busca por responsable sin recorrer la sucursal
+    id_usuario_responsable = db.Column(db.Integer, db.ForeignKey('usuarios_sistema.id'), index=True)
     id_area_responsable = db.Column(db.Integer, db.ForeignKey('areas.id_area'))
     id_sucursal_ubicacion = db.Column(db.Integer, db.ForeignKey('sucursales.id_sucursal'))
     fecha_ingreso = db.Column(db.Date)
@@ -59,6 +71,45 @@ class InventarioGeneral(db.Model):
     area_responsable = db.relationship('Area', backref='equipos_asignados')
     sucursal = db.relationship('Sucursal', backref='equipos_ubicados')
 
+    # Detalle según el tipo: (tipo_equipo, id_registro) apunta a una de tres tablas sin
+    # clave foránea, así que cada tipo tiene su relación de solo lectura con primaryjoin.
+    # Los perfiles de app/cargas.py las cargan con un LEFT JOIN por tipo; `detalle` devuelve
+    # la que corresponde al tipo
+    equipo_computacional = db.relationship(
+        'EquipoComputacional', viewonly=True, uselist=False,
+        primaryjoin="and_(InventarioGeneral.tipo_equipo == 'Computacional', "
+                    "foreign(InventarioGeneral.id_registro) == EquipoComputacional.id_equipo)"
+    )
+    celular = db.relationship(
+        'Celular', viewonly=True, uselist=False,
+        primaryjoin="and_(InventarioGeneral.tipo_equipo == 'Celular', "
+                    "foreign(InventarioGeneral.id_registro) == Celular.id_celular)"
+    )
+    impresora = db.relationship(
+        'Impresora', viewonly=True, uselist=False,
+        primaryjoin="and_(InventarioGeneral.tipo_equipo == 'Impresora', "
+                    "foreign(InventarioGeneral.id_registro) == Impresora.id_impresora)"
+    )
+
+    __table_args__ = (
+        # Un registro de detalle pertenece a un solo equipo del inventario
+        db.Index('ux_inventario_general_tipo_registro', 'tipo_equipo', 'id_registro', unique=True),
+        # Antigüedad en el estado: "en reparación hace más de 30 días" es un rango del índice
+        db.Index('ix_inventario_general_estado_fecha', 'estado', 'fecha_estado'),
+    )
+
+    @property
+    def detalle(self):
+        relacion = RELACIONES_DETALLE.get(self.tipo_equipo)
+        return getattr(self, relacion) if relacion else None
+
+# Relación de InventarioGeneral con el detalle de cada tipo
+RELACIONES_DETALLE = {
+    'Computacional': 'equipo_computacional',
+    'Celular': 'celular',
+    'Impresora': 'impresora',
+}
+
 class EquipoComputacional(db.Model):
     __tablename__ = 'equipos_computacionales'
     id_equipo = db.Column(db.Integer, primary_key=True)
@@ -124,40 +175,167 @@ class HistorialMovimiento(db.Model):
     fecha = db.Column(db.DateTime, default=datetime.utcnow)
     observaciones = db.Column(db.Text)
 
+# Transiciones de estado de cada equipo del inventario. Vive en el mismo shard que
+# inventario_general y, como historial_movimientos, se conserva al borrar el equipo
+class TransicionEstado(db.Model):
+    __tablename__ = 'transiciones_estado'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    id_inventario = db.Column(db.Integer, nullable=False)
+    estado_anterior = db.Column(db.Enum('DeBaja', 'Asignado', 'SinAsignar', 'EnReparacion'))
+    estado_nuevo = db.Column(db.Enum('DeBaja', 'Asignado', 'SinAsignar', 'EnReparacion'), nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Sin clave foránea en la base; la relación solo ordena el INSERT tras el del equipo
+    inventario = db.relationship(
+        'InventarioGeneral',
+        primaryjoin='foreign(TransicionEstado.id_inventario) == InventarioGeneral.id_inventario'
+    )
+
+    __table_args__ = (
+        db.Index('ix_transiciones_estado_inventario_fecha', 'id_inventario', 'fecha'),
+        db.Index('ix_transiciones_estado_nuevo_fecha', 'estado_nuevo', 'fecha'),
+    )
+
+# Registro de cambios (outbox) para la sincronización incremental de clientes
+class RegistroCambio(db.Model):
+    __tablename__ = 'registro_cambios'
+    seq = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    entidad = db.Column(db.String(50), nullable=False)
+    id_entidad = db.Column(db.Integer, nullable=False)
+    operacion = db.Column(db.Enum('insert', 'update', 'delete'), nullable=False)
+    id_sucursal = db.Column(db.Integer)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_registro_cambios_sucursal_seq', 'id_sucursal', 'seq'),
+    )
+
+# Cambios escritos junto con los datos (en el shard, con sharding) que todavía no pasaron
+# a registro_cambios de la base global (ver cambios.trasladar_pendientes)
+class CambioPendiente(db.Model):
+    __tablename__ = 'cambios_pendientes'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    entidad = db.Column(db.String(50), nullable=False)
+    id_entidad = db.Column(db.Integer, nullable=False)
+    operacion = db.Column(db.Enum('insert', 'update', 'delete'), nullable=False)
+    id_sucursal = db.Column(db.Integer)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Fila única que bloquea cada traslado a registro_cambios hasta su commit: los seq se
+# asignan y confirman de a un traslado por vez, en orden
+class SecuenciaCambios(db.Model):
+    __tablename__ = 'secuencia_cambios'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    traslados = db.Column(db.BigInteger, nullable=False, default=0)
+
+# Trabajos en segundo plano (exportaciones, reportes, archivado, reasignaciones)
+class Trabajo(db.Model):
+    __tablename__ = 'trabajos'
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    estado = db.Column(db.Enum('pendiente', 'en_proceso', 'completado', 'fallido'), nullable=False, default='pendiente')
+    parametros = db.Column(db.JSON)
+    progreso = db.Column(db.Integer, nullable=False, default=0)
+    mensaje = db.Column(db.String(255))
+    resultado = db.Column(db.JSON)
+    archivo = db.Column(db.String(255))
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios_sistema.id'))
+    fecha_creacion = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    fecha_inicio = db.Column(db.DateTime)
+    fecha_fin = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_trabajos_estado_id', 'estado', 'id'),
+    )
+
+# Último reporte precalculado de cada sucursal; seq_cambios es el último cambio
+# del registro incluido, para saber cuántos cambios tiene pendientes
+class ReporteSucursal(db.Model):
+    __tablename__ = 'reportes_sucursal'
+    id_sucursal = db.Column(db.Integer, db.ForeignKey('sucursales.id_sucursal'), primary_key=True)
+    fecha_generacion = db.Column(db.DateTime, nullable=False)
+    seq_cambios = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), nullable=False, default=0)
+    total_equipos = db.Column(db.Integer, nullable=False, default=0)
+    formatos = db.Column(db.JSON)
+    id_trabajo = db.Column(db.Integer, db.ForeignKey('trabajos.id'))
+
+# Respuestas de las altas con Idempotency-Key: los reintentos reciben la respuesta guardada
+class ClaveIdempotencia(db.Model):
+    __tablename__ = 'claves_idempotencia'
+    clave = db.Column(db.String(64), primary_key=True)  # sha256 de usuario, ruta y clave del cliente
+    huella = db.Column(db.String(64), nullable=False)  # sha256 del cuerpo de la petición
+    estado = db.Column(db.Enum('en_proceso', 'completado'), nullable=False, default='en_proceso')
+    status = db.Column(db.SmallInteger)
+    cuerpo = db.Column(db.LargeBinary)
+    mimetype = db.Column(db.String(100))
+    fecha_expira = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_claves_idempotencia_expira', 'fecha_expira'),
+    )
+
+# Revocaciones de JWT: un token concreto (jti, p. ej. al cerrar sesión) o todos los
+# emitidos a un usuario hasta `emitidos_hasta` (desactivación, cambio de contraseña).
+# Pasada `expira` ningún token afectado sigue vigente y la fila puede borrarse
+class Revocacion(db.Model):
+    __tablename__ = 'revocaciones'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    jti = db.Column(db.String(36))
+    id_usuario = db.Column(db.Integer)
+    emitidos_hasta = db.Column(db.DateTime)
+    expira = db.Column(db.DateTime, nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_revocaciones_expira', 'expira'),
+    )
+
 # Schemas para serialización
-class UsuarioSchema(ma.SQLAlchemyAutoSchema):
+class SchemaMedido(ma.SQLAlchemyAutoSchema):
+    # El tiempo de dump se suma a la fase 'serializacion' de la petición
+    def dump(self, obj, *, many=None):
+        with medir('serializacion'):
+            return super().dump(obj, many=many)
+
+class UsuarioSchema(SchemaMedido):
     class Meta:
         model = Usuario
         exclude = ('contraseña_hash',)
 
-class RolSchema(ma.SQLAlchemyAutoSchema):
+class RolSchema(SchemaMedido):
     class Meta:
         model = Rol
 
-class AreaSchema(ma.SQLAlchemyAutoSchema):
+class AreaSchema(SchemaMedido):
     class Meta:
         model = Area
 
-class SucursalSchema(ma.SQLAlchemyAutoSchema):
+class SucursalSchema(SchemaMedido):
     class Meta:
         model = Sucursal
 
-class EquipoComputacionalSchema(ma.SQLAlchemyAutoSchema):
+class EquipoComputacionalSchema(SchemaMedido):
     class Meta:
         model = EquipoComputacional
 
-class CelularSchema(ma.SQLAlchemyAutoSchema):
+class CelularSchema(SchemaMedido):
     class Meta:
         model = Celular
 
-class ImpresoraSchema(ma.SQLAlchemyAutoSchema):
+class ImpresoraSchema(SchemaMedido):
     class Meta:
         model = Impresora
 
-class ConsumibleSchema(ma.SQLAlchemyAutoSchema):
+class ConsumibleSchema(SchemaMedido):
     class Meta:
         model = Consumible
 
-class HistorialMovimientoSchema(ma.SQLAlchemyAutoSchema):
+class HistorialMovimientoSchema(SchemaMedido):
     class Meta:
         model = HistorialMovimiento
+
+class TrabajoSchema(SchemaMedido):
+    class Meta:
+        model = Trabajo
+        include_fk = True
+        exclude = ('archivo',)
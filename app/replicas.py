@@ -0,0 +1,186 @@
+import logging
+import math
+import random
+import threading
+import time
+from flask import g, request, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session as SessionBase
+from sqlalchemy.sql.dml import UpdateBase
+from .instrumentation import Contador, METRICAS
+from .shards import engine_de_shard
+
+logger = logging.getLogger(__name__)
+
+CONSULTAS_POR_DESTINO = Contador(
+    'inventario_db_route_total', 'Sentencias enviadas a la primaria o a una réplica', ('destino',)
+)
+METRICAS.append(CONSULTAS_POR_DESTINO)
+
+PREFIJO_BIND = 'replica_'
+
+_estado = {
+    'claves': [],
+    'caidas': {},
+    'pegajoso': 5.0,
+    'reintento': 30.0,
+    'excluidos': frozenset(),
+}
+# Última escritura de cada usuario: durante `pegajoso` segundos sus lecturas van a la primaria.
+# La marca del proceso solo la ve el worker que atendió la escritura; la del cliente
+# (cookie o cabecera que devuelve en las peticiones siguientes) vale en cualquier worker
+_escrituras = {}
+COOKIE_ESCRITURA = 'ultima_escritura'
+CABECERA_ESCRITURA = 'X-Ultima-Escritura'
+_lock = threading.Lock()
+
+def _identidad():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:  # ruta sin @jwt_required
+        return None
+
+def _replica_disponible(descartadas=()):
+    ahora = time.monotonic()
+    sanas = [c for c in _estado['claves'] if _estado['caidas'].get(c, 0) <= ahora and c not in descartadas]
+    return random.choice(sanas) if sanas else None
+
+# Epoch de la última escritura que informa el cliente, o None si no manda una válida
+def _escritura_del_cliente():
+    valor = request.headers.get(CABECERA_ESCRITURA) or request.cookies.get(COOKIE_ESCRITURA)
+    try:
+        return float(valor) if valor else None
+    except ValueError:
+        return None
+
+def _leer_de_replica():
+    if not _estado['claves'] or not has_request_context():
+        return False
+    decision = g.get('_leer_replica')
+    if decision is None:
+        decision = request.method in ('GET', 'HEAD') and request.endpoint not in _estado['excluidos']
+        if decision:
+            identidad = _identidad()
+            marcas = [_escrituras.get(identidad) if identidad is not None else None, _escritura_del_cliente()]
+            ahora = time.time()
+            # Una marca del futuro (reloj adelantado o manipulada) no fija la primaria
+            decision = not any(m is not None and 0 <= ahora - m <= _estado['pegajoso'] for m in marcas)
+        g._leer_replica = decision
+    return decision
+
+# Si la petición actual leyó de una réplica (la caché no guarda lo que pudo leerse atrasado)
+def leyo_de_replica():
+    return has_request_context() and g.get('_uso_replica', False)
+
+# Retraso que se asume para las réplicas: el mismo que fija las lecturas en la primaria
+def ventana_retraso():
+    return _estado['pegajoso']
+
+# Sesión que manda las tablas fragmentadas a su shard, las lecturas de los GET
+# a una réplica y todo lo demás a la primaria
+class SesionEnrutada(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            engine = engine_de_shard(self._db, mapper, clause)
+            if engine is not None:
+                return engine
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) and _leer_de_replica():
+            probadas = set()
+            clave = _replica_disponible()
+            while clave is not None:
+                engine = self._db.engines[clave]
+                try:
+                    # Abre (o reutiliza) la conexión de la transacción: si la réplica no
+                    # responde, handle_error la saca de rotación y se prueba otra
+                    self.connection(bind_arguments={'bind': engine})
+                    CONSULTAS_POR_DESTINO.incrementar('replica')
+                    g._uso_replica = True
+                    return engine
+                except DBAPIError:
+                    probadas.add(clave)
+                    clave = _replica_disponible(probadas)
+        if _estado['claves']:
+            CONSULTAS_POR_DESTINO.incrementar('primaria')
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _marcar_escritura(session, flush_context):
+    session.info['_escribio'] = True
+
+def _registrar_escritura(session):
+    if not session.info.pop('_escribio', False) or not has_request_context():
+        return
+    ahora = time.time()
+    g._ultima_escritura = ahora
+    identidad = _identidad()
+    if identidad is not None:
+        with _lock:
+            _escrituras[identidad] = ahora
+            # Se descartan las marcas vencidas para que el diccionario no crezca sin límite
+            if len(_escrituras) > 10000:
+                limite = ahora - _estado['pegajoso']
+                for clave in [k for k, v in _escrituras.items() if v < limite]:
+                    del _escrituras[clave]
+
+def _descartar_escritura(session, previous_transaction):
+    session.info.pop('_escribio', None)
+
+# La respuesta de una petición que escribió lleva la marca en una cookie y en una cabecera
+# (para clientes sin cookies, que la reenvían como X-Ultima-Escritura)
+def _enviar_marca(response):
+    ultima = g.pop('_ultima_escritura', None)
+    if ultima is not None:
+        marca = f'{ultima:.3f}'
+        response.headers[CABECERA_ESCRITURA] = marca
+        response.set_cookie(
+            COOKIE_ESCRITURA, marca, max_age=max(1, math.ceil(_estado['pegajoso'])), httponly=True, samesite='Lax'
+        )
+    return response
+
+def _vigilar(clave, engine):
+    @event.listens_for(engine, 'handle_error')
+    def marcar_caida(contexto):
+        # Desconexión o fallo al conectar: la réplica sale de rotación por un tiempo
+        if contexto.is_disconnect or contexto.connection is None:
+            _estado['caidas'][clave] = time.monotonic() + _estado['reintento']
+            logger.warning("Réplica %s fuera de rotación por %ss: %s",
+                           clave, _estado['reintento'], contexto.original_exception)
+
+# Debe llamarse antes de db.init_app: las réplicas se declaran como binds de Flask-SQLAlchemy
+def configurar_replicas(app):
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    claves = [f'{PREFIJO_BIND}{i}' for i in range(len(uris))]
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds.update(zip(claves, uris))
+    app.config['SQLALCHEMY_BINDS'] = binds
+    _estado.update(
+        claves=claves,
+        caidas={},
+        pegajoso=app.config.get('REPLICA_STICKY_SECONDS', 5),
+        reintento=app.config.get('REPLICA_RETRY_SECONDS', 30),
+        excluidos=frozenset(app.config.get('REPLICA_EXCLUDED_ENDPOINTS') or ()),
+    )
+
+# Binds sobre los que se crean tablas: las réplicas reciben el esquema por replicación
+# y los shards solo las tablas fragmentadas (ver shards.init_shards)
+def binds_sin_replicas(db):
+    from .shards import claves_shards
+
+    excluidas = set(_estado['claves']) | set(claves_shards())
+    return [clave for clave in db.metadatas if clave not in excluidas]
+
+def init_replicas(app, db):
+    if not _estado['claves']:
+        return
+
+    with app.app_context():
+        for clave in _estado['claves']:
+            _vigilar(clave, db.engines[clave])
+    if not event.contains(SessionBase, 'after_flush', _marcar_escritura):
+        event.listen(SessionBase, 'after_flush', _marcar_escritura)
+        event.listen(SessionBase, 'after_commit', _registrar_escritura)
+        event.listen(SessionBase, 'after_soft_rollback', _descartar_escritura)
+    app.after_request(_enviar_marca)
+    logger.info("Lecturas enrutadas a %d réplica(s)", len(_estado['claves']))
@@ -0,0 +1,259 @@
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app, g
+from sqlalchemy import func
+from . import db
+from .models import (
+    InventarioGeneral, Area, Usuario, Sucursal, RegistroCambio, ReporteSucursal, Trabajo
+)
+from .shards import activo as sharding_activo, shard_de_sucursal
+from .trabajos import tarea, periodica, encolar, ejecutor_en_proceso
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl es opcional: sin él no se genera el XLSX
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+ESTADOS = ('Asignado', 'SinAsignar', 'EnReparacion', 'DeBaja')
+TIPOS = ('Computacional', 'Celular', 'Impresora')
+
+# Columnas de cada vista, en el orden del CSV y de la hoja XLSX
+VISTAS = {
+    'area': ('id_area', 'area') + ESTADOS + ('total',),
+    'responsable': ('id_usuario', 'responsable') + ESTADOS + ('total',),
+    'estado': ('estado',) + TIPOS + ('total',),
+}
+
+# Expresión cron de cinco campos (minuto hora día mes día_semana) con *, */n, a-b y listas
+class Cron:
+    LIMITES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expresion):
+        campos = expresion.split()
+        if len(campos) != 5:
+            raise ValueError(f"Expresión cron inválida: {expresion!r}")
+        self.campos = [self._valores(campo, *limites) for campo, limites in zip(campos, self.LIMITES)]
+
+    @staticmethod
+    def _valores(campo, minimo, maximo):
+        valores = set()
+        for parte in campo.split(','):
+            rango, _, paso = parte.partition('/')
+            if rango == '*':
+                inicio, fin = minimo, maximo
+            elif '-' in rango:
+                inicio, fin = map(int, rango.split('-'))
+            else:
+                inicio = int(rango)
+                fin = maximo if paso else inicio
+            valores.update(range(inicio, fin + 1, int(paso or 1)))
+        return valores
+
+    def coincide(self, fecha):
+        minutos, horas, dias, meses, semana = self.campos
+        return (fecha.minute in minutos and fecha.hour in horas and fecha.day in dias
+                and fecha.month in meses and fecha.isoweekday() % 7 in semana)
+
+_estado = {'cron': None, 'ultimo_minuto': None, 'ultima_revision': 0.0}
+
+def ruta_reporte(id_sucursal, extension, vista=None):
+    nombre = f'sucursal_{id_sucursal}' + (f'_{vista}' if vista else '')
+    return os.path.join(os.path.abspath(current_app.config['REPORTES_DIR']), f'{nombre}.{extension}')
+
+# Se escribe en un temporal y se reemplaza: quien descarga nunca ve un archivo a medias
+def _escribir(ruta, escribir, modo='w'):
+    temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+    if modo == 'wb':
+        escribir(temporal)
+    else:
+        with open(temporal, modo, newline='', encoding='utf-8') as archivo:
+            escribir(archivo)
+    os.replace(temporal, ruta)
+
+# Las tres vistas salen de un único GROUP BY sobre inventario_general;
+# los nombres de áreas y responsables se resuelven después con consultas IN
+def calcular_vistas(id_sucursal):
+    filas = db.session.query(
+        InventarioGeneral.id_area_responsable, InventarioGeneral.id_usuario_responsable,
+        InventarioGeneral.estado, InventarioGeneral.tipo_equipo, func.count()
+    ).filter(InventarioGeneral.id_sucursal_ubicacion == id_sucursal).group_by(
+        InventarioGeneral.id_area_responsable, InventarioGeneral.id_usuario_responsable,
+        InventarioGeneral.estado, InventarioGeneral.tipo_equipo
+    ).all()
+
+    ids_area = {fila[0] for fila in filas if fila[0] is not None}
+    ids_usuario = {fila[1] for fila in filas if fila[1] is not None}
+    areas = dict(db.session.query(Area.id_area, Area.nombre_area).filter(Area.id_area.in_(ids_area))) if ids_area else {}
+    usuarios = dict(db.session.query(Usuario.id, Usuario.nombre).filter(Usuario.id.in_(ids_usuario))) if ids_usuario else {}
+
+    por_area = {}
+    por_responsable = {}
+    por_estado = {estado: dict({t: 0 for t in TIPOS}, estado=estado, total=0) for estado in ESTADOS}
+    for id_area, id_usuario, estado, tipo, cantidad in filas:
+        estado = estado or 'SinAsignar'
+        area = por_area.setdefault(id_area, dict(
+            {e: 0 for e in ESTADOS}, id_area=id_area, area=areas.get(id_area), total=0))
+        responsable = por_responsable.setdefault(id_usuario, dict(
+            {e: 0 for e in ESTADOS}, id_usuario=id_usuario, responsable=usuarios.get(id_usuario), total=0))
+        for grupo in (area, responsable):
+            grupo[estado] += cantidad
+            grupo['total'] += cantidad
+        por_estado[estado][tipo] += cantidad
+        por_estado[estado]['total'] += cantidad
+
+    def ordenar(grupos):
+        return sorted(grupos, key=lambda grupo: -grupo['total'])
+
+    return {
+        'area': ordenar(por_area.values()),
+        'responsable': ordenar(por_responsable.values()),
+        'estado': list(por_estado.values()),
+    }
+
+def _escribir_xlsx(ruta, vistas):
+    libro = openpyxl.Workbook()
+    libro.remove(libro.active)
+    for vista, columnas in VISTAS.items():
+        hoja = libro.create_sheet(vista)
+        hoja.append(columnas)
+        for fila in vistas[vista]:
+            hoja.append([fila[c] for c in columnas])
+    libro.save(ruta)
+
+def generar_reporte(id_sucursal, trabajo=None):
+    # Los cambios posteriores a este punto cuentan como pendientes del reporte
+    seq = db.session.query(func.max(RegistroCambio.seq)).scalar() or 0
+    if sharding_activo():
+        g._shard = shard_de_sucursal(id_sucursal)
+    generado = datetime.utcnow()
+    vistas = calcular_vistas(id_sucursal)
+    total = sum(fila['total'] for fila in vistas['estado'])
+
+    os.makedirs(os.path.abspath(current_app.config['REPORTES_DIR']), exist_ok=True)
+    ruta_json = ruta_reporte(id_sucursal, 'json')
+    _escribir(ruta_json, lambda archivo: json.dump({
+        "id_sucursal": id_sucursal,
+        "generado": generado.isoformat(),
+        "total_equipos": total,
+        "vistas": vistas,
+    }, archivo, ensure_ascii=False))
+    for vista, columnas in VISTAS.items():
+        def escribir_csv(archivo, vista=vista, columnas=columnas):
+            escritor = csv.DictWriter(archivo, fieldnames=columnas)
+            escritor.writeheader()
+            escritor.writerows(vistas[vista])
+        _escribir(ruta_reporte(id_sucursal, 'csv', vista), escribir_csv)
+    formatos = ['json', 'csv']
+    if openpyxl is not None:
+        _escribir(ruta_reporte(id_sucursal, 'xlsx'), lambda ruta: _escribir_xlsx(ruta, vistas), modo='wb')
+        formatos.append('xlsx')
+
+    reporte = ReporteSucursal.query.get(id_sucursal)
+    if reporte is None:
+        reporte = ReporteSucursal(id_sucursal=id_sucursal)
+        db.session.add(reporte)
+    reporte.fecha_generacion = generado
+    reporte.seq_cambios = seq
+    reporte.total_equipos = total
+    reporte.formatos = formatos
+    reporte.id_trabajo = trabajo.id if trabajo is not None else None
+    return ruta_json
+
+@tarea('reporte_sucursal')
+def reporte_sucursal(trabajo, avance):
+    id_sucursal = (trabajo.parametros or {}).get('id_sucursal')
+    if id_sucursal is None:
+        raise ValueError("El reporte requiere id_sucursal")
+    trabajo.archivo = generar_reporte(id_sucursal, trabajo)
+    return {"id_sucursal": id_sucursal}
+
+# Metadatos de frescura: antigüedad y cambios registrados desde que se generó
+def estado_reporte(reporte):
+    pendientes = db.session.query(func.count(RegistroCambio.seq)).filter(
+        RegistroCambio.id_sucursal == reporte.id_sucursal,
+        RegistroCambio.seq > reporte.seq_cambios
+    ).scalar()
+    return {
+        "id_sucursal": reporte.id_sucursal,
+        "generado": reporte.fecha_generacion.isoformat(),
+        "edad_segundos": int((datetime.utcnow() - reporte.fecha_generacion).total_seconds()),
+        "cambios_pendientes": pendientes,
+        "actualizado": pendientes == 0,
+        "total_equipos": reporte.total_equipos,
+        "formatos": reporte.formatos or [],
+    }
+
+# Encola el reporte de las sucursales que no tengan ya uno pendiente o en proceso
+def encolar_reportes(ids_sucursal, id_usuario=None):
+    en_cola = {}
+    for trabajo in Trabajo.query.filter(Trabajo.tipo == 'reporte_sucursal',
+                                        Trabajo.estado.in_(('pendiente', 'en_proceso'))):
+        en_cola[(trabajo.parametros or {}).get('id_sucursal')] = trabajo
+    trabajos = []
+    for id_sucursal in sorted(ids_sucursal):
+        trabajo = en_cola.get(id_sucursal)
+        if trabajo is None:
+            trabajo = encolar('reporte_sucursal', {'id_sucursal': id_sucursal}, id_usuario)
+        trabajos.append(trabajo)
+    return trabajos
+
+def _toca_cron(cron):
+    minuto = datetime.now().replace(second=0, microsecond=0)
+    anterior = _estado['ultimo_minuto']
+    _estado['ultimo_minuto'] = minuto
+    if anterior is None:
+        return False
+    # Minutos transcurridos desde la revisión anterior, con un tope de un día
+    momento = max(anterior, minuto - timedelta(days=1)) + timedelta(minutes=1)
+    while momento <= minuto:
+        if cron.coincide(momento):
+            return True
+        momento += timedelta(minutes=1)
+    return False
+
+# Se ejecuta en cada sondeo del ejecutor de trabajos: programa los reportes del cron,
+# los de sucursales sin reporte y los de sucursales con muchos cambios acumulados
+@periodica
+def programar_reportes():
+    cron = _estado['cron']
+    if cron is None:
+        return
+    ahora = time.monotonic()
+    if ahora - _estado['ultima_revision'] < current_app.config['REPORTES_REVISION_SEGUNDOS']:
+        return
+    _estado['ultima_revision'] = ahora
+
+    if _toca_cron(cron):
+        vencidas = {s for (s,) in db.session.query(Sucursal.id_sucursal)}
+    else:
+        vencidas = {s for (s,) in db.session.query(Sucursal.id_sucursal).outerjoin(
+            ReporteSucursal, ReporteSucursal.id_sucursal == Sucursal.id_sucursal
+        ).filter(ReporteSucursal.id_sucursal.is_(None))}
+        umbral = current_app.config['REPORTES_UMBRAL_CAMBIOS']
+        if umbral:
+            vencidas |= {s for s, _ in db.session.query(RegistroCambio.id_sucursal, func.count()).join(
+                ReporteSucursal, ReporteSucursal.id_sucursal == RegistroCambio.id_sucursal
+            ).filter(
+                RegistroCambio.seq > ReporteSucursal.seq_cambios
+            ).group_by(RegistroCambio.id_sucursal).having(func.count() >= umbral)}
+
+    if vencidas:
+        trabajos = encolar_reportes(vencidas)
+        logger.info("Reportes programados para %d sucursal(es)", len(trabajos))
+
+def _asegurar_ejecutor():
+    ejecutor_en_proceso(current_app._get_current_object())
+
+def init_reportes(app):
+    expresion = app.config.get('REPORTES_CRON')
+    _estado.update(cron=Cron(expresion) if expresion else None, ultimo_minuto=None, ultima_revision=0.0)
+    # Sin cron no hay nada que programar: los reportes se piden a demanda
+    if _estado['cron'] is not None and app.config.get('TRABAJOS_EN_PROCESO'):
+        app.before_request(_asegurar_ejecutor)
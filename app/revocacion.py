@@ -0,0 +1,162 @@
+import calendar
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, select
+from . import db
+from .models import Revocacion
+
+logger = logging.getLogger(__name__)
+
+_tabla = Revocacion.__table__
+
+# Copia en memoria de las revocaciones vigentes: la comprobación de cada petición
+# es una búsqueda en un diccionario. Las fechas se guardan como epoch UTC
+_estado = {
+    'jtis': {},        # jti -> expira
+    'usuarios': {},    # id_usuario -> (emitidos_hasta, expira)
+    'ultimo_id': 0,
+    'ultima_sync': None,
+    'ultima_purga': 0.0,
+    'persistente': True,
+    'refresco': 5,
+    'margen': 2,
+    'vida_maxima': 30 * 86400,
+}
+_lock = threading.Lock()
+
+# Hilo que relee las revocaciones cada `refresco` segundos: las peticiones (también las
+# del servidor asíncrono) solo consultan los diccionarios, sin tocar la base
+_refresco = {'hilo': None, 'app': None, 'primera': threading.Event(), 'despertar': threading.Event()}
+_lock_hilo = threading.Lock()
+
+def _epoch(fecha):
+    return calendar.timegm(fecha.utctimetuple())
+
+def _fecha(epoch):
+    return datetime(1970, 1, 1) + timedelta(seconds=epoch)
+
+def _aplicar(jti, id_usuario, emitidos_hasta, expira):
+    if jti:
+        _estado['jtis'][jti] = expira
+        return
+    marca = _estado['usuarios'].get(id_usuario)
+    if marca is None or marca[0] < emitidos_hasta:
+        _estado['usuarios'][id_usuario] = (emitidos_hasta, max(expira, marca[1] if marca else 0))
+
+def _purgar_memoria(ahora):
+    for jti in [j for j, expira in _estado['jtis'].items() if expira < ahora]:
+        del _estado['jtis'][jti]
+    for id_usuario in [u for u, (_, expira) in _estado['usuarios'].items() if expira < ahora]:
+        del _estado['usuarios'][id_usuario]
+
+# Trae las revocaciones que otros procesos guardaron desde la última lectura. Las filas
+# más recientes que `margen` se vuelven a leer
+# en la siguiente pasada por si un id menor aún no estaba confirmado. La llama el hilo
+# de refresco; las peticiones nunca consultan la base para esto
+def sincronizar(forzar=False):
+    if not _estado['persistente']:
+        return
+    ahora = time.monotonic()
+    if not forzar and _estado['ultima_sync'] is not None and ahora - _estado['ultima_sync'] < _estado['refresco']:
+        return
+    # Si otro hilo ya está sincronizando, se usa la copia actual
+    if not _lock.acquire(blocking=False):
+        return
+    try:
+        _estado['ultima_sync'] = ahora
+        utc = datetime.utcnow()
+        with db.engine.connect() as conn:
+            filas = conn.execute(select(_tabla).where(
+                _tabla.c.id > _estado['ultimo_id'], _tabla.c.expira > utc
+            ).order_by(_tabla.c.id)).all()
+        limite = utc - timedelta(seconds=_estado['margen'])
+        for fila in filas:
+            _aplicar(fila.jti, str(fila.id_usuario) if fila.id_usuario is not None else None,
+                     _epoch(fila.emitidos_hasta) if fila.emitidos_hasta else 0, _epoch(fila.expira))
+            if fila.fecha <= limite:
+                _estado['ultimo_id'] = fila.id
+        _purgar_memoria(time.time())
+
+        if ahora - _estado['ultima_purga'] > 3600:
+            _estado['ultima_purga'] = ahora
+            with db.engine.begin() as conn:
+                conn.execute(delete(_tabla).where(_tabla.c.expira < utc))
+    finally:
+        _lock.release()
+
+def _refrescar_periodicamente():
+    while True:
+        try:
+            with _refresco['app'].app_context():
+                sincronizar(forzar=True)
+        except Exception:
+            logger.exception("Error releyendo las revocaciones")
+        finally:
+            _refresco['primera'].set()
+        _refresco['despertar'].wait(_estado['refresco'])
+        _refresco['despertar'].clear()
+
+# Se inicia en la primera comprobación y no al crear la app: las tablas ya existen y,
+# con preload_app, cada worker arranca su propio hilo (los hilos no pasan al fork)
+def _asegurar_refresco():
+    hilo = _refresco['hilo']
+    if hilo is None or not hilo.is_alive():
+        with _lock_hilo:
+            hilo = _refresco['hilo']
+            if hilo is None or not hilo.is_alive():
+                _refresco['app'] = current_app._get_current_object()
+                _refresco['primera'].clear()
+                _refresco['hilo'] = threading.Thread(
+                    target=_refrescar_periodicamente, name='revocaciones', daemon=True
+                )
+                _refresco['hilo'].start()
+    # Solo al arrancar el proceso: la primera lectura debe terminar antes de aceptar tokens
+    if not _refresco['primera'].is_set():
+        _refresco['primera'].wait(_estado['refresco'])
+
+def token_revocado(claims):
+    if _estado['persistente']:
+        _asegurar_refresco()
+    if claims.get('jti') in _estado['jtis']:
+        return True
+    marca = _estado['usuarios'].get(str(claims.get(current_app.config['JWT_IDENTITY_CLAIM'])))
+    # iat tiene resolución de segundos: se invalida también lo emitido en el mismo segundo
+    return marca is not None and claims.get('iat', 0) <= marca[0]
+
+# Las dos funciones siguientes agregan la fila a la sesión actual: quien llama confirma
+def revocar_token(claims):
+    _aplicar(claims['jti'], None, 0, claims['exp'])
+    if _estado['persistente']:
+        db.session.add(Revocacion(jti=claims['jti'], expira=_fecha(claims['exp'])))
+
+def revocar_usuario(id_usuario):
+    ahora = int(time.time())
+    expira = ahora + _estado['vida_maxima']
+    _aplicar(None, str(id_usuario), ahora, expira)
+    if _estado['persistente']:
+        db.session.add(Revocacion(id_usuario=id_usuario, emitidos_hasta=_fecha(ahora), expira=_fecha(expira)))
+
+def init_revocacion(app, jwt):
+    vidas = [app.config.get('JWT_ACCESS_TOKEN_EXPIRES'), app.config.get('JWT_REFRESH_TOKEN_EXPIRES')]
+    _estado.update(
+        jtis={},
+        usuarios={},
+        ultimo_id=0,
+        ultima_sync=None,
+        persistente=app.config.get('REVOCACION_PERSISTENTE', True),
+        refresco=app.config.get('REVOCACION_REFRESCO_SEGUNDOS', 5),
+        margen=app.config.get('SYNC_MARGEN_SEGUNDOS', 2),
+        vida_maxima=int(max((v.total_seconds() for v in vidas if isinstance(v, timedelta)), default=30 * 86400)),
+    )
+    # Una app nueva (p. ej. en pruebas) usa el hilo existente: se relee enseguida con su contexto
+    _refresco['app'] = app
+    if _refresco['hilo'] is not None and _refresco['hilo'].is_alive():
+        _refresco['primera'].clear()
+        _refresco['despertar'].set()
+
+    @jwt.token_in_blocklist_loader
+    def verificar_revocacion(jwt_header, jwt_payload):
+        return token_revocado(jwt_payload)
@@ -0,0 +1,72 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func
+from ..models import Usuario, InventarioGeneral, Consumible
+from ..slow_queries import leer_consultas_lentas
+from ..shards import en_todos_los_shards
+from .. import db
+
+admin_bp = Blueprint('admin', __name__)
+
+# Verificar permisos por rol
+def check_admin_permission(usuario_id):
+    usuario = Usuario.query.get(usuario_id)
+    if not usuario or usuario.id_rol != 1:  # Asumimos que rol_id 1 es Administrador
+        return False
+    return True
+
+@admin_bp.route('/consultas-lentas', methods=['GET'])
+@jwt_required()
+def get_consultas_lentas():
+    try:
+        usuario_id = get_jwt_identity()
+
+        if not check_admin_permission(usuario_id):
+            return jsonify({"error": "No tienes permiso para ver las consultas lentas"}), 403
+
+        limite = request.args.get('limite', 100, type=int)
+        return jsonify(leer_consultas_lentas(min(max(limite, 1), 1000))), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _resumen_shard():
+    equipos = db.session.query(
+        InventarioGeneral.id_sucursal_ubicacion, InventarioGeneral.tipo_equipo,
+        InventarioGeneral.estado, func.count()
+    ).group_by(
+        InventarioGeneral.id_sucursal_ubicacion, InventarioGeneral.tipo_equipo, InventarioGeneral.estado
+    ).all()
+    consumibles = db.session.query(
+        Consumible.id_sucursal_stock, func.count(), func.sum(Consumible.stock_actual),
+        func.sum(db.case((Consumible.stock_actual < Consumible.stock_minimo, 1), else_=0))
+    ).group_by(Consumible.id_sucursal_stock).all()
+    return equipos, consumibles
+
+# Totales por sucursal; con sharding se calculan en paralelo en cada shard y se suman
+@admin_bp.route('/resumen-inventario', methods=['GET'])
+@jwt_required()
+def get_resumen_inventario():
+    try:
+        usuario_id = get_jwt_identity()
+
+        if not check_admin_permission(usuario_id):
+            return jsonify({"error": "No tienes permiso para ver el resumen del inventario"}), 403
+
+        resumen = {}
+        for equipos, consumibles in en_todos_los_shards(_resumen_shard):
+            for id_sucursal, tipo, estado, cantidad in equipos:
+                sucursal = resumen.setdefault(str(id_sucursal), {"equipos": {}, "consumibles": {}})
+                por_tipo = sucursal["equipos"].setdefault(tipo, {})
+                por_tipo[estado] = por_tipo.get(estado, 0) + cantidad
+            for id_sucursal, cantidad, stock, bajo_minimo in consumibles:
+                sucursal = resumen.setdefault(str(id_sucursal), {"equipos": {}, "consumibles": {}})
+                totales = sucursal["consumibles"]
+                totales["cantidad"] = totales.get("cantidad", 0) + cantidad
+                totales["stock_total"] = totales.get("stock_total", 0) + (stock or 0)
+                totales["bajo_minimo"] = totales.get("bajo_minimo", 0) + (bajo_minimo or 0)
+
+        return jsonify(resumen), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
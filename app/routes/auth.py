@@ -1,6 +1,8 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask import Blueprint, jsonify, request, current_app
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt
 from ..models import Usuario, UsuarioSchema
+from ..intentos import LOGINS_RECHAZADOS, verificar_ficticio
+from ..revocacion import revocar_token, revocar_usuario
 from .. import db
 
 auth_bp = Blueprint('auth', __name__)
@@ -13,11 +15,32 @@ def login():
         
         if not data or 'usuario' not in data or 'password' not in data:
             return jsonify({"error": "Usuario y contraseña son requeridos"}), 400
+
+        # Los intentos sobre el límite se rechazan antes de consultar la base y de bcrypt
+        intentos = current_app.extensions['intentos_login']
+        clave_usuario = f"usuario:{str(data['usuario']).strip().lower()}"
+        clave_ip = f"ip:{request.remote_addr}"
+        for clave, limite, motivo in (
+            (clave_usuario, current_app.config['LOGIN_MAX_FALLOS_USUARIO'], 'usuario'),
+            (clave_ip, current_app.config['LOGIN_MAX_FALLOS_IP'], 'ip'),
+        ):
+            espera = intentos.espera(clave, limite)
+            if espera:
+                LOGINS_RECHAZADOS.incrementar(motivo)
+                respuesta = jsonify({"error": "Demasiados intentos fallidos, intenta de nuevo más tarde"})
+                respuesta.headers['Retry-After'] = str(espera)
+                return respuesta, 429
             
         usuario = Usuario.query.filter_by(usuario=data['usuario']).first()
         
-        if not usuario or not usuario.check_password(data['password']):
+        # Sin usuario se compara contra un hash ficticio para que la respuesta tarde lo mismo
+        valida = usuario.check_password(data['password']) if usuario else verificar_ficticio(data['password'])
+        if not valida:
+            intentos.fallo(clave_usuario)
+            intentos.fallo(clave_ip)
             return jsonify({"error": "Credenciales inválidas"}), 401
+
+        intentos.olvidar(clave_usuario)
             
         if not usuario.activo:
             return jsonify({"error": "Usuario desactivado"}), 403
@@ -48,6 +71,26 @@ def refresh():
         "access_token": access_token
     }), 200
 
+# Revoca el token con el que se llama (de acceso o de refresco); con {"todos": true}
+# revoca todos los tokens emitidos al usuario hasta ahora
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    try:
+        data = request.get_json(silent=True) or {}
+
+        if data.get('todos'):
+            revocar_usuario(get_jwt_identity())
+        else:
+            revocar_token(get_jwt())
+        db.session.commit()
+
+        return jsonify({"mensaje": "Sesión cerrada correctamente"}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 @auth_bp.route('/perfil', methods=['GET'])
 @jwt_required()
 def perfil():
@@ -5,6 +5,16 @@ from ..models import (
     InventarioGeneral, Usuario, HistorialMovimiento
 )
 from .. import db
+from ..cache import cacheado
+from ..cargas import por_id
+from ..idempotencia import idempotente
+from ..transacciones import alta_dispositivo
+from ..ciclo_vida import transicion_invalida
+from ..shards import sucursal_fuera_del_shard
+from ..fieldsets import (
+    CAMPOS_INVENTARIO, CamposInvalidos, campos_solicitados, columnas_modelo,
+    solo_columnas, schema_parcial, campos_inventario
+)
 from datetime import datetime
 
 celulares_bp = Blueprint('celulares', __name__)
@@ -20,6 +30,7 @@ def check_admin_permission(usuario_id):
 
 @celulares_bp.route('/', methods=['GET'])
 @jwt_required()
+@cacheado('Celular', por_sucursal=True)
 def get_celulares():
     try:
         usuario_id = get_jwt_identity()
@@ -28,29 +39,37 @@ def get_celulares():
         if not usuario:
             return jsonify({"error": "Usuario no autorizado"}), 401
             
+        # Campos pedidos con ?fields=; solo se consultan esas columnas
+        try:
+            campos = campos_solicitados(columnas_modelo(Celular) + CAMPOS_INVENTARIO)
+        except CamposInvalidos as e:
+            return jsonify({"error": str(e)}), 400
+
         # Filtrar por sucursal activa del usuario
         id_sucursal = usuario.sucursal_activa
 
         # Obtener todos los registros de inventario general que sean celulares
-        inventario = InventarioGeneral.query.filter_by(
+        query = InventarioGeneral.query.filter_by(
             tipo_equipo='Celular', 
             id_sucursal_ubicacion=id_sucursal
-        ).all()
+        )
+        detalle_query = Celular.query
+        schema = celular_schema
+        if campos is not None:
+            campos_detalle = campos - set(CAMPOS_INVENTARIO)
+            query = query.options(solo_columnas(InventarioGeneral, campos, obligatorias=('id_registro',)))
+            detalle_query = detalle_query.options(solo_columnas(Celular, campos_detalle))
+            schema = schema_parcial(CelularSchema, campos_detalle)
+        inventario = query.all()
         
         result = []
+        # Detalles de todo el listado con una consulta IN
+        detalles = por_id(Celular, (item.id_registro for item in inventario), query=detalle_query)
         for item in inventario:
-            celular = Celular.query.get(item.id_registro)
+            celular = detalles.get(item.id_registro)
             if celular:
-                celular_data = celular_schema.dump(celular)
-                celular_data.update({
-                    "id_inventario": item.id_inventario,
-                    "estado": item.estado,
-                    "id_usuario_responsable": item.id_usuario_responsable,
-                    "id_area_responsable": item.id_area_responsable,
-                    "id_sucursal_ubicacion": item.id_sucursal_ubicacion,
-                    "fecha_ingreso": item.fecha_ingreso.isoformat() if item.fecha_ingreso else None,
-                    "observaciones": item.observaciones
-                })
+                celular_data = schema.dump(celular)
+                celular_data.update(campos_inventario(item, campos))
                 result.append(celular_data)
                 
         return jsonify(result), 200
@@ -60,6 +79,7 @@ def get_celulares():
 
 @celulares_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@cacheado('Celular')
 def get_celular(id):
     try:
         usuario_id = get_jwt_identity()
@@ -102,6 +122,7 @@ def get_celular(id):
 
 @celulares_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotente
 def add_celular():
     try:
         usuario_id = get_jwt_identity()
@@ -112,8 +133,8 @@ def add_celular():
             
         data = request.get_json()
         
-        # Crear el registro del celular
-        nuevo_celular = Celular(
+        # Detalle, inventario e historial en una sola transacción, con reintentos ante deadlocks
+        id_celular, id_inventario = alta_dispositivo('Celular', lambda: Celular(
             codigo_interno=data.get('codigo_interno'),
             marca=data.get('marca'),
             modelo=data.get('modelo'),
@@ -122,30 +143,12 @@ def add_celular():
             sistema_operativo=data.get('sistema_operativo'),
             capacidad_almacenamiento=data.get('capacidad_almacenamiento'),
             comentarios=data.get('comentarios')
-        )
-        
-        db.session.add(nuevo_celular)
-        db.session.flush()  # Para obtener el ID generado
-        
-        # Crear el registro en inventario general
-        nuevo_inventario = InventarioGeneral(
-            tipo_equipo='Celular',
-            id_registro=nuevo_celular.id_celular,
-            estado=data.get('estado', 'SinAsignar'),
-            id_usuario_responsable=data.get('id_usuario_responsable'),
-            id_area_responsable=data.get('id_area_responsable'),
-            id_sucursal_ubicacion=data.get('id_sucursal_ubicacion'),
-            fecha_ingreso=datetime.now(),
-            observaciones=data.get('observaciones', '')
-        )
-        
-        db.session.add(nuevo_inventario)
-        db.session.commit()
+        ), data)
         
         return jsonify({
             "mensaje": "Celular agregado correctamente",
-            "id_celular": nuevo_celular.id_celular,
-            "id_inventario": nuevo_inventario.id_inventario
+            "id_celular": id_celular,
+            "id_inventario": id_inventario
         }), 201
         
     except Exception as e:
@@ -178,6 +181,18 @@ def update_celular(id):
             
         data = request.get_json()
         
+        # Validar el cambio de estado antes de modificar nada
+        if 'estado' in data:
+            error = transicion_invalida(inventario.estado, data['estado'])
+            if error:
+                return jsonify({"error": error}), 400
+
+        # Con sharding, el registro no puede pasar a una sucursal de otra región
+        if 'id_sucursal_ubicacion' in data:
+            error = sucursal_fuera_del_shard(data['id_sucursal_ubicacion'])
+            if error:
+                return jsonify({"error": error}), 409
+        
         # Actualizar el celular
         if 'codigo_interno' in data:
             celular.codigo_interno = data['codigo_interno']
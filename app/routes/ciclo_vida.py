@@ -0,0 +1,69 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..models import Usuario
+from ..ciclo_vida import ESTADOS, TRANSICIONES, UMBRALES_DIAS, antiguedad_por_estado, estancados, transiciones
+
+ciclo_vida_bp = Blueprint('ciclo_vida', __name__)
+
+# Verificar permisos por rol
+def check_admin_permission(usuario_id):
+    usuario = Usuario.query.get(usuario_id)
+    if not usuario or usuario.id_rol != 1:  # Asumimos que rol_id 1 es Administrador
+        return False
+    return True
+
+@ciclo_vida_bp.route('/transiciones-permitidas', methods=['GET'])
+@jwt_required()
+def get_transiciones_permitidas():
+    return jsonify({estado: sorted(TRANSICIONES[estado]) for estado in ESTADOS}), 200
+
+# Equipos que llevan más de `dias` en un estado, p. ej. ?estado=EnReparacion&dias=30
+@ciclo_vida_bp.route('/estancados', methods=['GET'])
+@jwt_required()
+def get_estancados():
+    try:
+        usuario_id = get_jwt_identity()
+
+        if not check_admin_permission(usuario_id):
+            return jsonify({"error": "No tienes permiso para ver la antigüedad de los equipos"}), 403
+
+        estado = request.args.get('estado', 'EnReparacion')
+        if estado not in ESTADOS:
+            return jsonify({"error": f"Estado inválido. Opciones: {', '.join(ESTADOS)}"}), 400
+        dias = max(request.args.get('dias', 30, type=int), 0)
+        limite = min(max(request.args.get('limite', 100, type=int), 1), 1000)
+
+        equipos = estancados(estado, dias, limite)
+        return jsonify({"estado": estado, "dias": dias, "total": len(equipos), "equipos": equipos}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@ciclo_vida_bp.route('/antiguedad', methods=['GET'])
+@jwt_required()
+def get_antiguedad():
+    try:
+        usuario_id = get_jwt_identity()
+
+        if not check_admin_permission(usuario_id):
+            return jsonify({"error": "No tienes permiso para ver la antigüedad de los equipos"}), 403
+
+        return jsonify({"umbrales_dias": list(UMBRALES_DIAS), "estados": antiguedad_por_estado()}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Transiciones de un equipo por id_inventario; con sharding el id indica el shard
+@ciclo_vida_bp.route('/<int:id>/transiciones', methods=['GET'])
+@jwt_required()
+def get_transiciones(id):
+    try:
+        usuario_id = get_jwt_identity()
+
+        if not check_admin_permission(usuario_id):
+            return jsonify({"error": "No tienes permiso para ver las transiciones de estado"}), 403
+
+        return jsonify({"id_inventario": id, "transiciones": transiciones(id)}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -2,6 +2,11 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models import Consumible, ConsumibleSchema, Usuario
 from .. import db
+from ..cache import cacheado
+from ..cargas import perfil
+from ..idempotencia import idempotente
+from ..shards import sucursal_fuera_del_shard
+from ..fieldsets import CamposInvalidos, campos_solicitados, columnas_modelo, solo_columnas, schema_parcial
 
 consumibles_bp = Blueprint('consumibles', __name__)
 consumible_schema = ConsumibleSchema()
@@ -16,6 +21,7 @@ def check_admin_permission(usuario_id):
 
 @consumibles_bp.route('/', methods=['GET'])
 @jwt_required()
+@cacheado('Consumible', por_sucursal=True)
 def get_consumibles():
     try:
         usuario_id = get_jwt_identity()
@@ -24,17 +30,29 @@ def get_consumibles():
         if not usuario:
             return jsonify({"error": "Usuario no autorizado"}), 401
             
+        # Campos pedidos con ?fields=; solo se consultan esas columnas
+        try:
+            campos = campos_solicitados(columnas_modelo(Consumible))
+        except CamposInvalidos as e:
+            return jsonify({"error": str(e)}), 400
+
         # Filtrar por sucursal activa del usuario
         id_sucursal = usuario.sucursal_activa
         
-        consumibles = Consumible.query.filter_by(id_sucursal_stock=id_sucursal).all()
-        return jsonify(consumibles_schema.dump(consumibles)), 200
+        query = Consumible.query.options(*perfil('consumibles_listado')).filter_by(id_sucursal_stock=id_sucursal)
+        schema = consumibles_schema
+        if campos is not None:
+            query = query.options(solo_columnas(Consumible, campos))
+            schema = schema_parcial(ConsumibleSchema, campos, many=True)
+        consumibles = query.all()
+        return jsonify(schema.dump(consumibles)), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @consumibles_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@cacheado('Consumible')
 def get_consumible(id):
     try:
         usuario_id = get_jwt_identity()
@@ -58,6 +76,7 @@ def get_consumible(id):
 
 @consumibles_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotente
 def add_consumible():
     try:
         usuario_id = get_jwt_identity()
@@ -102,6 +121,12 @@ def update_consumible(id):
             return jsonify({"error": "Consumible no encontrado"}), 404
             
         data = request.get_json()
+
+        # Con sharding, el registro no puede pasar a una sucursal de otra región
+        if 'id_sucursal_stock' in data:
+            error = sucursal_fuera_del_shard(data['id_sucursal_stock'])
+            if error:
+                return jsonify({"error": error}), 409
         
         if 'tipo' in data:
             consumible.tipo = data['tipo']
@@ -1,16 +1,47 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required
+import logging
+from flask import Blueprint, jsonify, request, current_app, g
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import (
     InventarioGeneral, EquipoComputacional, Celular, Impresora,
-    Usuario, Area, Sucursal, EquipoComputacionalSchema, HistorialMovimiento
+    Usuario, Area, Sucursal, EquipoComputacionalSchema, HistorialMovimiento, RELACIONES_DETALLE
 )
+from app.fieldsets import CamposInvalidos, campos_solicitados, solo_columnas
+from app.cache import cacheado
+from app.cargas import MODELOS_DETALLE, cargar_detalles, combinar, inventario_por_registro, perfil, por_id
+from app.idempotencia import idempotente
+from app.transacciones import alta_dispositivo
+from app.ciclo_vida import transicion_invalida
+from app.shards import activo as sharding_activo, en_todos_los_shards, shard_de_id, sucursal_fuera_del_shard
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 equipos_bp = Blueprint('equipos', __name__)
 equipo_schema = EquipoComputacionalSchema()
 equipos_schema = EquipoComputacionalSchema(many=True)
 
+# Campos del listado general (?fields=) y las columnas de inventario que necesita cada uno
+CAMPOS_LISTADO = {
+    'id': ('id_inventario',),
+    'tipo': ('tipo_equipo',),
+    'estado': ('estado',),
+    'fecha_ingreso': ('fecha_ingreso',),
+    'observaciones': ('observaciones',),
+    'detalle': ('tipo_equipo', 'id_registro'),
+    'usuario_responsable': ('id_usuario_responsable',),
+    'area_responsable': ('id_area_responsable',),
+    'sucursal': ('id_sucursal_ubicacion',),
+}
+
+_VALORES_BASE = {
+    'id': lambda equipo: equipo.id_inventario,
+    'tipo': lambda equipo: equipo.tipo_equipo,
+    'estado': lambda equipo: equipo.estado,
+    'fecha_ingreso': lambda equipo: equipo.fecha_ingreso.strftime('%Y-%m-%d') if equipo.fecha_ingreso else None,
+    'observaciones': lambda equipo: equipo.observaciones
+}
+
 # Verificar permisos por rol
 def check_admin_permission(usuario_id):
     usuario = Usuario.query.get(usuario_id)
@@ -18,122 +49,111 @@ def check_admin_permission(usuario_id):
         return False
     return True
 
-@equipos_bp.route('/', methods=['GET'])
-def get_equipos():
-    try:
-        # Obtener todos los equipos
-        equipos = db.session.query(InventarioGeneral).all()
-        print(f"Se encontraron {len(equipos)} equipos")
-        result = []
-
-        for equipo in equipos:
-            # Preparar el resultado base
-            equipo_data = {
-                'id': equipo.id_inventario,
-                'tipo': equipo.tipo_equipo,
-                'estado': equipo.estado,
-                'fecha_ingreso': equipo.fecha_ingreso.strftime('%Y-%m-%d') if equipo.fecha_ingreso else None,
-                'observaciones': equipo.observaciones
-            }
+# Columnas del detalle que muestra el listado general para cada tipo
+CAMPOS_DETALLE_LISTADO = {
+    'Computacional': (
+        'codigo_interno', 'marca', 'modelo', 'procesador', 'ram', 'disco_duro', 'sistema_operativo', 'office',
+        'antivirus', 'drive', 'nombre_equipo', 'serial_number', 'fecha_revision', 'entregado_por', 'comentarios'
+    ),
+    'Celular': (
+        'codigo_interno', 'marca', 'modelo', 'imei', 'numero_linea', 'sistema_operativo',
+        'capacidad_almacenamiento', 'comentarios'
+    ),
+    'Impresora': (
+        'codigo_interno', 'marca', 'modelo', 'tipo_conexion', 'ip_asignada', 'serial_number', 'observaciones'
+    ),
+}
+
+def _detalle_listado(tipo, detalle):
+    datos = {campo: getattr(detalle, campo) for campo in CAMPOS_DETALLE_LISTADO[tipo]}
+    if datos.get('fecha_revision'):
+        datos['fecha_revision'] = datos['fecha_revision'].strftime('%Y-%m-%d')
+    return datos
+
+def _listar_equipos(campos, incluidos):
+    # Obtener todos los equipos
+    query = db.session.query(InventarioGeneral)
+    if campos is not None:
+        columnas = {columna for campo in campos for columna in CAMPOS_LISTADO[campo]}
+        query = query.options(solo_columnas(InventarioGeneral, columnas))
+    # Responsable, área y sucursal llegan con una consulta IN por relación (selectinload) y
+    # los detalles con un LEFT JOIN por tipo; las relaciones no pedidas quedan en raise
+    relaciones = set(incluidos)
+    if 'detalle' in incluidos:
+        relaciones |= set(RELACIONES_DETALLE.values())
+    query = query.options(*perfil('inventario_listado', relaciones))
+    equipos = query.all()
+    logger.debug("Se encontraron %d equipos", len(equipos))
+    result = []
+    muestreo = {'muestreo': current_app.config['LOG_MUESTREO']}
 
-            # Obtener detalles específicos según el tipo
+    for equipo in equipos:
+        # Preparar el resultado base
+        equipo_data = {campo: valor(equipo) for campo, valor in _VALORES_BASE.items() if campo in incluidos}
+
+        # Detalles específicos según el tipo
+        if 'detalle' in incluidos:
+            equipo_detalle = equipo.detalle
             try:
-                if equipo.tipo_equipo == 'Computacional':
-                    equipo_detalle = db.session.query(EquipoComputacional).get(equipo.id_registro)
-                    if equipo_detalle:
-                        equipo_data['detalle'] = {
-                            'codigo_interno': equipo_detalle.codigo_interno,
-                            'marca': equipo_detalle.marca,
-                            'modelo': equipo_detalle.modelo,
-                            'procesador': equipo_detalle.procesador,
-                            'ram': equipo_detalle.ram,
-                            'disco_duro': equipo_detalle.disco_duro,
-                            'sistema_operativo': equipo_detalle.sistema_operativo,
-                            'office': equipo_detalle.office,
-                            'antivirus': equipo_detalle.antivirus,
-                            'drive': equipo_detalle.drive,
-                            'nombre_equipo': equipo_detalle.nombre_equipo,
-                            'serial_number': equipo_detalle.serial_number,
-                            'fecha_revision': equipo_detalle.fecha_revision.strftime('%Y-%m-%d') if equipo_detalle.fecha_revision else None,
-                            'entregado_por': equipo_detalle.entregado_por,
-                            'comentarios': equipo_detalle.comentarios
-                        }
-                elif equipo.tipo_equipo == 'Celular':
-                    equipo_detalle = db.session.query(Celular).get(equipo.id_registro)
-                    if equipo_detalle:
-                        equipo_data['detalle'] = {
-                            'codigo_interno': equipo_detalle.codigo_interno,
-                            'marca': equipo_detalle.marca,
-                            'modelo': equipo_detalle.modelo,
-                            'imei': equipo_detalle.imei,
-                            'numero_linea': equipo_detalle.numero_linea,
-                            'sistema_operativo': equipo_detalle.sistema_operativo,
-                            'capacidad_almacenamiento': equipo_detalle.capacidad_almacenamiento,
-                            'comentarios': equipo_detalle.comentarios
-                        }
-                elif equipo.tipo_equipo == 'Impresora':
-                    equipo_detalle = db.session.query(Impresora).get(equipo.id_registro)
-                    if equipo_detalle:
-                        equipo_data['detalle'] = {
-                            'codigo_interno': equipo_detalle.codigo_interno,
-                            'marca': equipo_detalle.marca,
-                            'modelo': equipo_detalle.modelo,
-                            'tipo_conexion': equipo_detalle.tipo_conexion,
-                            'ip_asignada': equipo_detalle.ip_asignada,
-                            'serial_number': equipo_detalle.serial_number,
-                            'observaciones': equipo_detalle.observaciones
-                        }
+                if equipo_detalle:
+                    equipo_data['detalle'] = _detalle_listado(equipo.tipo_equipo, equipo_detalle)
             except Exception as e:
-                print(f"Error al obtener detalles del equipo {equipo.id_inventario}: {str(e)}")
+                logger.warning("Error al obtener detalles del equipo %s: %s", equipo.id_inventario, e, extra=muestreo)
                 equipo_data['detalle'] = {}
 
-            # Obtener información del usuario responsable
-            try:
-                if equipo.id_usuario_responsable:
-                    usuario = db.session.query(Usuario).get(equipo.id_usuario_responsable)
-                    if usuario:
-                        equipo_data['usuario_responsable'] = {
-                            'id': usuario.id,
-                            'nombre': usuario.nombre,
-                            'usuario': usuario.usuario
-                        }
-            except Exception as e:
-                print(f"Error al obtener usuario del equipo {equipo.id_inventario}: {str(e)}")
+        # Información del usuario responsable
+        usuario = equipo.usuario_responsable if 'usuario_responsable' in incluidos else None
+        if usuario:
+            equipo_data['usuario_responsable'] = {
+                'id': usuario.id,
+                'nombre': usuario.nombre,
+                'usuario': usuario.usuario
+            }
 
-            # Obtener información del área
-            try:
-                if equipo.id_area_responsable:
-                    area = db.session.query(Area).get(equipo.id_area_responsable)
-                    if area:
-                        equipo_data['area_responsable'] = {
-                            'id': area.id_area,
-                            'nombre': area.nombre_area
-                        }
-            except Exception as e:
-                print(f"Error al obtener área del equipo {equipo.id_inventario}: {str(e)}")
+        # Información del área
+        area = equipo.area_responsable if 'area_responsable' in incluidos else None
+        if area:
+            equipo_data['area_responsable'] = {
+                'id': area.id_area,
+                'nombre': area.nombre_area
+            }
 
-            # Obtener información de la sucursal
-            try:
-                if equipo.id_sucursal_ubicacion:
-                    sucursal = db.session.query(Sucursal).get(equipo.id_sucursal_ubicacion)
-                    if sucursal:
-                        equipo_data['sucursal'] = {
-                            'id': sucursal.id_sucursal,
-                            'nombre': sucursal.nombre_sucursal,
-                            'direccion': sucursal.direccion,
-                            'region': sucursal.region
-                        }
-            except Exception as e:
-                print(f"Error al obtener sucursal del equipo {equipo.id_inventario}: {str(e)}")
+        # Información de la sucursal
+        sucursal = equipo.sucursal if 'sucursal' in incluidos else None
+        if sucursal:
+            equipo_data['sucursal'] = {
+                'id': sucursal.id_sucursal,
+                'nombre': sucursal.nombre_sucursal,
+                'direccion': sucursal.direccion,
+                'region': sucursal.region
+            }
+
+        result.append(equipo_data)
 
+    return result
 
+@equipos_bp.route('/', methods=['GET'])
+@cacheado('Computacional', 'Celular', 'Impresora', 'Usuario', 'Area', 'Sucursal', publico=True)
+def get_equipos():
+    try:
+        # Campos pedidos con ?fields=; solo se consultan esas columnas y relaciones
+        try:
+            campos = campos_solicitados(CAMPOS_LISTADO)
+        except CamposInvalidos as e:
+            return jsonify({"error": str(e)}), 400
+        incluidos = campos if campos is not None else CAMPOS_LISTADO
 
-            result.append(equipo_data)
+        # Con sharding, cada shard se consulta en paralelo y se unen los resultados
+        result = [
+            equipo_data
+            for parcial in en_todos_los_shards(lambda: _listar_equipos(campos, incluidos))
+            for equipo_data in parcial
+        ]
 
-        print(f"Se procesaron {len(result)} equipos correctamente")
+        logger.debug("Se procesaron %d equipos correctamente", len(result))
         return jsonify(result)
     except Exception as e:
-        print(f"Error general en get_equipos: {str(e)}")
+        logger.exception("Error general en get_equipos")
         return jsonify({
             'error': str(e),
             'tipo': type(e).__name__,
@@ -142,6 +162,7 @@ def get_equipos():
 
 @equipos_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@cacheado('Computacional', 'Celular', 'Impresora')
 def get_equipo(id):
     try:
         usuario_id = get_jwt_identity()
@@ -178,12 +199,83 @@ def get_equipo(id):
         })
         
         return jsonify(equipo_data), 200
-        
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Referencias de la petición de lote: ("inventario", id_inventario) o (tipo, id_registro)
+def _referencias_lote(datos):
+    referencias = []
+    for id_inventario in datos.get('ids_inventario') or []:
+        if not isinstance(id_inventario, int) or isinstance(id_inventario, bool):
+            raise ValueError(f"id_inventario inválido: {id_inventario!r}")
+        referencias.append(('inventario', id_inventario))
+    for equipo in datos.get('equipos') or []:
+        tipo, id_registro = (equipo.get('tipo'), equipo.get('id')) if isinstance(equipo, dict) else (equipo + [None, None])[:2]
+        if tipo not in MODELOS_DETALLE or not isinstance(id_registro, int) or isinstance(id_registro, bool):
+            raise ValueError(f"Equipo inválido: {equipo!r}")
+        referencias.append((tipo, id_registro))
+    return referencias
+
+def _resolver_lote(referencias):
+    items = {}
+    ids_inventario = [i for tipo, i in referencias if tipo == 'inventario']
+    for id_inventario, item in por_id(InventarioGeneral, ids_inventario).items():
+        items[('inventario', id_inventario)] = item
+    items.update(inventario_por_registro([r for r in referencias if r[0] != 'inventario']))
+    detalles = cargar_detalles(items.values())
+    return {referencia: (item, detalles.get((item.tipo_equipo, item.id_registro))) for referencia, item in items.items()}
+
+@equipos_bp.route('/lote', methods=['POST'])
+@jwt_required()
+def get_lote():
+    try:
+        datos = request.get_json(silent=True) or {}
+        try:
+            referencias = list(dict.fromkeys(_referencias_lote(datos)))
+        except (ValueError, TypeError, AttributeError) as e:
+            return jsonify({"error": str(e)}), 400
+        maximo = current_app.config['LOTE_MAXIMO']
+        if len(referencias) > maximo:
+            return jsonify({"error": f"Un lote admite como máximo {maximo} equipos"}), 400
+
+        # Usuario y rol se consultan una sola vez para todo el lote
+        usuario_id = get_jwt_identity()
+        es_admin = check_admin_permission(usuario_id)
+        usuario = Usuario.query.get(usuario_id)
+
+        # Con sharding, el rango de cada id indica su shard; se resuelve un grupo por shard
+        grupos = {}
+        for referencia in referencias:
+            grupos.setdefault(shard_de_id(referencia[1]) if sharding_activo() else None, []).append(referencia)
+        encontrados = {}
+        for shard, grupo in grupos.items():
+            if sharding_activo():
+                if shard is None:
+                    continue
+                g._shard = shard
+            encontrados.update(_resolver_lote(grupo))
+
+        resultados = {}
+        errores = {}
+        for referencia in referencias:
+            clave = f'{referencia[0]}:{referencia[1]}'
+            item, detalle = encontrados.get(referencia, (None, None))
+            if item is None or detalle is None:
+                errores[clave] = {"status": 404, "error": "Equipo no encontrado"}
+            elif not es_admin and usuario.sucursal_activa != item.id_sucursal_ubicacion:
+                errores[clave] = {"status": 403, "error": "No tienes permiso para ver este equipo"}
+            else:
+                resultados[clave] = dict(combinar(item, detalle), tipo_equipo=item.tipo_equipo, id_registro=item.id_registro)
+
+        return jsonify({"resultados": resultados, "errores": errores}), 200
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @equipos_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotente
 def add_equipo():
     try:
         usuario_id = get_jwt_identity()
@@ -194,8 +286,8 @@ def add_equipo():
             
         data = request.get_json()
         
-        # Crear el registro del equipo
-        nuevo_equipo = EquipoComputacional(
+        # Detalle, inventario e historial en una sola transacción, con reintentos ante deadlocks
+        id_equipo, id_inventario = alta_dispositivo('Computacional', lambda: EquipoComputacional(
             codigo_interno=data.get('codigo_interno'),
             marca=data.get('marca'),
             modelo=data.get('modelo'),
@@ -211,30 +303,12 @@ def add_equipo():
             fecha_revision=datetime.strptime(data.get('fecha_revision'), '%Y-%m-%d') if data.get('fecha_revision') else None,
             entregado_por=data.get('entregado_por'),
             comentarios=data.get('comentarios')
-        )
-        
-        db.session.add(nuevo_equipo)
-        db.session.flush()  # Para obtener el ID generado
-        
-        # Crear el registro en inventario general
-        nuevo_inventario = InventarioGeneral(
-            tipo_equipo='Computacional',
-            id_registro=nuevo_equipo.id_equipo,
-            estado=data.get('estado', 'SinAsignar'),
-            id_usuario_responsable=data.get('id_usuario_responsable'),
-            id_area_responsable=data.get('id_area_responsable'),
-            id_sucursal_ubicacion=data.get('id_sucursal_ubicacion'),
-            fecha_ingreso=datetime.now(),
-            observaciones=data.get('observaciones', '')
-        )
-        
-        db.session.add(nuevo_inventario)
-        db.session.commit()
+        ), data)
         
         return jsonify({
             "mensaje": "Equipo agregado correctamente",
-            "id_equipo": nuevo_equipo.id_equipo,
-            "id_inventario": nuevo_inventario.id_inventario
+            "id_equipo": id_equipo,
+            "id_inventario": id_inventario
         }), 201
         
     except Exception as e:
@@ -267,6 +341,18 @@ def update_equipo(id):
             
         data = request.get_json()
         
+        # Validar el cambio de estado antes de modificar nada
+        if 'estado' in data:
+            error = transicion_invalida(inventario.estado, data['estado'])
+            if error:
+                return jsonify({"error": error}), 400
+
+        # Con sharding, el registro no puede pasar a una sucursal de otra región
+        if 'id_sucursal_ubicacion' in data:
+            error = sucursal_fuera_del_shard(data['id_sucursal_ubicacion'])
+            if error:
+                return jsonify({"error": error}), 409
+        
         # Actualizar el equipo
         if 'codigo_interno' in data:
             equipo.codigo_interno = data['codigo_interno']
@@ -0,0 +1,63 @@
+import queue
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..models import Usuario
+from ..eventos import difusor, formato_sse, SinCupo
+from .. import db
+
+eventos_bp = Blueprint('eventos', __name__)
+
+# Verificar permisos por rol
+def check_admin_permission(usuario_id):
+    usuario = Usuario.query.get(usuario_id)
+    if not usuario or usuario.id_rol != 1:  # Asumimos que rol_id 1 es Administrador
+        return False
+    return True
+
+# EventSource no permite cabeceras: el token también se acepta como ?jwt=
+@eventos_bp.route('/', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def get_eventos():
+    try:
+        usuario_id = get_jwt_identity()
+        usuario = Usuario.query.get(usuario_id)
+
+        if not usuario:
+            return jsonify({"error": "Usuario no autorizado"}), 401
+
+        # Solo la sucursal activa; el administrador puede pedir otra o todas (sucursal=todas)
+        id_sucursal = usuario.sucursal_activa
+        sucursal_param = request.args.get('sucursal')
+        if sucursal_param and check_admin_permission(usuario_id):
+            id_sucursal = None if sucursal_param == 'todas' else int(sucursal_param)
+
+        try:
+            suscripcion = difusor.suscribir(id_sucursal)
+        except SinCupo:
+            return jsonify({"error": "Demasiados suscriptores, intenta más tarde"}), 503
+
+    except ValueError:
+        return jsonify({"error": "Parámetro sucursal no válido"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    # La conexión a la base vuelve al pool: el stream puede durar horas
+    db.session.close()
+    latido = current_app.config['SSE_LATIDO_SEGUNDOS']
+
+    def stream():
+        try:
+            yield formato_sse({'tipo': 'conectado', 'id_sucursal': id_sucursal})
+            while True:
+                try:
+                    yield formato_sse(suscripcion.siguiente(timeout=latido))
+                except queue.Empty:
+                    # Comentario SSE para mantener viva la conexión a través de proxies
+                    yield ': ping\n\n'
+        finally:
+            difusor.cancelar(suscripcion)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models import HistorialMovimiento, HistorialMovimientoSchema, Usuario
 from .. import db
+from ..cache import cacheado
 
 historial_bp = Blueprint('historial', __name__)
 historial_schema = HistorialMovimientoSchema()
@@ -16,6 +17,7 @@ def check_admin_permission(usuario_id):
 
 @historial_bp.route('/', methods=['GET'])
 @jwt_required()
+@cacheado('Historial')
 def get_historial():
     try:
         usuario_id = get_jwt_identity()
@@ -56,6 +58,7 @@ def get_historial():
 
 @historial_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@cacheado('Historial')
 def get_movimiento(id):
     try:
         usuario_id = get_jwt_identity()
@@ -5,6 +5,16 @@ from ..models import (
     InventarioGeneral, Usuario, HistorialMovimiento
 )
 from .. import db
+from ..cache import cacheado
+from ..cargas import por_id
+from ..idempotencia import idempotente
+from ..transacciones import alta_dispositivo
+from ..ciclo_vida import transicion_invalida
+from ..shards import sucursal_fuera_del_shard
+from ..fieldsets import (
+    CAMPOS_INVENTARIO, CamposInvalidos, campos_solicitados, columnas_modelo,
+    solo_columnas, schema_parcial, campos_inventario
+)
 from datetime import datetime
 
 impresoras_bp = Blueprint('impresoras', __name__)
@@ -20,6 +30,7 @@ def check_admin_permission(usuario_id):
 
 @impresoras_bp.route('/', methods=['GET'])
 @jwt_required()
+@cacheado('Impresora', por_sucursal=True)
 def get_impresoras():
     try:
         usuario_id = get_jwt_identity()
@@ -28,29 +39,37 @@ def get_impresoras():
         if not usuario:
             return jsonify({"error": "Usuario no autorizado"}), 401
             
+        # Campos pedidos con ?fields=; solo se consultan esas columnas
+        try:
+            campos = campos_solicitados(columnas_modelo(Impresora) + CAMPOS_INVENTARIO)
+        except CamposInvalidos as e:
+            return jsonify({"error": str(e)}), 400
+
         # Filtrar por sucursal activa del usuario
         id_sucursal = usuario.sucursal_activa
 
         # Obtener todos los registros de inventario general que sean impresoras
-        inventario = InventarioGeneral.query.filter_by(
+        query = InventarioGeneral.query.filter_by(
             tipo_equipo='Impresora', 
             id_sucursal_ubicacion=id_sucursal
-        ).all()
+        )
+        detalle_query = Impresora.query
+        schema = impresora_schema
+        if campos is not None:
+            campos_detalle = campos - set(CAMPOS_INVENTARIO)
+            query = query.options(solo_columnas(InventarioGeneral, campos, obligatorias=('id_registro',)))
+            detalle_query = detalle_query.options(solo_columnas(Impresora, campos_detalle))
+            schema = schema_parcial(ImpresoraSchema, campos_detalle)
+        inventario = query.all()
         
         result = []
+        # Detalles de todo el listado con una consulta IN
+        detalles = por_id(Impresora, (item.id_registro for item in inventario), query=detalle_query)
         for item in inventario:
-            impresora = Impresora.query.get(item.id_registro)
+            impresora = detalles.get(item.id_registro)
             if impresora:
-                impresora_data = impresora_schema.dump(impresora)
-                impresora_data.update({
-                    "id_inventario": item.id_inventario,
-                    "estado": item.estado,
-                    "id_usuario_responsable": item.id_usuario_responsable,
-                    "id_area_responsable": item.id_area_responsable,
-                    "id_sucursal_ubicacion": item.id_sucursal_ubicacion,
-                    "fecha_ingreso": item.fecha_ingreso.isoformat() if item.fecha_ingreso else None,
-                    "observaciones": item.observaciones
-                })
+                impresora_data = schema.dump(impresora)
+                impresora_data.update(campos_inventario(item, campos))
                 result.append(impresora_data)
                 
         return jsonify(result), 200
@@ -60,6 +79,7 @@ def get_impresoras():
 
 @impresoras_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@cacheado('Impresora')
 def get_impresora(id):
     try:
         usuario_id = get_jwt_identity()
@@ -102,6 +122,7 @@ def get_impresora(id):
 
 @impresoras_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotente
 def add_impresora():
     try:
         usuario_id = get_jwt_identity()
@@ -112,8 +133,8 @@ def add_impresora():
             
         data = request.get_json()
         
-        # Crear el registro de la impresora
-        nueva_impresora = Impresora(
+        # Detalle, inventario e historial en una sola transacción, con reintentos ante deadlocks
+        id_impresora, id_inventario = alta_dispositivo('Impresora', lambda: Impresora(
             codigo_interno=data.get('codigo_interno'),
             marca=data.get('marca'),
             modelo=data.get('modelo'),
@@ -121,30 +142,12 @@ def add_impresora():
             ip_asignada=data.get('ip_asignada'),
             serial_number=data.get('serial_number'),
             observaciones=data.get('observaciones_tecnicas')
-        )
-        
-        db.session.add(nueva_impresora)
-        db.session.flush()  # Para obtener el ID generado
-        
-        # Crear el registro en inventario general
-        nuevo_inventario = InventarioGeneral(
-            tipo_equipo='Impresora',
-            id_registro=nueva_impresora.id_impresora,
-            estado=data.get('estado', 'SinAsignar'),
-            id_usuario_responsable=data.get('id_usuario_responsable'),
-            id_area_responsable=data.get('id_area_responsable'),
-            id_sucursal_ubicacion=data.get('id_sucursal_ubicacion'),
-            fecha_ingreso=datetime.now(),
-            observaciones=data.get('observaciones', '')
-        )
-        
-        db.session.add(nuevo_inventario)
-        db.session.commit()
+        ), data)
         
         return jsonify({
             "mensaje": "Impresora agregada correctamente",
-            "id_impresora": nueva_impresora.id_impresora,
-            "id_inventario": nuevo_inventario.id_inventario
+            "id_impresora": id_impresora,
+            "id_inventario": id_inventario
         }), 201
         
     except Exception as e:
@@ -177,6 +180,18 @@ def update_impresora(id):
             
         data = request.get_json()
         
+        # Validar el cambio de estado antes de modificar nada
+        if 'estado' in data:
+            error = transicion_invalida(inventario.estado, data['estado'])
+            if error:
+                return jsonify({"error": error}), 400
+
+        # Con sharding, el registro no puede pasar a una sucursal de otra región
+        if 'id_sucursal_ubicacion' in data:
+            error = sucursal_fuera_del_shard(data['id_sucursal_ubicacion'])
+            if error:
+                return jsonify({"error": error}), 409
+        
         # Actualizar la impresora
         if 'codigo_interno' in data:
             impresora.codigo_interno = data['codigo_interno']
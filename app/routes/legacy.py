@@ -0,0 +1,133 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..models import InventarioGeneral, EquipoComputacional, Usuario
+from .. import db
+from ..cache import cacheado
+from ..cargas import perfil
+from ..shards import en_todos_los_shards
+from ..transacciones import alta_dispositivo
+from datetime import datetime
+
+# Rutas que consume el cliente Flutter; se mantienen con el mismo formato de respuesta
+legacy_bp = Blueprint('legacy', __name__)
+
+# Verificar permisos por rol
+def check_admin_permission(usuario_id):
+    usuario = Usuario.query.get(usuario_id)
+    if not usuario or usuario.id_rol != 1:  # Asumimos que rol_id 1 es Administrador
+        return False
+    return True
+
+def _detalle_computacional(equipo):
+    return {
+        "tipo": "Computacional",
+        "codigo": equipo.codigo_interno,
+        "marca": equipo.marca,
+        "modelo": equipo.modelo,
+        "procesador": equipo.procesador,
+        "ram": equipo.ram,
+        "disco_duro": equipo.disco_duro,
+        "sistema_operativo": equipo.sistema_operativo,
+        "office": equipo.office,
+        "antivirus": equipo.antivirus,
+        "drive": equipo.drive,
+        "nombre_equipo": equipo.nombre_equipo,
+        "serial_number": equipo.serial_number,
+        "fecha_revision": equipo.fecha_revision.isoformat() if equipo.fecha_revision else None,
+        "entregado_por": equipo.entregado_por,
+        "comentarios": equipo.comentarios
+    }
+
+def _detalle_celular(cel):
+    return {
+        "tipo": "Celular",
+        "codigo": cel.codigo_interno,
+        "marca": cel.marca,
+        "modelo": cel.modelo,
+        "imei": cel.imei,
+        "numero_linea": cel.numero_linea
+    }
+
+def _detalle_impresora(imp):
+    return {
+        "tipo": "Impresora",
+        "codigo": imp.codigo_interno,
+        "marca": imp.marca,
+        "modelo": imp.modelo,
+        "ip": imp.ip_asignada
+    }
+
+# Formato del detalle por tipo y mensaje cuando falta el registro de detalle
+DETALLES = {
+    "Computacional": (_detalle_computacional, "Equipo ID {} no encontrado en tabla 'equipos_computacionales'"),
+    "Celular": (_detalle_celular, "Celular ID {} no encontrado"),
+    "Impresora": (_detalle_impresora, "Impresora ID {} no encontrada"),
+}
+
+def _detalle(item):
+    if item.tipo_equipo not in DETALLES:
+        return {}
+    formato, error = DETALLES[item.tipo_equipo]
+    if item.detalle is None:
+        return {"tipo": item.tipo_equipo, "error": error.format(item.id_registro)}
+    return formato(item.detalle)
+
+def _listar_inventario():
+    # Los detalles llegan en la misma consulta (JOIN por tipo), sin un .get() por fila
+    inventario = InventarioGeneral.query.options(*perfil('inventario_detalles')).all()
+    return [{
+        "id": item.id_inventario,
+        "estado": item.estado,
+        "fecha_ingreso": item.fecha_ingreso.isoformat() if item.fecha_ingreso else None,
+        "observaciones": item.observaciones,
+        "detalle": _detalle(item)
+    } for item in inventario]
+
+@legacy_bp.route("/inventario", methods=["GET"])
+@jwt_required()
+@cacheado('Computacional', 'Celular', 'Impresora')
+def get_inventario_general():
+    try:
+        # Con sharding, cada shard se consulta en paralelo y se unen los resultados
+        data = [item for parcial in en_todos_los_shards(_listar_inventario) for item in parcial]
+        return jsonify(data)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@legacy_bp.route("/inventario", methods=["POST"])
+@jwt_required()
+def agregar_equipo_computacional():
+    try:
+        usuario_id = get_jwt_identity()
+
+        # Verificar permisos
+        if not check_admin_permission(usuario_id):
+            return jsonify({"error": "No tienes permiso para agregar equipos"}), 403
+
+        data = request.get_json()
+
+        # Detalle e inventario en una sola transacción: si falla el segundo no queda un detalle huérfano
+        alta_dispositivo("Computacional", lambda: EquipoComputacional(
+            codigo_interno = data.get("codigo_interno"),
+            marca = data.get("marca"),
+            modelo = data.get("modelo"),
+            procesador = data.get("procesador"),
+            ram = data.get("ram"),
+            disco_duro = data.get("disco_duro"),
+            sistema_operativo = data.get("sistema_operativo"),
+            office = data.get("office"),
+            antivirus = data.get("antivirus"),
+            drive = data.get("drive"),
+            nombre_equipo = data.get("nombre_equipo"),
+            serial_number = data.get("serial_number"),
+            fecha_revision = datetime.strptime(data.get("fecha_revision"), "%Y-%m-%d") if data.get("fecha_revision") else None,
+            entregado_por = data.get("entregado_por"),
+            comentarios = data.get("comentarios")
+        ), {"estado": "SinAsignar", "observaciones": "Equipo agregado desde Flutter"})
+
+        return jsonify({"mensaje": "Equipo agregado exitosamente"}), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
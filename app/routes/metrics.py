@@ -0,0 +1,10 @@
+from flask import Blueprint, current_app
+from ..instrumentation import exponer_metricas
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    if not current_app.config.get('METRICS_ENABLED', True):
+        return {"error": "Métricas desactivadas"}, 404
+    return exponer_metricas(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
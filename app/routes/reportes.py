@@ -0,0 +1,107 @@
+import json
+import os
+from flask import Blueprint, jsonify, request, send_file
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..models import ReporteSucursal, Sucursal, Usuario, TrabajoSchema
+from ..reportes import VISTAS, ruta_reporte, estado_reporte, encolar_reportes
+
+reportes_bp = Blueprint('reportes', __name__)
+trabajo_schema = TrabajoSchema()
+
+# Verificar permisos por rol
+def check_admin_permission(usuario_id):
+    usuario = Usuario.query.get(usuario_id)
+    if not usuario or usuario.id_rol != 1:  # Asumimos que rol_id 1 es Administrador
+        return False
+    return True
+
+# Un usuario normal solo ve los reportes de su sucursal activa
+def _puede_ver(usuario, id_sucursal):
+    return usuario.id_rol == 1 or usuario.sucursal_activa == id_sucursal
+
+def _cabeceras(respuesta, estado):
+    respuesta.headers['X-Reporte-Generado'] = estado['generado']
+    respuesta.headers['X-Reporte-Edad'] = str(estado['edad_segundos'])
+    respuesta.headers['X-Reporte-Cambios-Pendientes'] = str(estado['cambios_pendientes'])
+    return respuesta
+
+@reportes_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_reportes():
+    try:
+        usuario_id = get_jwt_identity()
+        usuario = Usuario.query.get(usuario_id)
+
+        if not usuario:
+            return jsonify({"error": "Usuario no autorizado"}), 401
+
+        query = ReporteSucursal.query
+        if not check_admin_permission(usuario_id):
+            query = query.filter_by(id_sucursal=usuario.sucursal_activa)
+        reportes = query.order_by(ReporteSucursal.id_sucursal).all()
+        return jsonify([estado_reporte(r) for r in reportes]), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@reportes_bp.route('/sucursal/<int:id>', methods=['GET'])
+@jwt_required()
+def get_reporte_sucursal(id):
+    try:
+        usuario = Usuario.query.get(get_jwt_identity())
+
+        if not usuario:
+            return jsonify({"error": "Usuario no autorizado"}), 401
+        if not _puede_ver(usuario, id):
+            return jsonify({"error": "No tienes permiso para ver los reportes de esta sucursal"}), 403
+
+        reporte = ReporteSucursal.query.get(id)
+        if not reporte:
+            return jsonify({"error": "La sucursal aún no tiene un reporte generado"}), 404
+        estado = estado_reporte(reporte)
+
+        formato = request.args.get('formato', 'json')
+        if formato not in estado['formatos']:
+            return jsonify({"error": f"Formato no disponible. Opciones: {', '.join(estado['formatos'])}"}), 400
+
+        if formato == 'json':
+            with open(ruta_reporte(id, 'json'), encoding='utf-8') as archivo:
+                datos = json.load(archivo)
+            datos.update(estado)
+            return _cabeceras(jsonify(datos), estado), 200
+
+        if formato == 'csv':
+            vista = request.args.get('vista', 'area')
+            if vista not in VISTAS:
+                return jsonify({"error": f"Vista no válida. Opciones: {', '.join(VISTAS)}"}), 400
+            ruta = ruta_reporte(id, 'csv', vista)
+        else:
+            ruta = ruta_reporte(id, 'xlsx')
+
+        if not os.path.exists(ruta):
+            return jsonify({"error": "El archivo del reporte no está disponible"}), 404
+        return _cabeceras(send_file(ruta, as_attachment=True, download_name=os.path.basename(ruta)), estado)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Pide regenerar el reporte sin esperar al cron
+@reportes_bp.route('/sucursal/<int:id>', methods=['POST'])
+@jwt_required()
+def regenerar_reporte_sucursal(id):
+    try:
+        usuario_id = get_jwt_identity()
+        usuario = Usuario.query.get(usuario_id)
+
+        if not usuario:
+            return jsonify({"error": "Usuario no autorizado"}), 401
+        if not _puede_ver(usuario, id):
+            return jsonify({"error": "No tienes permiso para ver los reportes de esta sucursal"}), 403
+        if not Sucursal.query.get(id):
+            return jsonify({"error": "Sucursal no encontrada"}), 404
+
+        trabajo = encolar_reportes([id], usuario_id)[0]
+        return jsonify(trabajo_schema.dump(trabajo)), 202
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,71 @@
+from flask import Blueprint, jsonify, request, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..models import RegistroCambio, Usuario
+from .. import db
+
+sync_bp = Blueprint('sync', __name__)
+
+# Verificar permisos por rol
+def check_admin_permission(usuario_id):
+    usuario = Usuario.query.get(usuario_id)
+    if not usuario or usuario.id_rol != 1:  # Asumimos que rol_id 1 es Administrador
+        return False
+    return True
+
+# Agrupa los cambios por entidad quedándose con la última operación de cada id
+def _agrupar(filas):
+    ultima = {}
+    for fila in filas:
+        ultima[(fila.entidad, fila.id_entidad)] = fila.operacion
+
+    cambios = {}
+    for (entidad, id_entidad), operacion in ultima.items():
+        grupo = cambios.setdefault(entidad, {"cambiados": [], "eliminados": []})
+        grupo["eliminados" if operacion == 'delete' else "cambiados"].append(id_entidad)
+    return cambios
+
+@sync_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_cambios():
+    try:
+        usuario_id = get_jwt_identity()
+        usuario = Usuario.query.get(usuario_id)
+
+        if not usuario:
+            return jsonify({"error": "Usuario no autorizado"}), 401
+
+        since = request.args.get('since', 0, type=int)
+        limite = request.args.get('limit', current_app.config['SYNC_PAGE_SIZE'], type=int)
+        limite = min(max(limite, 1), current_app.config['SYNC_PAGE_MAX'])
+
+        # Solo la sucursal activa; el administrador puede pedir otra o todas (sucursal=todas)
+        id_sucursal = usuario.sucursal_activa
+        sucursal_param = request.args.get('sucursal')
+        if sucursal_param and check_admin_permission(usuario_id):
+            id_sucursal = None if sucursal_param == 'todas' else int(sucursal_param)
+
+        # Los seq se confirman en orden (ver cambios.trasladar_pendientes): si uno es
+        # visible, los menores también, y next_since no se saltea cambios en curso
+        query = db.session.query(
+            RegistroCambio.seq, RegistroCambio.entidad, RegistroCambio.id_entidad, RegistroCambio.operacion
+        ).filter(RegistroCambio.seq > since)
+
+        if id_sucursal is not None:
+            query = query.filter(db.or_(
+                RegistroCambio.id_sucursal == id_sucursal,
+                RegistroCambio.id_sucursal.is_(None)
+            ))
+
+        filas = query.order_by(RegistroCambio.seq).limit(limite).all()
+
+        return jsonify({
+            "since": since,
+            "next_since": filas[-1].seq if filas else since,
+            "has_more": len(filas) == limite,
+            "cambios": _agrupar(filas)
+        }), 200
+
+    except ValueError:
+        return jsonify({"error": "Parámetro sucursal no válido"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
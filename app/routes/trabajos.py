@@ -0,0 +1,110 @@
+import os
+from flask import Blueprint, jsonify, request, send_file
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..models import Trabajo, TrabajoSchema, Usuario
+from ..trabajos import TAREAS, encolar
+from ..tareas import parametros_reasignacion_invalidos
+
+trabajos_bp = Blueprint('trabajos', __name__)
+trabajo_schema = TrabajoSchema()
+trabajos_schema = TrabajoSchema(many=True)
+
+# Verificar permisos por rol
+def check_admin_permission(usuario_id):
+    usuario = Usuario.query.get(usuario_id)
+    if not usuario or usuario.id_rol != 1:  # Asumimos que rol_id 1 es Administrador
+        return False
+    return True
+
+def _trabajo_visible(id, usuario_id):
+    trabajo = Trabajo.query.get(id)
+    if not trabajo:
+        return None, (jsonify({"error": "Trabajo no encontrado"}), 404)
+    if trabajo.id_usuario != usuario_id and not check_admin_permission(usuario_id):
+        return None, (jsonify({"error": "No tienes permiso para ver este trabajo"}), 403)
+    return trabajo, None
+
+@trabajos_bp.route('/', methods=['POST'])
+@jwt_required()
+def crear_trabajo():
+    try:
+        usuario_id = get_jwt_identity()
+        usuario = Usuario.query.get(usuario_id)
+
+        if not usuario:
+            return jsonify({"error": "Usuario no autorizado"}), 401
+
+        data = request.get_json() or {}
+        tipo = data.get('tipo')
+        if tipo not in TAREAS:
+            return jsonify({"error": f"Tipo de trabajo no válido. Opciones: {', '.join(sorted(TAREAS))}"}), 400
+
+        es_admin = check_admin_permission(usuario_id)
+        if TAREAS[tipo][1] and not es_admin:
+            return jsonify({"error": "No tienes permiso para crear este trabajo"}), 403
+
+        parametros = dict(data.get('parametros') or {})
+        # Un usuario normal solo trabaja sobre su sucursal activa
+        if not es_admin:
+            parametros['id_sucursal'] = usuario.sucursal_activa
+        if tipo == 'reasignar_responsable':
+            error = parametros_reasignacion_invalidos(parametros)
+            if error:
+                return jsonify({"error": error}), 400
+
+        trabajo = encolar(tipo, parametros, usuario_id)
+        return jsonify(trabajo_schema.dump(trabajo)), 202
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@trabajos_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_trabajos():
+    try:
+        usuario_id = get_jwt_identity()
+
+        query = Trabajo.query
+        if not check_admin_permission(usuario_id):
+            query = query.filter_by(id_usuario=usuario_id)
+        estado = request.args.get('estado')
+        if estado:
+            query = query.filter_by(estado=estado)
+
+        limite = min(max(request.args.get('limite', 50, type=int), 1), 500)
+        trabajos = query.order_by(Trabajo.id.desc()).limit(limite).all()
+        return jsonify(trabajos_schema.dump(trabajos)), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@trabajos_bp.route('/<int:id>', methods=['GET'])
+@jwt_required()
+def get_trabajo(id):
+    try:
+        trabajo, error = _trabajo_visible(id, get_jwt_identity())
+        if error:
+            return error
+
+        datos = trabajo_schema.dump(trabajo)
+        datos['tiene_archivo'] = bool(trabajo.archivo and os.path.exists(trabajo.archivo))
+        return jsonify(datos), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@trabajos_bp.route('/<int:id>/archivo', methods=['GET'])
+@jwt_required()
+def get_archivo_trabajo(id):
+    try:
+        trabajo, error = _trabajo_visible(id, get_jwt_identity())
+        if error:
+            return error
+
+        if trabajo.estado != 'completado' or not trabajo.archivo or not os.path.exists(trabajo.archivo):
+            return jsonify({"error": "El trabajo no tiene un archivo disponible"}), 404
+
+        return send_file(trabajo.archivo, as_attachment=True, download_name=os.path.basename(trabajo.archivo))
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
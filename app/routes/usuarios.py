@@ -1,6 +1,10 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models import Usuario, UsuarioSchema, Rol
+from ..cache import cacheado
+from ..cargas import equipos_asignados, perfil
+from ..revocacion import revocar_usuario
+from ..shards import en_todos_los_shards
 from .. import db
 
 usuarios_bp = Blueprint('usuarios', __name__)
@@ -24,7 +28,7 @@ def get_usuarios():
         if not check_admin_permission(usuario_id):
             return jsonify({"error": "No tienes permiso para ver usuarios"}), 403
             
-        usuarios = Usuario.query.all()
+        usuarios = Usuario.query.options(*perfil('usuarios_listado')).all()
         return jsonify(usuarios_schema.dump(usuarios)), 200
         
     except Exception as e:
@@ -49,6 +53,45 @@ def get_usuario(id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Respuesta propia de cada usuario: la clave de la caché incluye quién pide. Los
+# permisos se comprueban antes de llamarla, porque un acierto no ejecuta la vista
+@cacheado('Computacional', 'Celular', 'Impresora', por_usuario=True)
+def _equipos_del_usuario(id):
+    usuario = Usuario.query.get(id)
+    if not usuario:
+        return jsonify({"error": "Usuario no encontrado"}), 404
+
+    # Con sharding, los equipos del usuario pueden estar en cualquier shard
+    estado = request.args.get('estado')
+    equipos = [
+        equipo
+        for parcial in en_todos_los_shards(lambda: equipos_asignados(usuario, estado))
+        for equipo in parcial
+    ]
+    return jsonify({"id_usuario": id, "total": len(equipos), "equipos": equipos}), 200
+
+@usuarios_bp.route('/mis-equipos', methods=['GET'])
+@jwt_required()
+def get_mis_equipos():
+    try:
+        return _equipos_del_usuario(get_jwt_identity())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@usuarios_bp.route('/<int:id>/equipos', methods=['GET'])
+@jwt_required()
+def get_equipos_usuario(id):
+    try:
+        usuario_id = get_jwt_identity()
+
+        # Solo los administradores pueden ver los equipos de otros usuarios
+        if usuario_id != id and not check_admin_permission(usuario_id):
+            return jsonify({"error": "No tienes permiso para ver los equipos de este usuario"}), 403
+
+        return _equipos_del_usuario(id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @usuarios_bp.route('/', methods=['POST'])
 @jwt_required()
 def add_usuario():
@@ -127,11 +170,15 @@ def update_usuario(id):
                 
         if 'activo' in data and check_admin_permission(usuario_id):
             usuario.activo = data['activo']
+            # Un usuario desactivado pierde de inmediato las sesiones abiertas
+            if not usuario.activo:
+                revocar_usuario(id)
             
         if 'password' in data:
             # Solo el propio usuario o un administrador puede cambiar la contraseña
             if usuario_id == id or check_admin_permission(usuario_id):
                 usuario.set_password(data['password'])
+                revocar_usuario(id)
                 
         db.session.commit()
         
@@ -160,6 +207,7 @@ def delete_usuario(id):
             return jsonify({"error": "Usuario no encontrado"}), 404
             
         db.session.delete(usuario)
+        revocar_usuario(id)
         db.session.commit()
         
         return jsonify({"mensaje": "Usuario eliminado correctamente"}), 200
@@ -0,0 +1,214 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, g, request, has_app_context, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import MetaData, event, func, inspect, select, text
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_BIND = 'shard_'
+
+# Tablas que viven en los shards; el resto (usuarios, sucursales, historial...) queda en la base global
+TABLAS_FRAGMENTADAS = (
+    'inventario_general', 'equipos_computacionales', 'celulares', 'impresoras', 'consumibles',
+    'transiciones_estado', 'cambios_pendientes', 'claves_idempotencia'
+)
+
+# Blueprints cuyas rutas /<id> reciben ids de tablas fragmentadas
+BLUEPRINTS_FRAGMENTADOS = ('equipos', 'celulares', 'impresoras', 'consumibles', 'ciclo_vida')
+
+_estado = {
+    'nombres': [],
+    'regiones': {},
+    'rango': 100_000_000,
+    'hilos': 8,
+    'por_engine': {},
+    'con_datos': set(),
+}
+_sucursales = {}
+_pool = None
+_lock = threading.Lock()
+
+def activo():
+    return bool(_estado['nombres'])
+
+def nombres_shards():
+    return list(_estado['nombres'])
+
+# Cada shard asigna ids de su propio rango: el id indica en qué shard está la fila
+def shard_de_id(id_registro):
+    indice = (int(id_registro) - 1) // _estado['rango']
+    nombres = _estado['nombres']
+    return nombres[indice] if 0 <= indice < len(nombres) else None
+
+def _inicio_rango(nombre):
+    return _estado['nombres'].index(nombre) * _estado['rango']
+
+def _engine_global():
+    return current_app.extensions['sqlalchemy'].engines[None]
+
+def shard_de_sucursal(id_sucursal):
+    if id_sucursal is None:
+        return None
+    shard = _sucursales.get(id_sucursal)
+    if shard is None:
+        with _engine_global().connect() as conn:
+            region = conn.execute(
+                text('SELECT region FROM sucursales WHERE id_sucursal = :id'), {'id': id_sucursal}
+            ).scalar()
+        shard = _estado['regiones'].get(region, _estado['nombres'][0])
+        _sucursales[id_sucursal] = shard
+    return shard
+
+def _shard_del_usuario():
+    try:
+        identidad = get_jwt_identity()
+    except RuntimeError:  # ruta sin @jwt_required
+        return None
+    if identidad is None:
+        return None
+    with _engine_global().connect() as conn:
+        id_sucursal = conn.execute(
+            text('SELECT sucursal_activa FROM usuarios_sistema WHERE id = :id'), {'id': identidad}
+        ).scalar()
+    return shard_de_sucursal(id_sucursal)
+
+def shard_actual():
+    if not has_app_context():
+        return _estado['nombres'][0]
+    shard = g.get('_shard')
+    if shard is None:
+        shard = (_shard_del_usuario() if has_request_context() else None) or _estado['nombres'][0]
+        g._shard = shard
+    return shard
+
+# Mensaje de error si `id_sucursal` pertenece a otro shard que el de la petición, o None.
+# Una fila no puede cambiar de shard con un UPDATE: su id es del rango de su shard, y
+# las rutas /<id> y los listados la seguirían buscando allí
+def sucursal_fuera_del_shard(id_sucursal):
+    if not activo() or id_sucursal is None:
+        return None
+    if shard_de_sucursal(id_sucursal) == shard_actual():
+        return None
+    return ("La sucursal de destino está en otra región: dar de baja el registro "
+            "y crearlo de nuevo en la sucursal de destino")
+
+# Engine del shard para las consultas sobre tablas fragmentadas; None para el resto
+def engine_de_shard(db, mapper, clause):
+    if not activo():
+        return None
+    if mapper is not None:
+        tablas = [inspect(mapper).local_table]
+    elif clause is not None:
+        tablas = [t for t in getattr(clause, 'froms', ()) if hasattr(t, 'name')]
+    else:
+        return None
+    if not any(getattr(t, 'name', None) in TABLAS_FRAGMENTADAS for t in tablas):
+        return None
+    return db.engines[PREFIJO_BIND + shard_actual()]
+
+def engine_de_nombre(db, nombre):
+    return db.engines[PREFIJO_BIND + nombre]
+
+# Ejecuta `funcion` una vez por shard, en paralelo, y devuelve la lista de resultados
+def en_todos_los_shards(funcion):
+    global _pool
+
+    if not activo():
+        return [funcion()]
+
+    app = current_app._get_current_object()
+
+    def ejecutar(nombre):
+        with app.app_context():
+            g._shard = nombre
+            return funcion()
+
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(_estado['hilos'], thread_name_prefix='shards')
+    return list(_pool.map(ejecutar, _estado['nombres']))
+
+def _elegir_shard():
+    # Rutas /<id>: el rango del id indica el shard
+    if request.blueprint in BLUEPRINTS_FRAGMENTADOS and request.view_args and 'id' in request.view_args:
+        g._shard = shard_de_id(request.view_args['id']) or _estado['nombres'][0]
+        return
+    # Altas: el shard de la sucursal de destino
+    if request.method == 'POST' and request.blueprint in BLUEPRINTS_FRAGMENTADOS and request.is_json:
+        datos = request.get_json(silent=True) or {}
+        id_sucursal = datos.get('id_sucursal_ubicacion') or datos.get('id_sucursal_stock')
+        if id_sucursal is not None:
+            g._shard = shard_de_sucursal(id_sucursal)
+
+# SQLite no admite fijar el inicio del autoincremento: el primer alta de cada tabla
+# recibe explícitamente el primer id del rango y las siguientes continúan desde ahí
+def _asignar_id(mapper, connection, target):
+    nombre = _estado['por_engine'].get(connection.engine)
+    if nombre is None or connection.dialect.name != 'sqlite':
+        return
+    columna = mapper.primary_key[0]
+    atributo = mapper.get_property_by_column(columna).key
+    if getattr(target, atributo) is not None or (nombre, columna.table.name) in _estado['con_datos']:
+        return
+    maximo = connection.execute(select(func.max(columna))).scalar()
+    if maximo is None:
+        setattr(target, atributo, _inicio_rango(nombre) + 1)
+    _estado['con_datos'].add((nombre, columna.table.name))
+
+def _metadata_shard(db):
+    metadata = MetaData()
+    for nombre in TABLAS_FRAGMENTADAS:
+        tabla = db.metadata.tables[nombre].to_metadata(metadata)
+        # Las claves foráneas apuntan a tablas de la base global
+        for restriccion in list(tabla.foreign_key_constraints):
+            tabla.constraints.discard(restriccion)
+        for columna in tabla.columns:
+            columna.foreign_keys.clear()
+        tabla.foreign_keys.clear()
+    return metadata
+
+def _crear_tablas(db, nombre):
+    engine = db.engines[PREFIJO_BIND + nombre]
+    metadata = _metadata_shard(db)
+    metadata.create_all(engine)
+    if engine.dialect.name == 'mysql':
+        with engine.begin() as conn:
+            for tabla in metadata.sorted_tables:
+                conn.execute(text(f'ALTER TABLE {tabla.name} AUTO_INCREMENT = {_inicio_rango(nombre) + 1}'))
+
+# Debe llamarse antes de db.init_app: los shards se declaran como binds de Flask-SQLAlchemy
+def configurar_shards(app):
+    shards = app.config.get('SHARD_URIS') or {}
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds.update({PREFIJO_BIND + nombre: uri for nombre, uri in shards.items()})
+    app.config['SQLALCHEMY_BINDS'] = binds
+    _estado.update(
+        nombres=list(shards),
+        regiones=dict(app.config.get('SHARD_REGIONES') or {}),
+        rango=app.config.get('SHARD_RANGO_IDS', 100_000_000),
+        hilos=app.config.get('SHARD_HILOS', 8),
+        por_engine={},
+        con_datos=set(),
+    )
+    _sucursales.clear()
+
+def claves_shards():
+    return [PREFIJO_BIND + nombre for nombre in _estado['nombres']]
+
+def init_shards(app, db):
+    if not activo():
+        return
+    from .models import InventarioGeneral, EquipoComputacional, Celular, Impresora, Consumible, TransicionEstado
+
+    with app.app_context():
+        for nombre in _estado['nombres']:
+            _crear_tablas(db, nombre)
+            _estado['por_engine'][db.engines[PREFIJO_BIND + nombre]] = nombre
+
+    for modelo in (InventarioGeneral, EquipoComputacional, Celular, Impresora, Consumible, TransicionEstado):
+        if not event.contains(modelo, 'before_insert', _asignar_id):
+            event.listen(modelo, 'before_insert', _asignar_id)
+    app.before_request(_elegir_shard)
+    logger.info("Sharding activo: %s", ', '.join(_estado['nombres']))
@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import date, datetime, timezone
+from logging.handlers import RotatingFileHandler
+from flask import request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .logging_config import COLA_MAXIMA, handler_en_cola
+
+logger = logging.getLogger(__name__)
+
+# Logger propio: las entradas van solo al archivo rotativo, no a la salida general
+registro = logging.getLogger('app.slow_queries.registro')
+registro.propagate = False
+
+_estado = {'umbral': None, 'explain': False, 'archivo': None}
+
+def _redactar(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if valor is None or isinstance(valor, (bool, int, float)):
+        return valor
+    if isinstance(valor, (str, bytes)):
+        return f'<redactado:{len(valor)}>'
+    return f'<{type(valor).__name__}>'
+
+def redactar_parametros(parametros):
+    if isinstance(parametros, dict):
+        return {k: _redactar(v) for k, v in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [redactar_parametros(p) if isinstance(p, (dict, list, tuple)) else _redactar(p) for p in parametros]
+    return _redactar(parametros)
+
+def _explain(conn, sentencia, parametros):
+    prefijo = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    # Conexión aparte: la de la petición está en medio de su propia sentencia
+    with conn.engine.connect() as otra:
+        filas = otra.exec_driver_sql(prefijo + sentencia, parametros)
+        return [list(fila) for fila in filas]
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not statement.startswith('EXPLAIN '):
+        conn.info['_inicio_lenta'] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop('_inicio_lenta', None)
+    if inicio is None:
+        return
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    if duracion_ms < _estado['umbral']:
+        return
+
+    entrada = {
+        'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'duracion_ms': round(duracion_ms, 2),
+        'sentencia': statement,
+        'parametros': redactar_parametros(parameters),
+        'endpoint': request.endpoint if has_request_context() else None,
+        'metodo': request.method if has_request_context() else None,
+    }
+    if _estado['explain'] and not executemany and statement.lstrip().upper().startswith('SELECT'):
+        try:
+            entrada['explain'] = _explain(conn, statement, parameters)
+        except Exception as e:
+            entrada['explain_error'] = str(e)
+
+    registro.warning(json.dumps(entrada, default=str, ensure_ascii=False))
+
+def init_slow_queries(app):
+    # Desactivado no se registra ningún listener: costo cero por consulta
+    if not app.config.get('SLOW_QUERY_ENABLED'):
+        return
+
+    archivo = app.config['SLOW_QUERY_LOG']
+    _estado.update(
+        umbral=app.config.get('SLOW_QUERY_THRESHOLD_MS', 500),
+        explain=app.config.get('SLOW_QUERY_EXPLAIN', False),
+        archivo=archivo
+    )
+    if registro.handlers:
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(archivo)), exist_ok=True)
+    rotativo = RotatingFileHandler(
+        archivo,
+        maxBytes=app.config.get('SLOW_QUERY_MAX_BYTES', 10 * 1024 * 1024),
+        backupCount=app.config.get('SLOW_QUERY_BACKUPS', 5),
+        encoding='utf-8'
+    )
+    rotativo.setFormatter(logging.Formatter('%(message)s'))
+    registro.addHandler(handler_en_cola(rotativo, app.config.get('LOG_COLA_MAXIMA', COLA_MAXIMA)))
+    registro.setLevel(logging.WARNING)
+
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    logger.info("Registro de consultas lentas activo (umbral %s ms)", _estado['umbral'])
+
+def leer_consultas_lentas(limite=100):
+    archivo = _estado['archivo']
+    if not archivo or not os.path.exists(archivo):
+        return []
+    with open(archivo, encoding='utf-8') as f:
+        ultimas = deque(f, maxlen=limite)
+    return [json.loads(linea) for linea in reversed(ultimas) if linea.strip()]
@@ -0,0 +1,200 @@
+import csv
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from flask import g
+from . import db
+from .cargas import cargar_detalles
+from .models import InventarioGeneral, HistorialMovimiento
+from .shards import activo as sharding_activo, shard_de_sucursal
+from .trabajos import tarea, ruta_artefacto
+
+LOTE = 500
+
+COLUMNAS_EXPORTACION = [
+    'id_inventario', 'tipo_equipo', 'id_registro', 'codigo_interno', 'marca', 'modelo', 'estado',
+    'id_usuario_responsable', 'id_area_responsable', 'id_sucursal_ubicacion', 'fecha_ingreso', 'observaciones'
+]
+
+def _usar_shard(id_sucursal):
+    if sharding_activo():
+        if id_sucursal is None:
+            raise ValueError("Con sharding activo el trabajo requiere id_sucursal")
+        g._shard = shard_de_sucursal(id_sucursal)
+
+@tarea('exportar_inventario')
+def exportar_inventario(trabajo, avance):
+    parametros = trabajo.parametros or {}
+    id_sucursal = parametros.get('id_sucursal')
+    _usar_shard(id_sucursal)
+
+    query = InventarioGeneral.query
+    if id_sucursal is not None:
+        query = query.filter_by(id_sucursal_ubicacion=id_sucursal)
+    total = query.count()
+    ruta = ruta_artefacto(trabajo, 'csv')
+
+    escritos = 0
+    ultimo_id = 0
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(COLUMNAS_EXPORTACION)
+        # Paginación por clave: cada lote es una consulta acotada sin OFFSET
+        while True:
+            lote = query.filter(InventarioGeneral.id_inventario > ultimo_id) \
+                .order_by(InventarioGeneral.id_inventario).limit(LOTE).all()
+            if not lote:
+                break
+            detalles = cargar_detalles(lote)
+            for item in lote:
+                detalle = detalles.get((item.tipo_equipo, item.id_registro))
+                escritor.writerow([
+                    item.id_inventario, item.tipo_equipo, item.id_registro,
+                    detalle.codigo_interno if detalle else None,
+                    detalle.marca if detalle else None,
+                    detalle.modelo if detalle else None,
+                    item.estado, item.id_usuario_responsable, item.id_area_responsable,
+                    item.id_sucursal_ubicacion,
+                    item.fecha_ingreso.isoformat() if item.fecha_ingreso else None,
+                    item.observaciones
+                ])
+            escritos += len(lote)
+            ultimo_id = lote[-1].id_inventario
+            # Se sueltan las filas ya escritas para que la sesión no crezca con la exportación
+            for obj in list(lote) + list(detalles.values()):
+                db.session.expunge(obj)
+            avance(escritos * 100 // max(total, 1), f"{escritos} de {total} equipos exportados")
+
+    trabajo.archivo = ruta
+    return {"filas": escritos}
+
+@tarea('reporte_inventario')
+def reporte_inventario(trabajo, avance):
+    parametros = trabajo.parametros or {}
+    id_sucursal = parametros.get('id_sucursal')
+    _usar_shard(id_sucursal)
+
+    query = db.session.query(
+        InventarioGeneral.tipo_equipo, InventarioGeneral.estado,
+        InventarioGeneral.id_area_responsable, db.func.count()
+    )
+    if id_sucursal is not None:
+        query = query.filter(InventarioGeneral.id_sucursal_ubicacion == id_sucursal)
+    filas = query.group_by(
+        InventarioGeneral.tipo_equipo, InventarioGeneral.estado, InventarioGeneral.id_area_responsable
+    ).all()
+
+    reporte = {"id_sucursal": id_sucursal, "generado": datetime.utcnow().isoformat(), "filas": [
+        {"tipo_equipo": tipo, "estado": estado, "id_area": id_area, "cantidad": cantidad}
+        for tipo, estado, id_area, cantidad in filas
+    ]}
+    ruta = ruta_artefacto(trabajo, 'json')
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(reporte, archivo, ensure_ascii=False)
+
+    trabajo.archivo = ruta
+    return {"grupos": len(filas)}
+
+# Mueve a un archivo JSON Lines los movimientos anteriores a `dias` y los borra de la tabla
+@tarea('archivar_historial', solo_admin=True)
+def archivar_historial(trabajo, avance):
+    dias = int((trabajo.parametros or {}).get('dias', 365))
+    corte = datetime.utcnow() - timedelta(days=dias)
+    query = HistorialMovimiento.query.filter(HistorialMovimiento.fecha < corte)
+    total = query.count()
+    ruta = ruta_artefacto(trabajo, 'jsonl')
+
+    # Cada lote se escribe aparte y pasa al archivo solo después de confirmar su borrado:
+    # si el commit falla, los movimientos siguen en la tabla y no en el archivo, y otro
+    # intento no los duplica. Si el proceso cae tras el commit quedan en el .lote
+    ruta_lote = ruta + '.lote'
+    archivados = 0
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        while True:
+            lote = query.order_by(HistorialMovimiento.id).limit(LOTE).all()
+            if not lote:
+                break
+            with open(ruta_lote, 'w', encoding='utf-8') as pendiente:
+                for movimiento in lote:
+                    pendiente.write(json.dumps({
+                        "id": movimiento.id,
+                        "tipo_equipo": movimiento.tipo_equipo,
+                        "id_equipo": movimiento.id_equipo,
+                        "responsable_anterior": movimiento.responsable_anterior,
+                        "responsable_nuevo": movimiento.responsable_nuevo,
+                        "fecha": movimiento.fecha.isoformat() if movimiento.fecha else None,
+                        "observaciones": movimiento.observaciones
+                    }, ensure_ascii=False) + '\n')
+                    db.session.delete(movimiento)
+                pendiente.flush()
+                os.fsync(pendiente.fileno())
+            archivados += len(lote)
+            try:
+                # Confirma el borrado del lote
+                avance(archivados * 100 // max(total, 1), f"{archivados} de {total} movimientos archivados")
+            except Exception:
+                os.remove(ruta_lote)
+                raise
+            with open(ruta_lote, encoding='utf-8') as pendiente:
+                shutil.copyfileobj(pendiente, archivo)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+            os.remove(ruta_lote)
+
+    trabajo.archivo = ruta
+    return {"archivados": archivados, "anteriores_a": corte.isoformat()}
+
+# Mensaje de error si los parámetros de la reasignación no son válidos, o None.
+# La ruta lo consulta al encolar para responder 400; la tarea lo vuelve a comprobar
+def parametros_reasignacion_invalidos(parametros):
+    origen = parametros.get('id_usuario_origen')
+    destino = parametros.get('id_usuario_destino')
+    if origen is None or destino is None:
+        return "Se requieren id_usuario_origen e id_usuario_destino"
+    if origen == destino:
+        return "id_usuario_origen e id_usuario_destino deben ser distintos"
+    return None
+
+@tarea('reasignar_responsable', solo_admin=True)
+def reasignar_responsable(trabajo, avance):
+    parametros = trabajo.parametros or {}
+    error = parametros_reasignacion_invalidos(parametros)
+    if error:
+        raise ValueError(error)
+    origen = parametros['id_usuario_origen']
+    destino = parametros['id_usuario_destino']
+    id_sucursal = parametros.get('id_sucursal')
+    _usar_shard(id_sucursal)
+
+    query = InventarioGeneral.query.filter_by(id_usuario_responsable=origen)
+    if id_sucursal is not None:
+        query = query.filter_by(id_sucursal_ubicacion=id_sucursal)
+    total = query.count()
+
+    # Paginación por clave: cada lote empieza después del último id procesado, así el
+    # recorrido avanza aunque las filas sigan cumpliendo el filtro tras el commit
+    reasignados = 0
+    ultimo = 0
+    while True:
+        lote = query.filter(InventarioGeneral.id_inventario > ultimo).order_by(
+            InventarioGeneral.id_inventario
+        ).limit(LOTE).all()
+        if not lote:
+            break
+        ultimo = lote[-1].id_inventario
+        ahora = datetime.utcnow()
+        for item in lote:
+            item.id_usuario_responsable = destino
+            db.session.add(HistorialMovimiento(
+                tipo_equipo=item.tipo_equipo,
+                id_equipo=item.id_registro,
+                responsable_anterior=origen,
+                responsable_nuevo=destino,
+                fecha=ahora,
+                observaciones=f'Reasignación masiva (trabajo {trabajo.id})'
+            ))
+        reasignados += len(lote)
+        avance(reasignados * 100 // max(total, 1), f"{reasignados} de {total} equipos reasignados")
+
+    return {"reasignados": reasignados}
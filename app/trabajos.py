@@ -0,0 +1,188 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from . import db
+from .models import Trabajo
+
+logger = logging.getLogger(__name__)
+
+# Tareas registradas: tipo -> (función, solo_admin)
+TAREAS = {}
+# Funciones que el ejecutor llama en cada sondeo (p. ej. para programar trabajos)
+PERIODICAS = []
+
+class TiempoAgotado(Exception):
+    pass
+
+def tarea(tipo, solo_admin=False):
+    def decorador(funcion):
+        TAREAS[tipo] = (funcion, solo_admin)
+        return funcion
+    return decorador
+
+def periodica(funcion):
+    if funcion not in PERIODICAS:
+        PERIODICAS.append(funcion)
+    return funcion
+
+# Se pasa a cada tarea para informar el avance; confirma la sesión en cada llamada
+class Avance:
+    def __init__(self, trabajo, limite):
+        self.trabajo = trabajo
+        self.limite = limite
+
+    def __call__(self, progreso, mensaje=None):
+        if time.monotonic() > self.limite:
+            raise TiempoAgotado(f"El trabajo superó {current_app.config['TRABAJOS_TIMEOUT']} segundos")
+        self.trabajo.progreso = max(0, min(100, int(progreso)))
+        if mensaje is not None:
+            self.trabajo.mensaje = mensaje[:255]
+        db.session.commit()
+
+def ruta_artefacto(trabajo, extension):
+    directorio = os.path.abspath(current_app.config['TRABAJOS_DIR'])
+    os.makedirs(directorio, exist_ok=True)
+    return os.path.join(directorio, f'trabajo_{trabajo.id}.{extension}')
+
+def encolar(tipo, parametros, id_usuario):
+    trabajo = Trabajo(tipo=tipo, parametros=parametros, id_usuario=id_usuario, estado='pendiente')
+    db.session.add(trabajo)
+    db.session.commit()
+
+    ejecutor = ejecutor_en_proceso(current_app._get_current_object())
+    if ejecutor is not None:
+        ejecutor.despertar()
+    return trabajo
+
+# Ejecutor del proceso actual; se inicia en el primer uso y no al crear la app
+# porque con preload_app los hilos del master no pasan a los workers
+_lock_ejecutor = threading.Lock()
+
+def ejecutor_en_proceso(app):
+    ejecutor = app.extensions.get('trabajos')
+    if ejecutor is None and app.config.get('TRABAJOS_EN_PROCESO'):
+        with _lock_ejecutor:
+            ejecutor = app.extensions.get('trabajos')
+            if ejecutor is None:
+                ejecutor = EjecutorTrabajos(app)
+                app.extensions['trabajos'] = ejecutor
+                ejecutor.iniciar()
+    return ejecutor
+
+# Marca como fallido lo que quedó en proceso más allá del tiempo límite,
+# por ejemplo porque el proceso que lo ejecutaba se cayó
+def recuperar_vencidos():
+    limite = datetime.utcnow() - timedelta(seconds=current_app.config['TRABAJOS_TIMEOUT'] * 2)
+    vencidos = Trabajo.query.filter(Trabajo.estado == 'en_proceso', Trabajo.fecha_inicio < limite).all()
+    for trabajo in vencidos:
+        trabajo.estado = 'fallido'
+        trabajo.mensaje = 'El trabajo no terminó (proceso interrumpido o tiempo agotado)'
+        trabajo.fecha_fin = datetime.utcnow()
+    if vencidos:
+        db.session.commit()
+        logger.warning("%d trabajos vencidos marcados como fallidos", len(vencidos))
+
+# Toma el trabajo solo si sigue pendiente: varios procesos pueden sondear la misma tabla
+def reclamar(id_trabajo):
+    resultado = db.session.execute(
+        db.update(Trabajo)
+        .where(Trabajo.id == id_trabajo, Trabajo.estado == 'pendiente')
+        .values(estado='en_proceso', fecha_inicio=datetime.utcnow())
+    )
+    db.session.commit()
+    return resultado.rowcount == 1
+
+def ejecutar(id_trabajo):
+    trabajo = Trabajo.query.get(id_trabajo)
+    registrada = TAREAS.get(trabajo.tipo)
+    limite = time.monotonic() + current_app.config['TRABAJOS_TIMEOUT']
+    try:
+        if registrada is None:
+            raise ValueError(f"Tipo de trabajo desconocido: {trabajo.tipo}")
+        resultado = registrada[0](trabajo, Avance(trabajo, limite))
+        trabajo.estado = 'completado'
+        trabajo.progreso = 100
+        trabajo.resultado = resultado
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Falló el trabajo %s (%s)", trabajo.id, trabajo.tipo)
+        trabajo.estado = 'fallido'
+        trabajo.mensaje = str(e)[:255]
+    trabajo.fecha_fin = datetime.utcnow()
+    db.session.commit()
+
+# Sondea la tabla de trabajos y ejecuta los pendientes en un pool de hilos
+class EjecutorTrabajos:
+    def __init__(self, app, hilos=None, intervalo=None):
+        self.app = app
+        self.hilos = hilos or app.config['TRABAJOS_HILOS']
+        self.intervalo = intervalo or app.config['TRABAJOS_INTERVALO']
+        self.pool = ThreadPoolExecutor(self.hilos, thread_name_prefix='trabajos')
+        self._activos = 0
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._detener = False
+        self._hilo = None
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.ejecutar_siempre, name='trabajos-sondeo', daemon=True)
+        self._hilo.start()
+
+    def despertar(self):
+        self._evento.set()
+
+    def detener(self):
+        self._detener = True
+        self._evento.set()
+        if self._hilo is not None:
+            self._hilo.join()
+        self.pool.shutdown(wait=True)
+
+    def ejecutar_siempre(self):
+        while not self._detener:
+            try:
+                self.sondear()
+            except Exception:
+                logger.exception("Error sondeando la cola de trabajos")
+            self._evento.wait(self.intervalo)
+            self._evento.clear()
+
+    def sondear(self):
+        with self.app.app_context():
+            recuperar_vencidos()
+            for funcion in PERIODICAS:
+                try:
+                    funcion()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Error en la tarea periódica %s", funcion.__name__)
+            libres = self.hilos - self._activos
+            if libres <= 0:
+                return
+            pendientes = [t.id for t in Trabajo.query.filter_by(estado='pendiente')
+                          .order_by(Trabajo.id).limit(libres).with_entities(Trabajo.id)]
+            for id_trabajo in pendientes:
+                if reclamar(id_trabajo):
+                    with self._lock:
+                        self._activos += 1
+                    self.pool.submit(self._ejecutar, id_trabajo)
+
+    def _ejecutar(self, id_trabajo):
+        try:
+            with self.app.app_context():
+                ejecutar(id_trabajo)
+        finally:
+            with self._lock:
+                self._activos -= 1
+            # Hay un hilo libre: buscar el siguiente sin esperar el intervalo
+            self._evento.set()
+
+def init_trabajos(app):
+    # Registra las tareas disponibles
+    from . import tareas
+    from .reportes import init_reportes
+    init_reportes(app)
@@ -0,0 +1,103 @@
+import logging
+import random
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.exc import DBAPIError
+from . import db
+from .instrumentation import Contador, METRICAS, medir
+from .models import InventarioGeneral, HistorialMovimiento
+
+logger = logging.getLogger(__name__)
+
+TRANSACCIONES_REINTENTADAS = Contador(
+    'inventario_transaction_retries_total', 'Transacciones repetidas tras un deadlock o un fallo de serialización',
+    ('motivo',)
+)
+METRICAS.append(TRANSACCIONES_REINTENTADAS)
+
+# Errores tras los que la transacción completa puede repetirse tal cual:
+# MySQL 1213 (deadlock) y 1205 (espera de bloqueo agotada), PostgreSQL 40P01 y 40001,
+# SQLite "database is locked"
+_CODIGOS_MYSQL = {1213: 'deadlock', 1205: 'bloqueo'}
+_CODIGOS_SQLSTATE = {'40P01': 'deadlock', '40001': 'serializacion'}
+
+def motivo_reintentable(error):
+    original = getattr(error, 'orig', None)
+    argumentos = getattr(original, 'args', None) or (None,)
+    if argumentos[0] in _CODIGOS_MYSQL:
+        return _CODIGOS_MYSQL[argumentos[0]]
+    sqlstate = getattr(original, 'pgcode', None) or getattr(original, 'sqlstate', None)
+    if sqlstate in _CODIGOS_SQLSTATE:
+        return _CODIGOS_SQLSTATE[sqlstate]
+    if 'database is locked' in str(original):
+        return 'bloqueo'
+    return None
+
+# Unidad de trabajo: ejecuta `trabajo()` (que agrega objetos a la sesión), hace un único
+# flush y un único commit. Ante un deadlock o un fallo de serialización deshace y repite
+# `trabajo()` completo con espera exponencial; cualquier otro error se propaga tras el
+# rollback. Los tiempos quedan en las fases uow_escritura, uow_commit y uow_espera
+def en_transaccion(trabajo, intentos=None):
+    intentos = intentos or current_app.config.get('TRANSACCION_INTENTOS', 3)
+    espera_base = current_app.config.get('TRANSACCION_ESPERA_BASE', 0.05)
+    for intento in range(1, intentos + 1):
+        try:
+            with medir('uow_escritura'):
+                resultado = trabajo()
+                db.session.flush()
+            with medir('uow_commit'):
+                db.session.commit()
+            return resultado
+        except DBAPIError as e:
+            db.session.rollback()
+            motivo = motivo_reintentable(e)
+            if motivo is None or intento == intentos:
+                raise
+            TRANSACCIONES_REINTENTADAS.incrementar(motivo)
+            espera = espera_base * 2 ** (intento - 1) * random.uniform(0.5, 1.5)
+            logger.warning("Transacción reintentada (%s, intento %d de %d)", motivo, intento + 1, intentos)
+            with medir('uow_espera'):
+                time.sleep(espera)
+        except Exception:
+            db.session.rollback()
+            raise
+
+# Alta de un dispositivo en una transacción: el detalle, su fila de inventario y, si nace
+# con responsable, el movimiento en el historial. El detalle se inserta primero para
+# conocer su id (INSERT ... RETURNING o lastrowid según el dialecto, sin consulta extra);
+# el inventario y el historial salen en el flush del commit.
+# Devuelve (id del detalle, id_inventario), leídos de la identidad de los objetos para
+# no recargarlos después del commit
+def alta_dispositivo(tipo, crear_detalle, datos, observaciones_historial='Asignación inicial'):
+    def trabajo():
+        detalle = crear_detalle()
+        db.session.add(detalle)
+        db.session.flush()
+        id_registro = detalle.__mapper__.primary_key_from_instance(detalle)[0]
+
+        inventario = InventarioGeneral(
+            tipo_equipo=tipo,
+            id_registro=id_registro,
+            estado=datos.get('estado', 'SinAsignar'),
+            id_usuario_responsable=datos.get('id_usuario_responsable'),
+            id_area_responsable=datos.get('id_area_responsable'),
+            id_sucursal_ubicacion=datos.get('id_sucursal_ubicacion'),
+            fecha_ingreso=datetime.now(),
+            observaciones=datos.get('observaciones', '')
+        )
+        db.session.add(inventario)
+        if inventario.id_usuario_responsable is not None:
+            db.session.add(HistorialMovimiento(
+                tipo_equipo=tipo,
+                id_equipo=id_registro,
+                responsable_anterior=None,
+                responsable_nuevo=inventario.id_usuario_responsable,
+                fecha=datetime.now(),
+                observaciones=observaciones_historial
+            ))
+        return detalle, inventario
+
+    detalle, inventario = en_transaccion(trabajo)
+    return inspect(detalle).identity[0], inspect(inventario).identity[0]
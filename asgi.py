@@ -0,0 +1,12 @@
+import logging
+from app.async_routes import create_asgi_app
+from app.logging_config import RedactarTokensFilter
+
+# Modo asíncrono: uvicorn asgi:app --host 0.0.0.0 --port 5000
+# Las lecturas pesadas usan el motor asyncio de SQLAlchemy; el resto de rutas
+# se sirven con la aplicación Flask a través de un adaptador WSGI.
+
+# El access log de uvicorn incluye el query string: se quita el token de ?jwt=
+logging.getLogger('uvicorn.access').addFilter(RedactarTokensFilter())
+
+app = create_asgi_app()
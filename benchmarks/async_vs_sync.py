@@ -0,0 +1,87 @@
+# Benchmark comparativo entre el modo síncrono (Flask sobre un pool fijo de hilos)
+# y el modo asíncrono (rutas de lectura sobre el motor asyncio de SQLAlchemy).
+#
+# El modo síncrono se sirve con un pool fijo de hilos (como un worker gthread) y
+# el asíncrono con uvicorn, ambos en este mismo proceso y contra la misma base
+# SQLite sintética. Con --latencia-db se añade una espera por sentencia en el
+# hilo que ejecuta la consulta, simulando la base MySQL remota.
+#
+#   python -m benchmarks.async_vs_sync --concurrencia 200 --peticiones 2000 --latencia-db 20
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import event
+from app import create_app, db
+from app.async_routes import AsyncInventarioApp
+from .fixtures import generar_base, config_sqlite, tokens
+from .loadgen import ejecutar_carga, imprimir_resultados
+from .servidores import servir_wsgi, servir_asgi
+
+RUTAS = ['/api/celulares/', '/api/impresoras/', '/api/consumibles/', '/api/historial/?tipo_equipo=Celular']
+
+def instalar_latencia(engine, segundos):
+    if not segundos:
+        return
+
+    def traza(_sentencia):
+        time.sleep(segundos)
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, _connection_record):
+        if hasattr(dbapi_connection, 'run_async'):
+            dbapi_connection.run_async(lambda conexion: conexion.set_trace_callback(traza))
+        else:
+            dbapi_connection.set_trace_callback(traza)
+
+    # Las conexiones ya abiertas (p. ej. por create_all) no tienen la traza
+    engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrencia', type=int, default=200)
+    parser.add_argument('--peticiones', type=int, default=2000)
+    parser.add_argument('--latencia-db', type=float, default=20, help='ms por sentencia SQL')
+    parser.add_argument('--hilos-sync', type=int, default=32, help='hilos de trabajo del modo síncrono')
+    parser.add_argument('--equipos', type=int, default=200)
+    parser.add_argument('--puerto', type=int, default=8765)
+    args = parser.parse_args()
+
+    latencia = args.latencia_db / 1000
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'benchmark.db')
+        generar_base(ruta, equipos=args.equipos, celulares=args.equipos, impresoras=args.equipos // 2)
+        config = config_sqlite(
+            ruta,
+            SQLALCHEMY_ENGINE_OPTIONS={'pool_size': args.hilos_sync, 'max_overflow': 0},
+            ASYNC_POOL_SIZE=args.concurrencia,
+            ASYNC_MAX_OVERFLOW=0
+        )
+
+        sync_app = create_app(config)
+        with sync_app.app_context():
+            instalar_latencia(db.engine, latencia)
+        async_app = AsyncInventarioApp(create_app(config))
+        instalar_latencia(async_app.engine.sync_engine, latencia)
+
+        headers = {'Authorization': f"Bearer {tokens(sync_app)['usuario']}"}
+        modos = [
+            (f'sincrono ({args.hilos_sync} hilos)', args.puerto, lambda: servir_wsgi(sync_app, args.puerto, args.hilos_sync)),
+            ('asincrono', args.puerto + 1, lambda: servir_asgi(async_app, args.puerto + 1)),
+        ]
+        for titulo, puerto, iniciar in modos:
+            servidor = iniciar()
+            try:
+                # Calentamiento: abre las conexiones del pool antes de medir
+                ejecutar_carga(f'http://127.0.0.1:{puerto}', RUTAS, concurrencia=args.concurrencia,
+                               peticiones=args.concurrencia, headers=headers)
+                resultados = ejecutar_carga(
+                    f'http://127.0.0.1:{puerto}', RUTAS,
+                    concurrencia=args.concurrencia, peticiones=args.peticiones, headers=headers
+                )
+                imprimir_resultados(titulo, resultados)
+            finally:
+                servidor.detener()
+
+if __name__ == '__main__':
+    main()
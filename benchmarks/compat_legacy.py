@@ -0,0 +1,167 @@
+# Compatibilidad y costo de las rutas del cliente Flutter (GET/POST /api/inventario).
+#
+# Compara la implementación actual con la original, que se conserva aquí como
+# referencia: el listado con un .get() por fila y el alta con dos commits.
+# Verifica que el JSON del listado sea idéntico y reporta consultas, transacciones
+# y latencia de ambas. Termina con código 1 si las respuestas difieren.
+#
+#   python -m benchmarks.compat_legacy --equipos 2000 --iteraciones 5
+import argparse
+import os
+import warnings
+import sys
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import db
+from app.models import InventarioGeneral, EquipoComputacional, Celular, Impresora
+from .fixtures import CANTIDADES, generar_base, tokens
+from .loadgen import percentil
+from .suite import ContadorConsultas
+
+def listado_original():
+    warnings.filterwarnings('ignore', message='The Query.get')
+    data = []
+    for item in InventarioGeneral.query.all():
+        detalle = {}
+        if item.tipo_equipo == "Computacional":
+            equipo = EquipoComputacional.query.get(item.id_registro)
+            if equipo:
+                detalle = {
+                    "tipo": "Computacional", "codigo": equipo.codigo_interno, "marca": equipo.marca,
+                    "modelo": equipo.modelo, "procesador": equipo.procesador, "ram": equipo.ram,
+                    "disco_duro": equipo.disco_duro, "sistema_operativo": equipo.sistema_operativo,
+                    "office": equipo.office, "antivirus": equipo.antivirus, "drive": equipo.drive,
+                    "nombre_equipo": equipo.nombre_equipo, "serial_number": equipo.serial_number,
+                    "fecha_revision": equipo.fecha_revision.isoformat() if equipo.fecha_revision else None,
+                    "entregado_por": equipo.entregado_por, "comentarios": equipo.comentarios
+                }
+            else:
+                detalle = {"tipo": "Computacional",
+                           "error": f"Equipo ID {item.id_registro} no encontrado en tabla 'equipos_computacionales'"}
+        elif item.tipo_equipo == "Celular":
+            cel = Celular.query.get(item.id_registro)
+            if cel:
+                detalle = {"tipo": "Celular", "codigo": cel.codigo_interno, "marca": cel.marca, "modelo": cel.modelo,
+                           "imei": cel.imei, "numero_linea": cel.numero_linea}
+            else:
+                detalle = {"tipo": "Celular", "error": f"Celular ID {item.id_registro} no encontrado"}
+        elif item.tipo_equipo == "Impresora":
+            imp = Impresora.query.get(item.id_registro)
+            if imp:
+                detalle = {"tipo": "Impresora", "codigo": imp.codigo_interno, "marca": imp.marca,
+                           "modelo": imp.modelo, "ip": imp.ip_asignada}
+            else:
+                detalle = {"tipo": "Impresora", "error": f"Impresora ID {item.id_registro} no encontrada"}
+        data.append({
+            "id": item.id_inventario,
+            "estado": item.estado,
+            "fecha_ingreso": item.fecha_ingreso.isoformat() if item.fecha_ingreso else None,
+            "observaciones": item.observaciones,
+            "detalle": detalle
+        })
+    return data
+
+def alta_original(data):
+    nuevo_equipo = EquipoComputacional(codigo_interno=data["codigo_interno"], marca=data.get("marca"),
+                                       modelo=data.get("modelo"))
+    db.session.add(nuevo_equipo)
+    db.session.commit()
+    db.session.add(InventarioGeneral(tipo_equipo="Computacional", id_registro=nuevo_equipo.id_equipo,
+                                     estado="SinAsignar", fecha_ingreso=datetime.now(),
+                                     observaciones="Equipo agregado desde Flutter"))
+    db.session.commit()
+
+class ContadorTransacciones:
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, conexion):
+        self.total += 1
+
+def medir(funcion, iteraciones):
+    consultas = ContadorConsultas()
+    transacciones = ContadorTransacciones()
+    latencias = []
+    event.listen(Engine, 'after_cursor_execute', consultas)
+    event.listen(Engine, 'commit', transacciones)
+    try:
+        for i in range(iteraciones):
+            t0 = time.perf_counter()
+            funcion(i)
+            latencias.append(time.perf_counter() - t0)
+    finally:
+        event.remove(Engine, 'after_cursor_execute', consultas)
+        event.remove(Engine, 'commit', transacciones)
+    return {
+        'consultas': round(consultas.total / iteraciones, 1),
+        'transacciones': round(transacciones.total / iteraciones, 1),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p90_ms': round(percentil(latencias, 90) * 1000, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iteraciones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--db', help='ruta de la base SQLite (por defecto, temporal)')
+    for entidad, cantidad in CANTIDADES.items():
+        parser.add_argument(f'--{entidad}', type=int, default=cantidad)
+    args = parser.parse_args()
+
+    cantidades = {entidad: getattr(args, entidad) for entidad in CANTIDADES}
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = args.db or os.path.join(directorio, 'legacy.db')
+        # La referencia original hace cargas perezosas a propósito
+        app = generar_base(ruta, semilla=args.semilla,
+                           config_extra={'LOG_LEVEL': 'ERROR', 'CARGAS_ESTRICTAS': False}, **cantidades)
+        cliente = app.test_client()
+        # Las rutas piden JWT; el alta, además, un administrador
+        cabeceras = {'Authorization': 'Bearer ' + tokens(app)['admin']}
+
+        with app.app_context():
+            # Un equipo sin su registro de detalle cubre también el formato de error
+            db.session.add(InventarioGeneral(tipo_equipo='Celular', id_registro=999999, estado='DeBaja'))
+            db.session.commit()
+            esperado = listado_original()
+            db.session.remove()
+        actual = cliente.get('/api/inventario', headers=cabeceras).get_json()
+
+        def listado_ref(i):
+            with app.app_context():
+                listado_original()
+
+        def alta_ref(i):
+            with app.app_context():
+                alta_original({'codigo_interno': f'LEGACY-REF-{i}', 'marca': 'Ref', 'modelo': 'R'})
+
+        resultados = {
+            'GET original': medir(listado_ref, args.iteraciones),
+            'GET actual': medir(lambda i: cliente.get('/api/inventario', headers=cabeceras), args.iteraciones),
+            'POST original': medir(alta_ref, args.iteraciones),
+            'POST actual': medir(lambda i: cliente.post('/api/inventario', headers=cabeceras, json={
+                'codigo_interno': f'LEGACY-NUEVO-{i}', 'marca': 'Nuevo', 'modelo': 'N'}), args.iteraciones),
+        }
+        # Los equipos creados por ambas altas deben verse igual en el listado (salvo id y código)
+        def sin_ids(equipo):
+            return dict(equipo, id=None, detalle=dict(equipo['detalle'], codigo=None, marca=None, modelo=None))
+        final = {e['detalle'].get('codigo'): e for e in cliente.get('/api/inventario', headers=cabeceras).get_json()}
+        altas_iguales = all(
+            sin_ids(final[f'LEGACY-REF-{i}']) == sin_ids(final[f'LEGACY-NUEVO-{i}'])
+            for i in range(args.iteraciones)
+        )
+
+    print(f"{'ruta':<16}{'consultas':>11}{'commits':>9}{'p50 ms':>10}{'p90 ms':>10}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<16}{r['consultas']:>11}{r['transacciones']:>9}{r['p50_ms']:>10}{r['p90_ms']:>10}")
+
+    iguales = actual == esperado
+    print(f"\nListado idéntico a la implementación original ({len(esperado)} equipos): {'sí' if iguales else 'NO'}")
+    print(f"Altas equivalentes: {'sí' if altas_iguales else 'NO'}")
+    if not (iguales and altas_iguales):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
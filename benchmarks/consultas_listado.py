@@ -0,0 +1,76 @@
+# Consultas SQL y latencia de GET /inventario/ según la estrategia con la que se
+# cargan sus relaciones (responsable, área, sucursal y detalle por tipo). "select"
+# es la carga perezosa, una consulta por fila y relación, como hacía el listado
+# antes de los perfiles de carga; "perfil" es el perfil inventario_listado tal cual
+# (JOIN para los detalles, IN para las tablas globales).
+#
+#   python -m benchmarks.consultas_listado --equipos 2000 --iteraciones 5
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import cargas
+from .fixtures import CANTIDADES, generar_base, tokens
+from .loadgen import percentil
+from .suite import ContadorConsultas
+
+ESTRATEGIAS = ('select', 'joined', 'selectin', 'perfil')
+
+def medir(app, estrategia, iteraciones, token, ruta='/inventario/'):
+    modelo, original = cargas.PERFILES['inventario_listado']
+    if estrategia != 'perfil':
+        cargas.PERFILES['inventario_listado'] = (modelo, {relacion: estrategia for relacion in original})
+    cliente = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    contador = ContadorConsultas()
+    latencias = []
+    try:
+        referencia = cliente.get(ruta, headers=headers).get_json()
+        event.listen(Engine, 'after_cursor_execute', contador)
+        try:
+            for _ in range(iteraciones):
+                t0 = time.perf_counter()
+                cliente.get(ruta, headers=headers)
+                latencias.append(time.perf_counter() - t0)
+        finally:
+            event.remove(Engine, 'after_cursor_execute', contador)
+    finally:
+        cargas.PERFILES['inventario_listado'] = (modelo, original)
+    return {
+        'filas': len(referencia),
+        'consultas': round(contador.total / iteraciones, 1),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p90_ms': round(percentil(latencias, 90) * 1000, 2),
+    }, referencia
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iteraciones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--db', help='ruta de la base SQLite (por defecto, temporal)')
+    for entidad, cantidad in CANTIDADES.items():
+        parser.add_argument(f'--{entidad}', type=int, default=cantidad)
+    args = parser.parse_args()
+
+    cantidades = {entidad: getattr(args, entidad) for entidad in CANTIDADES}
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = args.db or os.path.join(directorio, 'listado.db')
+        app = generar_base(ruta, semilla=args.semilla, config_extra={'LOG_LEVEL': 'ERROR'}, **cantidades)
+        token = tokens(app)['admin']
+        resultados = {}
+        respuestas = {}
+        for estrategia in ESTRATEGIAS:
+            resultados[estrategia], respuestas[estrategia] = medir(app, estrategia, args.iteraciones, token)
+
+    print(f"{'estrategia':<12}{'filas':>8}{'consultas':>11}{'p50 ms':>10}{'p90 ms':>10}")
+    for estrategia, r in resultados.items():
+        print(f"{estrategia:<12}{r['filas']:>8}{r['consultas']:>11}{r['p50_ms']:>10}{r['p90_ms']:>10}")
+    # Todas las estrategias deben producir exactamente la misma respuesta
+    distintas = [e for e in ESTRATEGIAS if respuestas[e] != respuestas['select']]
+    if distintas:
+        print(f"\nRespuestas distintas a la carga perezosa: {', '.join(distintas)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import os
+import random
+from datetime import datetime, timedelta
+import bcrypt
+from flask_jwt_extended import create_access_token, create_refresh_token
+from app import create_app, db
+from app.config import Config
+from app.models import (
+    Rol, Area, Sucursal, Usuario, InventarioGeneral, EquipoComputacional,
+    Celular, Impresora, Consumible, HistorialMovimiento
+)
+
+CANTIDADES = {
+    'sucursales': 5,
+    'areas': 8,
+    'usuarios': 50,
+    'equipos': 500,
+    'celulares': 300,
+    'impresoras': 100,
+    'consumibles': 60,
+    'historial': 1000,
+}
+
+PASSWORD = 'benchmark'
+# Fecha fija para que las fechas generadas no dependan del día de ejecución
+FECHA_REFERENCIA = datetime(2025, 1, 1)
+ESTADOS = ['DeBaja', 'Asignado', 'SinAsignar', 'EnReparacion']
+
+def config_sqlite(ruta, **extra):
+    atributos = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(ruta)}',
+        'ASYNC_DATABASE_URI': None,
+        # Los benchmarks miden la API, no los límites de peticiones
+        'RATE_LIMIT_ENABLED': False,
+        'CONCURRENCIA_MAXIMA': {},
+        # Una carga perezosa de relaciones en un benchmark es un N+1: que falle
+        'CARGAS_ESTRICTAS': True,
+    }
+    atributos.update(extra)
+    return type('ConfigBenchmark', (Config,), atributos)
+
+# Genera una base SQLite con datos sintéticos reproducibles (misma semilla, mismos datos)
+def generar_base(ruta, semilla=42, config_extra=None, **cantidades):
+    if os.path.exists(ruta):
+        os.remove(ruta)
+
+    total = dict(CANTIDADES, **cantidades)
+    app = create_app(config_sqlite(ruta, **(config_extra or {})))
+    with app.app_context():
+        _poblar(random.Random(semilla), total)
+    return app
+
+def _poblar(rnd, total):
+    # Un único hash de bajo costo para no pagar bcrypt por cada usuario generado
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+
+    db.session.add_all([
+        Rol(id=1, nombre='Administrador', descripcion='Acceso total'),
+        Rol(id=2, nombre='Usuario', descripcion='Acceso a su sucursal'),
+    ])
+    ids_sucursal = list(range(1, total['sucursales'] + 1))
+    db.session.add_all([
+        Sucursal(
+            id_sucursal=i,
+            nombre_sucursal=f'Sucursal {i}',
+            direccion=f'Calle {i} #{100 + i}',
+            region=f'Region {(i - 1) % 3 + 1}',
+            telefono_contacto=f'+56 2 2{i:07d}'
+        )
+        for i in ids_sucursal
+    ])
+    ids_area = list(range(1, total['areas'] + 1))
+    db.session.add_all([Area(id_area=i, nombre_area=f'Area {i}') for i in ids_area])
+
+    ids_usuario = list(range(1, total['usuarios'] + 1))
+    for i in ids_usuario:
+        # El usuario 1 es administrador y el 2 un usuario normal, ambos en la sucursal 1
+        id_sucursal = 1 if i <= 2 else rnd.choice(ids_sucursal)
+        db.session.add(Usuario(
+            id=i,
+            usuario=f'usuario{i}',
+            contraseña_hash=password_hash,
+            nombre=f'Usuario {i}',
+            id_sucursal=id_sucursal,
+            sucursal_activa=id_sucursal,
+            id_rol=1 if i == 1 else 2,
+            activo=True
+        ))
+    db.session.flush()
+
+    hoy = FECHA_REFERENCIA.date()
+    id_inventario = 0
+
+    def inventario(tipo, id_registro):
+        nonlocal id_inventario
+        id_inventario += 1
+        estado = rnd.choice(ESTADOS)
+        item = InventarioGeneral(
+            id_inventario=id_inventario,
+            tipo_equipo=tipo,
+            id_registro=id_registro,
+            estado=estado,
+            id_usuario_responsable=rnd.choice(ids_usuario) if estado == 'Asignado' else None,
+            id_area_responsable=rnd.choice(ids_area),
+            id_sucursal_ubicacion=rnd.choice(ids_sucursal),
+            fecha_ingreso=hoy - timedelta(days=rnd.randint(0, 1500)),
+            observaciones=f'Registro sintético {id_inventario}'
+        )
+        # En su estado desde el ingreso: da antigüedades variadas a las consultas de ciclo de vida
+        item.fecha_estado = datetime.combine(item.fecha_ingreso, datetime.min.time())
+        return item
+
+    for i in range(1, total['equipos'] + 1):
+        db.session.add(EquipoComputacional(
+            id_equipo=i,
+            codigo_interno=f'PC-{i:06d}',
+            marca=rnd.choice(['Dell', 'HP', 'Lenovo']),
+            modelo=f'Modelo {rnd.randint(1, 40)}',
+            procesador=rnd.choice(['i5', 'i7', 'Ryzen 5']),
+            ram=rnd.choice(['8GB', '16GB', '32GB']),
+            disco_duro=rnd.choice(['256GB SSD', '512GB SSD', '1TB HDD']),
+            sistema_operativo='Windows 11',
+            office='Microsoft 365',
+            antivirus='Defender',
+            drive='Google Drive',
+            nombre_equipo=f'EQ-{i:06d}',
+            serial_number=f'SN{i:010d}',
+            fecha_revision=hoy - timedelta(days=rnd.randint(0, 365)),
+            entregado_por='Soporte TI',
+            comentarios=None
+        ))
+        db.session.add(inventario('Computacional', i))
+
+    for i in range(1, total['celulares'] + 1):
+        db.session.add(Celular(
+            id_celular=i,
+            codigo_interno=f'CEL-{i:06d}',
+            marca=rnd.choice(['Samsung', 'Motorola', 'Apple']),
+            modelo=f'Modelo {rnd.randint(1, 20)}',
+            imei=f'{rnd.randint(10**14, 10**15 - 1)}',
+            numero_linea=f'+569{rnd.randint(10**7, 10**8 - 1)}',
+            sistema_operativo=rnd.choice(['Android', 'iOS']),
+            capacidad_almacenamiento=rnd.choice(['64GB', '128GB', '256GB']),
+            comentarios=None
+        ))
+        db.session.add(inventario('Celular', i))
+
+    for i in range(1, total['impresoras'] + 1):
+        db.session.add(Impresora(
+            id_impresora=i,
+            codigo_interno=f'IMP-{i:06d}',
+            marca=rnd.choice(['Brother', 'HP', 'Epson']),
+            modelo=f'Modelo {rnd.randint(1, 10)}',
+            tipo_conexion=rnd.choice(['USB', 'Red', 'WiFi']),
+            ip_asignada=f'10.0.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}',
+            serial_number=f'ISN{i:09d}',
+            observaciones=None
+        ))
+        db.session.add(inventario('Impresora', i))
+
+    for i in range(1, total['consumibles'] + 1):
+        db.session.add(Consumible(
+            id_consumible=i,
+            tipo=rnd.choice(['Toner', 'Tambor']),
+            marca=rnd.choice(['Brother', 'HP', 'Epson']),
+            modelo=f'TN-{rnd.randint(100, 999)}',
+            stock_actual=rnd.randint(0, 30),
+            stock_minimo=rnd.randint(1, 5),
+            id_sucursal_stock=rnd.choice(ids_sucursal)
+        ))
+
+    tipos = [('Computacional', total['equipos']), ('Celular', total['celulares']), ('Impresora', total['impresoras'])]
+    tipos = [t for t in tipos if t[1]]
+    for i in range(1, total['historial'] + 1 if tipos else 1):
+        tipo, cantidad = rnd.choice(tipos)
+        db.session.add(HistorialMovimiento(
+            id=i,
+            tipo_equipo=tipo,
+            id_equipo=rnd.randint(1, cantidad),
+            responsable_anterior=rnd.choice(ids_usuario),
+            responsable_nuevo=rnd.choice(ids_usuario),
+            fecha=FECHA_REFERENCIA - timedelta(minutes=rnd.randint(0, 60 * 24 * 365)),
+            observaciones='Cambio de responsable'
+        ))
+
+    db.session.commit()
+
+# Tokens de acceso para el administrador (id 1) y un usuario normal (id 2)
+def tokens(app):
+    with app.app_context():
+        return {
+            'admin': create_access_token(identity=1, expires_delta=timedelta(days=1)),
+            'usuario': create_access_token(identity=2, expires_delta=timedelta(days=1)),
+            'refresh': create_refresh_token(identity=1, expires_delta=timedelta(days=1)),
+        }
@@ -0,0 +1,74 @@
+# Prueba de carga reproducible de los endpoints principales contra una base
+# SQLite sintética (misma semilla, mismos datos).
+#
+# Servidor en proceso (pool fijo de hilos, como un worker gthread):
+#   python -m benchmarks.load_test --concurrencia 50 --peticiones 2000
+#
+# Contra un servidor externo, p. ej. el perfil de producción de gunicorn:
+#   python -m benchmarks.load_test --db /tmp/bench.db --solo-generar
+#   DATABASE_URL=sqlite:////tmp/bench.db gunicorn -c gunicorn.conf.py wsgi:app
+#   python -m benchmarks.load_test --db /tmp/bench.db --url http://127.0.0.1:5000
+import argparse
+import os
+import tempfile
+from app import create_app
+from .fixtures import generar_base, config_sqlite, tokens
+from .loadgen import ejecutar_carga, imprimir_resultados
+from .servidores import servir_wsgi
+
+RUTAS = [
+    '/inventario/',
+    '/api/celulares/',
+    '/api/impresoras/',
+    '/api/consumibles/',
+    '/api/historial/',
+    '/api/usuarios/',
+    '/api/auth/perfil',
+]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', help='ruta de la base SQLite (por defecto, temporal)')
+    parser.add_argument('--solo-generar', action='store_true', help='generar la base y salir')
+    parser.add_argument('--url', help='servidor externo a probar')
+    parser.add_argument('--hilos', type=int, default=8, help='hilos del servidor en proceso')
+    parser.add_argument('--concurrencia', type=int, default=32)
+    parser.add_argument('--peticiones', type=int, default=1000)
+    parser.add_argument('--equipos', type=int, default=300)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--rutas', nargs='*', default=RUTAS)
+    parser.add_argument('--puerto', type=int, default=8780)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = args.db or os.path.join(directorio, 'load_test.db')
+        if args.url and os.path.exists(ruta):
+            app = create_app(config_sqlite(ruta))
+        else:
+            app = generar_base(ruta, semilla=args.semilla, equipos=args.equipos)
+            if args.solo_generar:
+                print(f"Base generada en {os.path.abspath(ruta)}")
+                return
+
+        headers = {'Authorization': f"Bearer {tokens(app)['admin']}"}
+        servidor = None
+        url = args.url
+        if not url:
+            app = create_app(config_sqlite(
+                ruta, SQLALCHEMY_ENGINE_OPTIONS={'pool_size': args.hilos, 'max_overflow': 0}
+            ))
+            servidor = servir_wsgi(app, args.puerto, args.hilos)
+            url = f'http://127.0.0.1:{args.puerto}'
+
+        try:
+            resultados = ejecutar_carga(
+                url, args.rutas,
+                concurrencia=args.concurrencia, peticiones=args.peticiones, headers=headers
+            )
+            imprimir_resultados(f'{url} ({args.concurrencia} clientes)', resultados)
+        finally:
+            if servidor:
+                servidor.detener()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import http.client
+import math
+import threading
+import time
+from urllib.parse import urlsplit
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    indice = min(len(valores) - 1, max(0, math.ceil(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+def resumir(latencias, errores, duracion):
+    return {
+        'peticiones': len(latencias),
+        'errores': errores,
+        'rps': round(len(latencias) / duracion, 1) if duracion else 0.0,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p90_ms': round(percentil(latencias, 90) * 1000, 2),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+        'max_ms': round(max(latencias) * 1000, 2) if latencias else 0.0,
+    }
+
+# Lanza `peticiones` GET repartidas en round-robin sobre `rutas` con `concurrencia`
+# conexiones keep-alive simultáneas y devuelve el resumen por ruta y total
+def ejecutar_carga(base_url, rutas, concurrencia=50, peticiones=1000, headers=None, timeout=60):
+    destino = urlsplit(base_url)
+    headers = dict(headers or {})
+    lock = threading.Lock()
+    siguiente = [0]
+    latencias = {ruta: [] for ruta in rutas}
+    errores = {ruta: 0 for ruta in rutas}
+
+    def trabajador():
+        conexion = http.client.HTTPConnection(destino.hostname, destino.port, timeout=timeout)
+        try:
+            while True:
+                with lock:
+                    n = siguiente[0]
+                    if n >= peticiones:
+                        return
+                    siguiente[0] += 1
+                ruta = rutas[n % len(rutas)]
+                inicio = time.perf_counter()
+                try:
+                    conexion.request('GET', destino.path.rstrip('/') + ruta, headers=headers)
+                    respuesta = conexion.getresponse()
+                    respuesta.read()
+                    fallo = respuesta.status >= 400
+                except (OSError, http.client.HTTPException):
+                    conexion.close()
+                    conexion = http.client.HTTPConnection(destino.hostname, destino.port, timeout=timeout)
+                    fallo = True
+                transcurrido = time.perf_counter() - inicio
+                with lock:
+                    latencias[ruta].append(transcurrido)
+                    if fallo:
+                        errores[ruta] += 1
+        finally:
+            conexion.close()
+
+    hilos = [threading.Thread(target=trabajador, daemon=True) for _ in range(concurrencia)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    resultados = {ruta: resumir(latencias[ruta], errores[ruta], duracion) for ruta in rutas}
+    resultados['total'] = resumir(
+        [l for ruta in rutas for l in latencias[ruta]],
+        sum(errores.values()),
+        duracion
+    )
+    return resultados
+
+def imprimir_resultados(titulo, resultados):
+    print(f"\n== {titulo}")
+    print(f"{'ruta':<32}{'peticiones':>11}{'errores':>9}{'rps':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for ruta, r in resultados.items():
+        print(f"{ruta:<32}{r['peticiones']:>11}{r['errores']:>9}{r['rps']:>9}{r['p50_ms']:>10}{r['p90_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}")
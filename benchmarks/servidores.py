@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+class HandlerSilencioso(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+# Servidor WSGI con un número fijo de hilos de trabajo, como un worker gthread:
+# cada petición ocupa un hilo hasta que termina, incluida la espera a la base
+class ServidorPoolHilos(BaseWSGIServer):
+    def __init__(self, host, port, app, hilos):
+        super().__init__(host, port, app, handler=HandlerSilencioso)
+        self.pool = ThreadPoolExecutor(hilos)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._atender, request, client_address)
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+class ServidorEnHilo:
+    def __init__(self, iniciar, detener):
+        self._detener = detener
+        self._hilo = threading.Thread(target=iniciar, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener()
+        self._hilo.join()
+
+def servir_wsgi(flask_app, puerto, hilos):
+    server = ServidorPoolHilos('127.0.0.1', puerto, flask_app, hilos)
+
+    def detener():
+        server.shutdown()
+        server.server_close()
+
+    return ServidorEnHilo(server.serve_forever, detener)
+
+def servir_asgi(asgi_app, puerto):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(
+        asgi_app, host='127.0.0.1', port=puerto, log_level='warning', lifespan='on', backlog=4096
+    ))
+
+    def detener():
+        server.should_exit = True
+
+    servidor = ServidorEnHilo(lambda: asyncio.run(server.serve()), detener)
+    while not server.started:
+        time.sleep(0.05)
+    return servidor
@@ -0,0 +1,141 @@
+# Benchmark del canal de eventos (SSE): abre cientos de suscriptores locales,
+# genera cambios de stock con PUT /api/consumibles/<id> y mide cuánto tarda
+# cada evento en llegar a cada suscriptor. Con --lentos se añaden suscriptores
+# en el mismo proceso que consumen su cola con retardo (por HTTP los buffers
+# del socket ocultarían la lentitud), para forzar el descarte a "resync"
+# cuando su cola se llena.
+#
+#   python -m benchmarks.sse_fanout --suscriptores 300 --cambios 200 --lentos 10
+import argparse
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from app.eventos import difusor
+from .fixtures import generar_base, tokens
+from .loadgen import percentil
+from .servidores import servir_wsgi
+
+class Suscriptor(threading.Thread):
+    def __init__(self, puerto, token):
+        super().__init__(daemon=True)
+        self.puerto = puerto
+        self.token = token
+        self.latencias = []
+        self.resyncs = 0
+        self.conectado = threading.Event()
+        self.detener = False
+
+    def run(self):
+        conexion = http.client.HTTPConnection('127.0.0.1', self.puerto, timeout=60)
+        conexion.request('GET', f'/api/eventos/?sucursal=todas&jwt={self.token}')
+        respuesta = conexion.getresponse()
+        tipo = None
+        try:
+            while not self.detener:
+                linea = respuesta.readline()
+                if not linea:
+                    break
+                linea = linea.decode('utf-8').rstrip('\n')
+                if linea.startswith('event: '):
+                    tipo = linea[7:]
+                elif linea.startswith('data: '):
+                    self._recibir(tipo, json.loads(linea[6:]))
+        except OSError:
+            pass
+        finally:
+            conexion.close()
+
+    def _recibir(self, tipo, evento):
+        if tipo == 'conectado':
+            self.conectado.set()
+        elif tipo == 'resync':
+            self.resyncs += 1
+        elif tipo == 'cambio':
+            enviado = datetime.fromisoformat(evento['ts'])
+            self.latencias.append((datetime.now(timezone.utc) - enviado).total_seconds())
+
+class SuscriptorLento(threading.Thread):
+    def __init__(self, retardo):
+        super().__init__(daemon=True)
+        self.suscripcion = difusor.suscribir(None)
+        self.retardo = retardo
+        self.procesados = 0
+        self.resyncs = 0
+        self.detener = False
+
+    def run(self):
+        while not self.detener:
+            try:
+                evento = self.suscripcion.siguiente(timeout=0.5)
+            except Exception:
+                continue
+            if evento['tipo'] == 'resync':
+                self.resyncs += 1
+            else:
+                self.procesados += 1
+                time.sleep(self.retardo)
+        difusor.cancelar(self.suscripcion)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--suscriptores', type=int, default=300)
+    parser.add_argument('--lentos', type=int, default=0, help='suscriptores que tardan --retardo-lento por evento')
+    parser.add_argument('--retardo-lento', type=float, default=0.2)
+    parser.add_argument('--cambios', type=int, default=200)
+    parser.add_argument('--cola', type=int, default=50, help='SSE_COLA_MAXIMA')
+    parser.add_argument('--puerto', type=int, default=8775)
+    args = parser.parse_args()
+
+    total = args.suscriptores + args.lentos
+    with tempfile.TemporaryDirectory() as directorio:
+        app = generar_base(
+            os.path.join(directorio, 'sse.db'),
+            config_extra={'SSE_MAX_SUSCRIPTORES': total, 'SSE_COLA_MAXIMA': args.cola, 'SSE_LATIDO_SEGUNDOS': 5},
+            equipos=10, celulares=10, impresoras=5, consumibles=20, historial=10
+        )
+        token = tokens(app)['admin']
+        # Cada suscriptor ocupa un hilo del servidor mientras dura el stream
+        servidor = servir_wsgi(app, args.puerto, total + 8)
+        suscriptores = [Suscriptor(args.puerto, token) for _ in range(args.suscriptores)]
+        lentos = [SuscriptorLento(args.retardo_lento) for _ in range(args.lentos)]
+        try:
+            for s in suscriptores + lentos:
+                s.start()
+            for s in suscriptores:
+                s.conectado.wait(30)
+
+            conexion = http.client.HTTPConnection('127.0.0.1', args.puerto, timeout=60)
+            headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+            inicio = time.perf_counter()
+            for n in range(args.cambios):
+                cuerpo = json.dumps({'stock_actual': n})
+                conexion.request('PUT', f'/api/consumibles/{n % 20 + 1}', body=cuerpo, headers=headers)
+                conexion.getresponse().read()
+            duracion_escritura = time.perf_counter() - inicio
+            conexion.close()
+
+            # Tiempo para que los suscriptores normales terminen de recibir
+            limite = time.time() + 10
+            while time.time() < limite and any(len(s.latencias) < args.cambios for s in suscriptores):
+                time.sleep(0.05)
+        finally:
+            for s in suscriptores + lentos:
+                s.detener = True
+            servidor.detener()
+
+    latencias = [l for s in suscriptores for l in s.latencias]
+    print(f"suscriptores: {args.suscriptores} normales, {args.lentos} lentos")
+    print(f"cambios: {args.cambios} en {duracion_escritura:.2f}s ({args.cambios / duracion_escritura:.1f}/s)")
+    print(f"eventos entregados a normales: {len(latencias)} de {args.cambios * args.suscriptores}")
+    print(f"latencia de entrega: p50 {percentil(latencias, 50) * 1000:.1f} ms, "
+          f"p99 {percentil(latencias, 99) * 1000:.1f} ms, max {max(latencias, default=0) * 1000:.1f} ms")
+    if lentos:
+        print(f"lentos: {sum(s.procesados for s in lentos)} eventos procesados, "
+              f"{sum(s.resyncs for s in lentos)} resync")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+# Suite de benchmarks de todos los endpoints de los blueprints.
+#
+# Genera una base SQLite sintética, recorre cada endpoint con el cliente de
+# pruebas de Flask (con JWT) y reporta por endpoint: throughput, percentiles de
+# latencia, consultas SQL por petición y memoria pico de una petición.
+# El stream SSE de /api/eventos/ no termina: se mide con benchmarks.sse_fanout.
+#
+#   python -m benchmarks.suite --iteraciones 50
+#   python -m benchmarks.suite --guardar benchmarks/baseline.json
+#   python -m benchmarks.suite --comparar benchmarks/baseline.json --tolerancia 0.25
+#
+# En modo comparación termina con código 1 si algún endpoint empeora más que la
+# tolerancia en p50/p90 o ejecuta más consultas que en la línea base.
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import count
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .fixtures import CANTIDADES, PASSWORD, generar_base, tokens
+from .loadgen import percentil
+
+class Escenario:
+    def __init__(self, nombre, metodo, ruta, cuerpo=None, token='admin', despues=None):
+        self.nombre = nombre
+        self.metodo = metodo
+        self.ruta = ruta
+        self.cuerpo = cuerpo
+        self.token = token
+        self.despues = despues
+
+def _creados(clave, almacen):
+    # Guarda los ids devueltos por un POST para que el DELETE los elimine después
+    def registrar(respuesta):
+        if respuesta.status_code == 201:
+            almacen.setdefault(clave, []).append(respuesta.get_json()[clave])
+    return registrar
+
+def _siguiente(almacen, clave):
+    def ruta_base(base):
+        return lambda i: f"{base}{almacen[clave].pop() if almacen.get(clave) else 0}"
+    return ruta_base
+
+# Reporte de la sucursal 1 y un trabajo completado con archivo, para las lecturas que
+# los necesitan. Los trabajos se ejecutan aquí: en la suite no hay ejecutor en proceso
+def preparar(app):
+    from app import db
+    from app.reportes import generar_reporte
+    from app.trabajos import encolar, ejecutar
+
+    with app.app_context():
+        generar_reporte(1)
+        db.session.commit()
+        trabajo = encolar('exportar_inventario', {}, 1)
+        ejecutar(trabajo.id)
+        return {'trabajo': trabajo.id}
+
+def escenarios(preparados):
+    secuencia = count(1)
+    creados = {}
+
+    def dispositivo(prefijo):
+        return lambda i: {'codigo_interno': f'BENCH-{prefijo}-{next(secuencia)}', 'marca': 'Bench', 'modelo': 'B1',
+                          'id_sucursal_ubicacion': 1, 'id_area_responsable': 1}
+
+    return [
+        # Autenticación
+        Escenario('auth.login', 'POST', lambda i: '/api/auth/login', lambda i: {'usuario': 'usuario2', 'password': PASSWORD}, token=None),
+        Escenario('auth.refresh', 'POST', lambda i: '/api/auth/refresh', token='refresh'),
+        Escenario('auth.perfil', 'GET', lambda i: '/api/auth/perfil'),
+        Escenario('auth.cambiar_sucursal', 'POST', lambda i: '/api/auth/cambiar-sucursal', lambda i: {'id_sucursal': 1}),
+
+        # Lecturas
+        Escenario('equipos.listado', 'GET', lambda i: '/inventario/'),
+        Escenario('equipos.detalle', 'GET', lambda i: f'/inventario/{i % 20 + 1}'),
+        Escenario('celulares.listado', 'GET', lambda i: '/api/celulares/'),
+        Escenario('celulares.detalle', 'GET', lambda i: f'/api/celulares/{i % 20 + 1}'),
+        Escenario('impresoras.listado', 'GET', lambda i: '/api/impresoras/'),
+        Escenario('impresoras.detalle', 'GET', lambda i: f'/api/impresoras/{i % 20 + 1}'),
+        Escenario('consumibles.listado', 'GET', lambda i: '/api/consumibles/'),
+        Escenario('consumibles.detalle', 'GET', lambda i: f'/api/consumibles/{i % 20 + 1}'),
+        Escenario('historial.listado', 'GET', lambda i: '/api/historial/'),
+        Escenario('historial.filtrado', 'GET', lambda i: '/api/historial/?tipo_equipo=Celular'),
+        Escenario('historial.detalle', 'GET', lambda i: f'/api/historial/{i % 20 + 1}'),
+        Escenario('usuarios.listado', 'GET', lambda i: '/api/usuarios/'),
+        Escenario('usuarios.detalle', 'GET', lambda i: f'/api/usuarios/{i % 20 + 1}'),
+        Escenario('usuarios.mis_equipos', 'GET', lambda i: '/api/usuarios/mis-equipos', token='usuario'),
+        Escenario('usuarios.equipos', 'GET', lambda i: f'/api/usuarios/{i % 20 + 1}/equipos'),
+        Escenario('equipos.lote', 'POST', lambda i: '/inventario/lote',
+                  lambda i: {'ids_inventario': list(range(i % 20 + 1, i % 20 + 51))}),
+        Escenario('legacy.listado', 'GET', lambda i: '/api/inventario'),
+        Escenario('sync.cambios', 'GET', lambda i: '/api/sync/?since=0'),
+        Escenario('ciclo_vida.permitidas', 'GET', lambda i: '/api/ciclo-vida/transiciones-permitidas'),
+        Escenario('ciclo_vida.estancados', 'GET', lambda i: '/api/ciclo-vida/estancados?estado=EnReparacion&dias=30'),
+        Escenario('ciclo_vida.antiguedad', 'GET', lambda i: '/api/ciclo-vida/antiguedad'),
+        Escenario('ciclo_vida.transiciones', 'GET', lambda i: f'/api/ciclo-vida/{i % 20 + 1}/transiciones'),
+        Escenario('reportes.listado', 'GET', lambda i: '/api/reportes/'),
+        Escenario('reportes.sucursal', 'GET', lambda i: '/api/reportes/sucursal/1'),
+        Escenario('reportes.sucursal_csv', 'GET', lambda i: '/api/reportes/sucursal/1?formato=csv&vista=estado'),
+        Escenario('trabajos.listado', 'GET', lambda i: '/api/trabajos/'),
+        Escenario('trabajos.detalle', 'GET', lambda i: f"/api/trabajos/{preparados['trabajo']}"),
+        Escenario('trabajos.archivo', 'GET', lambda i: f"/api/trabajos/{preparados['trabajo']}/archivo"),
+        Escenario('admin.resumen_inventario', 'GET', lambda i: '/api/admin/resumen-inventario'),
+        Escenario('admin.consultas_lentas', 'GET', lambda i: '/api/admin/consultas-lentas'),
+        Escenario('metrics', 'GET', lambda i: '/metrics', token=None),
+
+        # Escrituras: cada DELETE elimina lo creado por el POST del mismo tipo
+        Escenario('equipos.crear', 'POST', lambda i: '/inventario/', dispositivo('PC'), despues=_creados('id_equipo', creados)),
+        Escenario('equipos.editar', 'PUT', lambda i: f'/inventario/{i % 20 + 1}', lambda i: {'ram': f'{8 + i % 3 * 8}GB'}),
+        Escenario('equipos.eliminar', 'DELETE', _siguiente(creados, 'id_equipo')('/inventario/')),
+        Escenario('celulares.crear', 'POST', lambda i: '/api/celulares/', dispositivo('CEL'), despues=_creados('id_celular', creados)),
+        Escenario('celulares.editar', 'PUT', lambda i: f'/api/celulares/{i % 20 + 1}', lambda i: {'comentarios': f'bench {i}'}),
+        Escenario('celulares.eliminar', 'DELETE', _siguiente(creados, 'id_celular')('/api/celulares/')),
+        Escenario('impresoras.crear', 'POST', lambda i: '/api/impresoras/', dispositivo('IMP'), despues=_creados('id_impresora', creados)),
+        Escenario('impresoras.editar', 'PUT', lambda i: f'/api/impresoras/{i % 20 + 1}', lambda i: {'ip_asignada': f'10.9.0.{i % 250 + 1}'}),
+        Escenario('impresoras.eliminar', 'DELETE', _siguiente(creados, 'id_impresora')('/api/impresoras/')),
+        Escenario('consumibles.crear', 'POST', lambda i: '/api/consumibles/',
+                  lambda i: {'tipo': 'Toner', 'marca': 'Bench', 'modelo': 'TN-1', 'stock_actual': 5, 'id_sucursal_stock': 1},
+                  despues=_creados('id', creados)),
+        Escenario('consumibles.editar', 'PUT', lambda i: f'/api/consumibles/{i % 20 + 1}', lambda i: {'stock_actual': i % 30}),
+        Escenario('consumibles.eliminar', 'DELETE', _siguiente(creados, 'id')('/api/consumibles/')),
+        Escenario('historial.crear', 'POST', lambda i: '/api/historial/',
+                  lambda i: {'tipo_equipo': 'Celular', 'id_equipo': 1, 'responsable_anterior': 1, 'responsable_nuevo': 2}),
+        Escenario('usuarios.editar', 'PUT', lambda i: '/api/usuarios/3', lambda i: {'nombre': f'Usuario bench {i}'}),
+        # Sin id en la respuesta: los equipos creados por la ruta legacy se quedan en la base
+        Escenario('legacy.crear', 'POST', lambda i: '/api/inventario',
+                  lambda i: {'codigo_interno': f'BENCH-LEG-{next(secuencia)}', 'marca': 'Bench', 'modelo': 'B1'}),
+        # Encolan sin ejecutar: la suite no arranca el ejecutor de trabajos
+        Escenario('trabajos.crear', 'POST', lambda i: '/api/trabajos/', lambda i: {'tipo': 'reporte_inventario'}),
+        Escenario('reportes.regenerar', 'POST', lambda i: '/api/reportes/sucursal/1'),
+    ]
+
+class ContadorConsultas:
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, *args):
+        self.total += 1
+
+def _ejecutar(cliente, escenario, i, headers):
+    cuerpo = escenario.cuerpo(i) if escenario.cuerpo else None
+    respuesta = cliente.open(escenario.ruta(i), method=escenario.metodo, json=cuerpo, headers=headers)
+    if escenario.despues:
+        escenario.despues(respuesta)
+    return respuesta
+
+def medir_escenario(app, escenario, iteraciones, credenciales):
+    cliente = app.test_client()
+    headers = {'Authorization': f'Bearer {credenciales[escenario.token]}'} if escenario.token else {}
+    contador = ContadorConsultas()
+    latencias = []
+    errores = 0
+
+    # Calentamiento de las lecturas (caché de sentencias compiladas, páginas de SQLite)
+    if escenario.metodo == 'GET':
+        for i in range(2):
+            _ejecutar(cliente, escenario, i, headers)
+
+    event.listen(Engine, 'after_cursor_execute', contador)
+    try:
+        inicio = time.perf_counter()
+        for i in range(iteraciones):
+            t0 = time.perf_counter()
+            respuesta = _ejecutar(cliente, escenario, i, headers)
+            latencias.append(time.perf_counter() - t0)
+            if respuesta.status_code >= 400:
+                errores += 1
+        duracion = time.perf_counter() - inicio
+    finally:
+        event.remove(Engine, 'after_cursor_execute', contador)
+
+    # Memoria en una pasada aparte: tracemalloc distorsiona las latencias
+    tracemalloc.start()
+    try:
+        _ejecutar(cliente, escenario, iteraciones, headers)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'metodo': escenario.metodo,
+        'peticiones': iteraciones,
+        'errores': errores,
+        'rps': round(iteraciones / duracion, 1) if duracion else 0.0,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p90_ms': round(percentil(latencias, 90) * 1000, 2),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+        'consultas': round(contador.total / iteraciones, 1),
+        'memoria_kb': round(pico / 1024, 1),
+    }
+
+def ejecutar_suite(app, iteraciones, filtro=None):
+    credenciales = tokens(app)
+    resultados = {}
+    for escenario in escenarios(preparar(app)):
+        if filtro and not any(f in escenario.nombre for f in filtro):
+            continue
+        resultados[escenario.nombre] = medir_escenario(app, escenario, iteraciones, credenciales)
+    return resultados
+
+def imprimir(resultados):
+    print(f"{'endpoint':<28}{'metodo':>7}{'errores':>8}{'rps':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'consultas':>10}{'mem KB':>9}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<28}{r['metodo']:>7}{r['errores']:>8}{r['rps']:>9}{r['p50_ms']:>9}{r['p90_ms']:>9}{r['p99_ms']:>9}{r['consultas']:>10}{r['memoria_kb']:>9}")
+
+def comparar(base, actual, tolerancia):
+    regresiones = []
+    print(f"\n{'endpoint':<28}{'p50 base':>10}{'p50':>9}{'Δ%':>8}{'p90 base':>10}{'p90':>9}{'Δ%':>8}{'consultas':>12}")
+    for nombre, r in actual.items():
+        b = base.get(nombre)
+        if not b:
+            continue
+        cambios = {m: (r[m] - b[m]) / b[m] if b[m] else 0.0 for m in ('p50_ms', 'p90_ms')}
+        marca = ''
+        if any(c > tolerancia for c in cambios.values()) or r['consultas'] > b['consultas']:
+            regresiones.append(nombre)
+            marca = '  << regresión'
+        print(f"{nombre:<28}{b['p50_ms']:>10}{r['p50_ms']:>9}{cambios['p50_ms'] * 100:>7.0f}%"
+              f"{b['p90_ms']:>10}{r['p90_ms']:>9}{cambios['p90_ms'] * 100:>7.0f}%"
+              f"{str(b['consultas']) + '→' + str(r['consultas']):>12}{marca}")
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iteraciones', type=int, default=30)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--db', help='ruta de la base SQLite (por defecto, temporal)')
+    parser.add_argument('--solo', nargs='*', help='ejecutar solo los endpoints que contengan estos textos')
+    parser.add_argument('--guardar', help='guardar los resultados como línea base (JSON)')
+    parser.add_argument('--comparar', help='comparar contra una línea base guardada')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='empeoramiento relativo admitido')
+    for entidad, cantidad in CANTIDADES.items():
+        parser.add_argument(f'--{entidad}', type=int, default=cantidad)
+    args = parser.parse_args()
+
+    cantidades = {entidad: getattr(args, entidad) for entidad in CANTIDADES}
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = args.db or os.path.join(directorio, 'suite.db')
+        app = generar_base(ruta, semilla=args.semilla, config_extra={
+            'LOG_LEVEL': 'ERROR',
+            'TRABAJOS_EN_PROCESO': False,
+            'TRABAJOS_DIR': os.path.join(directorio, 'artefactos'),
+            'REPORTES_DIR': os.path.join(directorio, 'reportes'),
+        }, **cantidades)
+        resultados = ejecutar_suite(app, args.iteraciones, args.solo)
+
+    imprimir(resultados)
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as f:
+            json.dump({'cantidades': cantidades, 'iteraciones': args.iteraciones, 'resultados': resultados}, f, indent=2)
+        print(f"\nLínea base guardada en {args.guardar}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        if base.get('cantidades') != cantidades:
+            print("\nAdvertencia: la línea base se generó con otras cantidades de datos")
+        regresiones = comparar(base['resultados'], resultados, args.tolerancia)
+        if regresiones:
+            print(f"\nRegresiones: {', '.join(regresiones)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+import random
+from gunicorn.glogging import Logger
+from app.logging_config import redactar_url
+
+# Perfil de producción: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Las peticiones pasan la mayor parte del tiempo esperando a la base MySQL
+# remota, por eso se usan workers con hilos (gthread): los procesos aprovechan
+# los núcleos y los hilos cubren la espera de E/S.
+cpus = multiprocessing.cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', cpus * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Cada worker tiene su propio pool de SQLAlchemy: una conexión por hilo
+os.environ.setdefault('DB_POOL_SIZE', str(threads))
+
+# Cargar create_app una sola vez en el master y compartirlo con los workers
+preload_app = True
+
+# Tiempos de espera: peticiones colgadas se reciclan, los reinicios esperan
+# a que terminen las peticiones en curso
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Reciclar workers periódicamente para acotar la memoria; el jitter evita
+# que todos se reinicien a la vez
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+errorlog = '-'
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+access_log_format = '%(h)s "%(r)s" %(s)s %(b)s %(M)sms'
+
+# Fracción de accesos exitosos que se registran; errores y peticiones lentas
+# se registran siempre
+ACCESS_LOG_SAMPLE = float(os.environ.get('ACCESS_LOG_SAMPLE', 0.1))
+ACCESS_LOG_SLOW_MS = float(os.environ.get('ACCESS_LOG_SLOW_MS', 1000))
+
+class AccessLogMuestreado(Logger):
+    def access(self, resp, req, environ, request_time):
+        if not self.access_log_enabled:
+            return
+        lenta = request_time.total_seconds() * 1000 >= ACCESS_LOG_SLOW_MS
+        if resp.status_code < 400 and not lenta and random.random() >= ACCESS_LOG_SAMPLE:
+            return
+        super().access(resp, req, environ, request_time)
+
+    # La línea de petición y el query string se escriben sin el token de ?jwt=
+    def atoms(self, resp, req, environ, request_time):
+        atoms = super().atoms(resp, req, environ, request_time)
+        for clave in ('r', 'q'):
+            if atoms[clave]:
+                atoms[clave] = redactar_url(atoms[clave])
+        return atoms
+
+logger_class = AccessLogMuestreado
+
+def post_fork(server, worker):
+    # Las conexiones abiertas en el master (create_all) no deben compartirse
+    # entre procesos: cada worker abre las suyas
+    from app import db
+
+    flask_app = server.app.wsgi()
+    with flask_app.app_context():
+        db.engine.dispose(close=False)
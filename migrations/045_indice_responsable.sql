@@ -0,0 +1,6 @@
+-- Índice para "mis equipos" (GET /api/usuarios/mis-equipos y /api/usuarios/<id>/equipos).
+-- Las bases nuevas lo crean con db.create_all(); en las existentes se aplica una vez,
+-- en la base principal y en cada shard. En MySQL/InnoDB reemplaza al índice implícito
+-- de la clave foránea, que el servidor descarta al crear este.
+CREATE INDEX ix_inventario_general_id_usuario_responsable
+    ON inventario_general (id_usuario_responsable);
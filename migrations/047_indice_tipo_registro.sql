@@ -0,0 +1,10 @@
+-- Índice único de (tipo_equipo, id_registro): cada registro de detalle pertenece a un
+-- solo equipo del inventario, y las relaciones por tipo de InventarioGeneral
+-- (equipo_computacional, celular, impresora) y las rutas /<id> buscan por este par.
+-- Se aplica una vez en la base principal y en cada shard.
+--
+-- Antes de crearlo, esta consulta no debe devolver filas (pares duplicados):
+--   SELECT tipo_equipo, id_registro, COUNT(*) FROM inventario_general
+--   GROUP BY tipo_equipo, id_registro HAVING COUNT(*) > 1;
+CREATE UNIQUE INDEX ux_inventario_general_tipo_registro
+    ON inventario_general (tipo_equipo, id_registro);
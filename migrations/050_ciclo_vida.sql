@@ -0,0 +1,32 @@
+-- Ciclo de vida de los equipos: fecha de entrada al estado actual, índice para las
+-- consultas de antigüedad (/api/ciclo-vida/estancados y /antiguedad) y tabla de
+-- transiciones de estado. Se aplica una vez en la base principal y en cada shard; en
+-- los shards, después de crear la tabla, su AUTO_INCREMENT debe empezar en el rango
+-- del shard, como el resto de las tablas fragmentadas:
+--   ALTER TABLE transiciones_estado AUTO_INCREMENT = <inicio del rango + 1>;
+ALTER TABLE inventario_general ADD COLUMN fecha_estado DATETIME NULL;
+
+-- Sin transiciones previas, el estado actual se cuenta desde la fecha de ingreso
+UPDATE inventario_general
+   SET fecha_estado = COALESCE(fecha_ingreso, NOW())
+ WHERE fecha_estado IS NULL;
+
+CREATE INDEX ix_inventario_general_estado_fecha
+    ON inventario_general (estado, fecha_estado);
+
+CREATE TABLE transiciones_estado (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    id_inventario INT NOT NULL,
+    estado_anterior ENUM('DeBaja', 'Asignado', 'SinAsignar', 'EnReparacion') NULL,
+    estado_nuevo ENUM('DeBaja', 'Asignado', 'SinAsignar', 'EnReparacion') NOT NULL,
+    fecha DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    KEY ix_transiciones_estado_inventario_fecha (id_inventario, fecha),
+    KEY ix_transiciones_estado_nuevo_fecha (estado_nuevo, fecha)
+);
+
+-- Transición inicial de los equipos existentes
+INSERT INTO transiciones_estado (id_inventario, estado_anterior, estado_nuevo, fecha)
+SELECT id_inventario, NULL, estado, fecha_estado
+  FROM inventario_general
+ WHERE estado IS NOT NULL;
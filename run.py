@@ -1,24 +1,14 @@
 from app import create_app
 import logging
+import os
+
+# Servidor de desarrollo; en producción usar: gunicorn -c gunicorn.conf.py wsgi:app
+DEBUG = os.environ.get('FLASK_DEBUG', '0') == '1'
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 app = create_app()
 
-@app.route('/')
-def home():
-    return {'message': 'API funcionando'}
-
-@app.errorhandler(500)
-def handle_500_error(error):
-    logger.error(f"Error interno del servidor: {error}")
-    return {'error': str(error), 'tipo': type(error).__name__}, 500
-
 if __name__ == "__main__":
     logger.info("Iniciando servidor API...")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=DEBUG, host='0.0.0.0', port=5000)
@@ -0,0 +1,21 @@
+from app import create_app
+from app.trabajos import EjecutorTrabajos
+import logging
+import os
+
+# Proceso dedicado a los trabajos en segundo plano: python worker.py
+# (en la API conviene entonces TRABAJOS_EN_PROCESO=0)
+logger = logging.getLogger(__name__)
+
+app = create_app()
+
+if __name__ == "__main__":
+    hilos = int(os.environ.get('TRABAJOS_HILOS', app.config['TRABAJOS_HILOS']))
+    logger.info("Iniciando worker de trabajos con %d hilos...", hilos)
+    ejecutor = EjecutorTrabajos(app, hilos=hilos)
+    # Los trabajos que se encolan desde aquí (reportes programados) los toma este mismo ejecutor
+    app.extensions['trabajos'] = ejecutor
+    try:
+        ejecutor.ejecutar_siempre()
+    except KeyboardInterrupt:
+        ejecutor.pool.shutdown(wait=True)